@@ -1,16 +1,45 @@
 # backend/django_project/claims/admin.py
+import logging
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.utils.html import format_html
-from .models import Insured, Claim, FraudAlert
-from .services import Neo4jClient
+from .models import Insured, Claim, FraudAlert, InsuredFeatures, OutboxEvent
+from .services import score_insureds
+
+logger = logging.getLogger(__name__)
 
 
 @admin.register(Insured)
 class InsuredAdmin(admin.ModelAdmin):
-    list_display = ['national_code', 'full_name', 'phone_number', 'address', 'created_at']
+    list_display = ['national_code', 'full_name', 'phone_number', 'address', 'ring_size', 'created_at']
     search_fields = ['national_code', 'full_name', 'phone_number']
     list_filter = ['created_at']
-    readonly_fields = ['created_at']
+    readonly_fields = ['ring_id', 'ring_size', 'created_at']
+
+
+@admin.register(InsuredFeatures)
+class InsuredFeaturesAdmin(admin.ModelAdmin):
+    """Riskiest insureds first, read from the materialized feature table (no graph traversal)"""
+    list_display = ['insured', 'shared_score', 'phone_sharers', 'address_sharers', 'ring_size', 'claim_count',
+                    'formatted_total_amount', 'last_claim_at']
+    list_select_related = ['insured']
+    search_fields = ['insured__national_code', 'insured__full_name']
+    ordering = ['-shared_score']
+    show_full_result_count = False
+
+    def formatted_total_amount(self, obj):
+        return f"{obj.total_amount:,}".replace(",", ".")
+    formatted_total_amount.short_description = 'Total amount'
+
+    # Maintained by the outbox relay and `manage.py rebuild_features`
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class FraudAlertInline(admin.StackedInline):
@@ -21,12 +50,28 @@ class FraudAlertInline(admin.StackedInline):
     fields = ['fraud_score', 'signals', 'is_resolved', 'created_at']
 
 
+class ScoredClaimChangeList(ChangeList):
+    """Fetch live fraud scores for the whole page with one scorer call"""
+
+    def get_results(self, request):
+        super().get_results(request)
+        insured_ids = {claim.insured_id for claim in self.result_list if claim.insured_id}
+        try:
+            scores = score_insureds(insured_ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Neo4j error: {e}")
+            scores = {}
+        for claim in self.result_list:
+            claim.live_score = scores.get(claim.insured_id, 0)
+
+
 @admin.register(Claim)
 class ClaimAdmin(admin.ModelAdmin):
     list_display = ['claim_number', 'insured', 'formatted_amount', 'status', 'live_fraud_score', 'created_at']
-    list_filter = ['status', 'accident_date']
+    list_select_related = ['insured']
+    list_filter = ['status', 'accident_date', 'needs_rescore']
     search_fields = ['claim_number', 'insured__national_code', 'insured__full_name']
-    readonly_fields = ['claim_number', 'fraud_signals', 'created_at', 'live_fraud_score']
+    readonly_fields = ['claim_number', 'fraud_signals', 'needs_rescore', 'created_at', 'live_fraud_score']
     inlines = [FraudAlertInline]
 
     fieldsets = (
@@ -34,7 +79,7 @@ class ClaimAdmin(admin.ModelAdmin):
             'fields': ('insured', 'amount', 'accident_date', 'description')
         }),
         ('Status', {
-            'fields': ('status', 'live_fraud_score', 'fraud_signals'),
+            'fields': ('status', 'live_fraud_score', 'fraud_signals', 'needs_rescore'),
         }),
     )
 
@@ -42,19 +87,23 @@ class ClaimAdmin(admin.ModelAdmin):
         return obj.formatted_amount
     formatted_amount.short_description = 'Amount'
 
+    def get_changelist(self, request, **kwargs):
+        return ScoredClaimChangeList
+
     def live_fraud_score(self, obj):
         """Get live fraud score from Neo4j without saving to database"""
         # Return gray text if no insured exists
         if not obj.insured_id:
             return format_html('<span style="color: gray;">No Insured</span>')
 
-        try:
-            neo4j = Neo4jClient()
-            score = neo4j.get_fraud_score(obj.insured_id)
-            neo4j.close()
-        except Exception as e:
-            print(f"⚠️ Neo4j error: {e}")
-            score = 0
+        # Changelist rows were scored in bulk by ScoredClaimChangeList
+        score = getattr(obj, 'live_score', None)
+        if score is None:
+            try:
+                score = score_insureds([obj.insured_id])[obj.insured_id]
+            except Exception as e:
+                logger.warning(f"⚠️ Neo4j error: {e}")
+                score = 0
 
         if score >= 70:
             color = 'red'
@@ -80,6 +129,8 @@ class FraudAlertAdmin(admin.ModelAdmin):
     search_fields = ['claim__claim_number', 'claim__insured__national_code']
     readonly_fields = ['fraud_score', 'signals', 'created_at']
     raw_id_fields = ['claim']
+    list_select_related = ['claim']
+    show_full_result_count = False  # skip the unfiltered COUNT(*) on filtered pages
 
     def colored_fraud_score(self, obj):
         score = obj.fraud_score
@@ -90,4 +141,11 @@ class FraudAlertAdmin(admin.ModelAdmin):
         else:
             color = 'green'
         return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, score)
-    colored_fraud_score.short_description = 'Score'
\ No newline at end of file
+    colored_fraud_score.short_description = 'Score'
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'attempts', 'available_at', 'processed_at', 'created_at']
+    list_filter = ['topic', 'processed_at']
+    readonly_fields = ['topic', 'payload', 'attempts', 'last_error', 'available_at', 'processed_at', 'created_at']
@@ -0,0 +1,30 @@
+# backend/django_project/claims/alert_handlers.py
+"""Handlers run by `manage.py nats_listener` for every fraud.alert message.
+
+Handlers are listed in settings.NATS_ALERT_HANDLERS. ``async def`` handlers run
+on the listener's event loop; plain functions (e.g. ones using the Django ORM)
+run in the listener's thread pool. A handler that raises makes the message be
+redelivered, so handlers must be idempotent.
+"""
+import logging
+from .models import Claim
+
+logger = logging.getLogger(__name__)
+
+
+async def print_fraud_alert(data):
+    """Log the alert"""
+    logger.info(f"📬 Received: {data}")
+
+
+def print_claim_details(data):
+    """Look the claim up in PostgreSQL and log who it belongs to"""
+    claim = Claim.objects.select_related('insured').filter(pk=data['claim_id']).first()
+    if claim is None:
+        logger.warning(f"⚠️ Claim {data['claim_id']} no longer exists")
+        return
+
+    if data.get('severity') == 'high':
+        logger.critical(f"🚨 CRITICAL: Fraud alert for claim {claim.claim_number} ({claim.insured.full_name})")
+    else:
+        logger.info(f"Fraud alert for claim {claim.claim_number} ({claim.insured.full_name})")
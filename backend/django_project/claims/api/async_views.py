@@ -0,0 +1,130 @@
+# backend/django_project/claims/api/async_views.py
+"""Async claim intake: submit one claim and get its score in the same response.
+
+DRF 3.15 views are sync-only, so this is a plain Django async view reusing
+the DRF serializers. Under an ASGI server (uvicorn src.asgi:application)
+the graph lookup and the NATS publish are awaited on the event loop, so a
+request waiting on Neo4j holds no thread; PostgreSQL work still runs in
+Django's sync_to_async threads.
+"""
+import json
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+from claims.async_services import apublish_fraud_alerts
+from claims.models import Insured, Claim, OutboxEvent, allocate_claim_numbers
+from claims.outbox import FRAUD_ALERT_THRESHOLD, enqueue, record_scores
+from claims.rules import RuleEngine
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .serializers import BulkClaimItemSerializer, BulkClaimResultSerializer
+
+
+def create_claim(item):
+    """Insert the claim and its claim.score event; (None, None) when the insured is unknown.
+
+    The event is the safety net for a request that dies before scoring: it
+    is held back for CLAIM_INLINE_SCORING_GRACE seconds and marked
+    processed once the inline score is saved.
+    """
+    lookup = {'pk': item['insured']} if 'insured' in item else {'national_code': item['national_code']}
+    insured_id = Insured.objects.filter(**lookup).values_list('pk', flat=True).first()
+    if insured_id is None:
+        return None, None
+    claim = Claim(insured_id=insured_id, claim_number=allocate_claim_numbers()[0], amount=item['amount'],
+                  accident_date=item['accident_date'], description=item['description'], status=item['status'])
+    with transaction.atomic():
+        # bulk_create sends no post_save, so the signal does not queue a second claim.score
+        Claim.objects.bulk_create([claim])
+        event = OutboxEvent.objects.create(
+            topic=OutboxEvent.CLAIM_SCORE,
+            payload={"id": claim.pk, "insured_id": insured_id},
+            available_at=timezone.now() + timedelta(seconds=settings.CLAIM_INLINE_SCORING_GRACE),
+        )
+        # The claim.score event is retired once scored inline; the insured's claim totals still need it
+        enqueue(OutboxEvent.INSURED_FEATURES, {"id": insured_id})
+    return claim, event
+
+
+def save_scores(results, event):
+    """record_scores() and retire the claim's safety-net event in one transaction"""
+    with transaction.atomic():
+        alerts = record_scores(results, verbose=False)
+        OutboxEvent.objects.filter(pk=event.pk).update(processed_at=timezone.now())
+    return alerts
+
+
+def mark_alerts_published(alerts):
+    """The relay need not publish these again (it would only be deduplicated by the stream)"""
+    OutboxEvent.objects.filter(
+        topic=OutboxEvent.FRAUD_ALERT, processed_at__isnull=True,
+        payload__version__in=[alert.id for alert in alerts],
+    ).update(processed_at=timezone.now())
+
+
+def check_access(request):
+    """Authenticate as the DRF endpoints do and require ``claims.add_claim``; an error response or None"""
+    authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        user = drf_request.user
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        if not user.has_perm('claims.add_claim'):
+            raise exceptions.PermissionDenied()
+    except exceptions.APIException as error:
+        response = JsonResponse({'detail': error.detail}, status=error.status_code)
+        if isinstance(error, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # As APIView.permission_denied: 401 with the first authenticator's challenge (Token)
+            response.status_code = 401
+            response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+        return response
+    return None
+
+
+async def submit_claim(request):
+    """POST a claim ({"insured": id} or {"national_code": ...}); 201 with its score and signals"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    denied = await sync_to_async(check_access)(request)
+    if denied is not None:
+        return denied
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+    serializer = BulkClaimItemSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    claim, event = await sync_to_async(create_claim)(serializer.validated_data)
+    if claim is None:
+        return JsonResponse({'insured': ['Insured does not exist.']}, status=400)
+
+    engine = RuleEngine()
+    if isinstance(request, ASGIRequest):
+        results = await engine.aevaluate([claim.pk], {claim.insured_id})
+    else:
+        # runserver/WSGI runs each async view on a throwaway event loop, too short-lived
+        # to keep async Neo4j connections: use the shared sync driver instead
+        results = await sync_to_async(engine.evaluate)([claim.pk], {claim.insured_id})
+    alerts = await sync_to_async(save_scores)(results, event)
+
+    if alerts and isinstance(request, ASGIRequest):
+        published = await apublish_fraud_alerts(alerts)
+        if published:
+            await sync_to_async(mark_alerts_published)(published)
+
+    scored = results[0][0]
+    return JsonResponse(BulkClaimResultSerializer(scored, context={'threshold': FRAUD_ALERT_THRESHOLD}).data,
+                        status=201)
+
+
+# CsrfViewMiddleware skips views carrying this flag (csrf_exempt wraps async views as sync in Django 4.2);
+# SessionAuthentication still enforces CSRF for session users, as on the DRF endpoints
+submit_claim.csrf_exempt = True
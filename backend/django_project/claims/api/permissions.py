@@ -0,0 +1,15 @@
+# backend/django_project/claims/api/permissions.py
+from rest_framework.permissions import DjangoModelPermissions
+
+
+class ModelPermissions(DjangoModelPermissions):
+    """Django model permissions on reads too: GET needs ``view_<model>``.
+
+    Plain DjangoModelPermissions lets any authenticated user read, so a
+    partner account allowed to submit claims could list other insureds.
+    """
+    perms_map = {
+        **DjangoModelPermissions.perms_map,
+        'GET': ['%(app_label)s.view_%(model_name)s'],
+        'HEAD': ['%(app_label)s.view_%(model_name)s'],
+    }
@@ -0,0 +1,82 @@
+# backend/django_project/claims/api/serializers.py
+from rest_framework import serializers
+from claims.models import Insured, Claim, FraudAlert, InsuredFeatures
+
+
+class InsuredSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Insured
+        fields = ['id', 'national_code', 'full_name', 'phone_number', 'address', 'ring_id', 'ring_size',
+                  'created_at']
+        read_only_fields = ['ring_id', 'ring_size', 'created_at']
+
+
+class InsuredRiskSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='insured_id')
+    national_code = serializers.CharField(source='insured.national_code')
+    full_name = serializers.CharField(source='insured.full_name')
+
+    class Meta:
+        model = InsuredFeatures
+        fields = ['id', 'national_code', 'full_name', 'shared_score', 'phone_sharers', 'address_sharers',
+                  'ring_size', 'claim_count', 'total_amount', 'last_claim_at']
+
+
+class ClaimSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Claim
+        fields = ['id', 'claim_number', 'insured', 'amount', 'accident_date', 'description', 'status',
+                  'fraud_score', 'fraud_signals', 'needs_rescore', 'created_at']
+        read_only_fields = ['claim_number', 'fraud_score', 'fraud_signals', 'needs_rescore', 'created_at']
+
+
+class BulkClaimItemSerializer(serializers.Serializer):
+    """One claim of a bulk intake request; the insured is given by id or national code.
+
+    Insureds are not looked up here (that would be one query per item): the
+    view resolves every reference of the request in one query.
+    """
+    insured = serializers.IntegerField(required=False)
+    national_code = serializers.CharField(max_length=10, required=False)
+    amount = serializers.IntegerField(min_value=0)
+    accident_date = serializers.DateField()
+    description = serializers.CharField()
+    status = serializers.ChoiceField(choices=Claim.STATUS_CHOICES, default='pending')
+
+    def validate(self, attrs):
+        if ('insured' in attrs) == ('national_code' in attrs):
+            raise serializers.ValidationError("Give exactly one of 'insured' or 'national_code'.")
+        return attrs
+
+
+class BulkClaimResultSerializer(serializers.ModelSerializer):
+    alert = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Claim
+        fields = ['id', 'claim_number', 'insured', 'fraud_score', 'fraud_signals', 'needs_rescore', 'alert']
+
+    def get_alert(self, claim):
+        return claim.fraud_score >= self.context['threshold']
+
+
+class AlertInsuredSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Insured
+        fields = ['id', 'national_code', 'full_name']
+
+
+class AlertClaimSerializer(serializers.ModelSerializer):
+    insured = AlertInsuredSerializer()
+
+    class Meta:
+        model = Claim
+        fields = ['id', 'claim_number', 'status', 'amount', 'accident_date', 'insured']
+
+
+class FraudAlertSerializer(serializers.ModelSerializer):
+    claim = AlertClaimSerializer()
+
+    class Meta:
+        model = FraudAlert
+        fields = ['id', 'fraud_score', 'signals', 'is_resolved', 'created_at', 'claim']
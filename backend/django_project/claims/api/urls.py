@@ -0,0 +1,15 @@
+# backend/django_project/claims/api/urls.py
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+from .async_views import submit_claim
+from .views import InsuredViewSet, ClaimViewSet, FraudAlertViewSet
+
+router = DefaultRouter()
+router.register('insureds', InsuredViewSet, basename='insured')
+router.register('claims', ClaimViewSet, basename='claim')
+router.register('alerts', FraudAlertViewSet, basename='alert')
+
+urlpatterns = [
+    # Before the router, whose claims/<pk>/ route would otherwise match it
+    path('claims/submit/', submit_claim, name='claim-submit'),
+] + router.urls
@@ -0,0 +1,151 @@
+# backend/django_project/claims/api/views.py
+from django.conf import settings
+from django.db import transaction
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from claims.models import Insured, Claim, FraudAlert, InsuredFeatures, OutboxEvent, allocate_claim_numbers
+from claims.outbox import FRAUD_ALERT_THRESHOLD, enqueue, record_scores
+from claims.rules import RuleEngine
+from .pagination import KeysetPagination
+from .permissions import ModelPermissions
+from .serializers import (
+    InsuredSerializer, InsuredRiskSerializer, ClaimSerializer, BulkClaimItemSerializer, BulkClaimResultSerializer,
+    FraudAlertSerializer,
+)
+
+HIGH_RISK_MAX_LIMIT = 500
+
+
+class InsuredViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Partner intake: needs the add/view permissions on insureds (token or session)"""
+    queryset = Insured.objects.all()
+    serializer_class = InsuredSerializer
+    permission_classes = [ModelPermissions]
+
+    @action(detail=False, methods=['get'], url_path='high-risk')
+    def high_risk(self, request):
+        """Insureds with a shared phone/address score above ``min_score`` (default 30), riskiest first.
+
+        Read from the feature table with an index scan, not a graph traversal;
+        ``limit`` caps the list (default 100, at most HIGH_RISK_MAX_LIMIT).
+        """
+        params = request.query_params
+        try:
+            min_score = int(params.get('min_score', 30))
+            limit = min(int(params.get('limit', 100)), HIGH_RISK_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'detail': 'min_score and limit must be integers.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Must be at least 1.'})
+        features = (InsuredFeatures.objects.select_related('insured')
+                    .filter(shared_score__gt=min_score).order_by('-shared_score', 'pk')[:limit])
+        return Response(InsuredRiskSerializer(features, many=True).data)
+
+
+class ClaimViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Partner intake, with the add/view permissions on claims. Single claims are scored
+    asynchronously by the outbox relay; bulk claims inline"""
+    queryset = Claim.objects.select_related('insured')
+    serializer_class = ClaimSerializer
+    permission_classes = [ModelPermissions]
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create up to CLAIMS_BULK_MAX_ITEMS claims and return each one's score and signals.
+
+        All-or-nothing: any invalid item rejects the request with per-item
+        errors. Otherwise the claims are inserted with bulk_create under
+        pre-allocated numbers and scored together (one PostgreSQL and one
+        graph query).
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Expected a list of claims.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.CLAIMS_BULK_MAX_ITEMS:
+            return Response({'detail': f'At most {settings.CLAIMS_BULK_MAX_ITEMS} claims per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BulkClaimItemSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated = serializer.validated_data
+        insured_ids, errors = self.resolve_insureds(validated)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        claims = [
+            Claim(insured_id=insured_id, claim_number=number, amount=item['amount'],
+                  accident_date=item['accident_date'], description=item['description'], status=item['status'])
+            for item, insured_id, number in zip(validated, insured_ids,
+                                                allocate_claim_numbers(len(items)))
+        ]
+        with transaction.atomic():
+            # bulk_create sends no post_save, so nothing is queued for the relay to re-score
+            claims = Claim.objects.bulk_create(claims, batch_size=1000)
+            results = RuleEngine().evaluate([claim.pk for claim in claims], set(insured_ids))
+            record_scores(results)
+            enqueue(OutboxEvent.INSURED_FEATURES, {"ids": sorted(set(insured_ids))})
+
+        by_pk = {claim.pk: claim for claim, _, _ in results}
+        data = BulkClaimResultSerializer([by_pk[claim.pk] for claim in claims], many=True,
+                                         context={'threshold': FRAUD_ALERT_THRESHOLD}).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def resolve_insureds(self, validated):
+        """(insured id per item, error per item), with one query per reference kind"""
+        ids = {item['insured'] for item in validated if 'insured' in item}
+        codes = {item['national_code'] for item in validated if 'national_code' in item}
+        known_ids = set(Insured.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        by_code = dict(Insured.objects.filter(national_code__in=codes).values_list('national_code', 'pk')) \
+            if codes else {}
+
+        insured_ids, errors = [], []
+        for item in validated:
+            if 'insured' in item:
+                insured_id = item['insured'] if item['insured'] in known_ids else None
+            else:
+                insured_id = by_code.get(item['national_code'])
+            insured_ids.append(insured_id)
+            errors.append({} if insured_id else {'insured': ['Insured does not exist.']})
+        return insured_ids, errors
+
+
+class FraudAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """Alert feed for investigators, newest first, keyset-paginated.
+
+    Filters: ``is_resolved`` (true/false), ``min_score``/``max_score`` and
+    ``status`` (the claim's status, repeatable). A page is one query.
+    Needs the view permission on fraud alerts (investigators, not partners).
+    """
+    serializer_class = FraudAlertSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [ModelPermissions]
+    queryset = FraudAlert.objects.select_related('claim__insured')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+
+        if 'is_resolved' in params:
+            value = params['is_resolved'].lower()
+            if value not in ('true', 'false', '1', '0'):
+                raise ValidationError({'is_resolved': 'Expected true or false.'})
+            queryset = queryset.filter(is_resolved=value in ('true', '1'))
+        for param, lookup in (('min_score', 'fraud_score__gte'), ('max_score', 'fraud_score__lte')):
+            if param in params:
+                try:
+                    queryset = queryset.filter(**{lookup: float(params[param])})
+                except ValueError:
+                    raise ValidationError({param: 'Expected a number.'})
+        statuses = params.getlist('status')
+        if statuses:
+            valid = dict(Claim.STATUS_CHOICES)
+            unknown = [value for value in statuses if value not in valid]
+            if unknown:
+                raise ValidationError({'status': f'Unknown status: {", ".join(unknown)}'})
+            queryset = queryset.filter(claim__status__in=statuses)
+        return queryset
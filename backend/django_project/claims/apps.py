@@ -1,6 +1,6 @@
 # backend/django_project/claims/apps.py
 from django.apps import AppConfig
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_migrate
 
 
 class ClaimsConfig(AppConfig):
@@ -8,7 +8,6 @@ class ClaimsConfig(AppConfig):
     name = 'claims'
 
     def ready(self):
-        from .signals import sync_insured_to_neo4j
-        Insured = self.get_model('Insured')
-        post_save.connect(sync_insured_to_neo4j, sender=Insured)
-        post_delete.connect(sync_insured_to_neo4j, sender=Insured)
\ No newline at end of file
+        # Importing the module registers the @receiver handlers
+        from .signals import ensure_neo4j_schema_after_migrate
+        post_migrate.connect(ensure_neo4j_schema_after_migrate, sender=self)
\ No newline at end of file
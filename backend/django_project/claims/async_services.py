@@ -0,0 +1,175 @@
+# backend/django_project/claims/async_services.py
+"""Async counterparts of the scoring lookups in services.py, for ASGI views.
+
+A request waiting on Neo4j or NATS only holds a coroutine, not a thread, so
+one ASGI worker can keep hundreds of claim submissions in flight. Answers
+are shared with the sync path: the same score_cache entries, the same
+circuit breaker and degraded mode, and the same Cypher queries.
+
+Async drivers and connections belong to the event loop that opened them,
+so each loop gets its own (one per worker under uvicorn).
+"""
+import asyncio
+import logging
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from neo4j import AsyncGraphDatabase
+from .circuit_breaker import CircuitOpenError, is_outage
+from .nats_client import NATSClient
+from .score_cache import score_cache
+from .services import (
+    CACHED_LOOKUPS, FRAUD_SCORES_QUERY, SHARED_ATTRIBUTES_QUERY, _degraded, local_scorer, observed_query,
+    read_query, time_pool_acquire,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ================ Shared Async Driver ================
+_async_drivers = weakref.WeakKeyDictionary()  # event loop -> AsyncDriver
+
+
+def get_async_driver():
+    """Return the running event loop's Neo4j driver, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    driver = _async_drivers.get(loop)
+    if driver is None:
+        driver = AsyncGraphDatabase.driver(
+            settings.NEO4J_URI,
+            auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+            max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=settings.NEO4J_POOL_ACQUISITION_TIMEOUT,
+            connection_timeout=settings.NEO4J_CONNECTION_TIMEOUT,
+            max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+            max_transaction_retry_time=settings.NEO4J_MAX_TRANSACTION_RETRY_TIME,
+        )
+        time_pool_acquire(driver)
+        _async_drivers[loop] = driver
+    return driver
+
+
+async def close_async_driver():
+    """Close the running loop's driver (ASGI shutdown and tests)"""
+    driver = _async_drivers.pop(asyncio.get_running_loop(), None)
+    if driver is not None:
+        await driver.close()
+
+
+class AsyncNeo4jClient:
+    """Read-only scoring lookups of Neo4jClient, awaitable"""
+
+    def __init__(self):
+        self.driver = get_async_driver()
+
+    @observed_query('get_fraud_scores')
+    async def get_fraud_scores(self, insured_ids):
+        """{insured_id: score}, 0 when not in the graph"""
+        insured_ids = list(insured_ids)
+        if not insured_ids:
+            return {}
+        scores = dict.fromkeys(insured_ids, 0)
+        async with self.driver.session() as session:
+            result = await session.run(read_query(FRAUD_SCORES_QUERY), ids=insured_ids)
+            async for record in result:
+                scores[record["id"]] = record["fraud_score"]
+        return scores
+
+    @observed_query('get_shared_attributes')
+    async def get_shared_attributes(self, insured_ids):
+        """Ids of the other insureds on the same phone/address, in one query"""
+        insured_ids = list(insured_ids)
+        shared = {insured_id: {"phone": [], "address": []} for insured_id in insured_ids}
+        if not insured_ids:
+            return shared
+        async with self.driver.session() as session:
+            result = await session.run(read_query(SHARED_ATTRIBUTES_QUERY), ids=insured_ids)
+            async for record in result:
+                shared[record["id"]] = {"phone": record["phone"], "address": record["address"]}
+        return shared
+
+
+# ================ Scoring ================
+async def _from_graph(method, insured_ids):
+    """Async services._from_graph: cached answers first, one Neo4j query for the rest"""
+    insured_ids = list(insured_ids)
+    kind = CACHED_LOOKUPS[method]
+    found = await score_cache.aget_many(kind, insured_ids) if score_cache.enabled else {}
+    missing = [insured_id for insured_id in insured_ids if insured_id not in found]
+    if missing:
+        generations = await score_cache.agenerations(missing) if score_cache.enabled else None
+        fetched = await getattr(AsyncNeo4jClient(), method)(missing)
+        if score_cache.enabled:
+            await score_cache.aset_many(kind, fetched, generations)
+        found.update(fetched)
+    return found
+
+
+async def _from_scorer(method, index_method, insured_ids):
+    """Async services._from_scorer, with the same degraded mode"""
+    if settings.FRAUD_SCORER in ('index', 'features'):
+        # The local scorers read PostgreSQL (the index only to build or refresh itself)
+        return await sync_to_async(lambda: getattr(local_scorer(), index_method)(insured_ids))()
+    try:
+        return await _from_graph(method, insured_ids)
+    except Exception as e:
+        if not is_outage(e):
+            raise
+        (logger.debug if isinstance(e, CircuitOpenError) else logger.warning)(
+            f"⚠️ Neo4j unavailable, scoring in degraded mode: {e}")
+        insured_ids = list(insured_ids)
+        found = await score_cache.aget_many(CACHED_LOOKUPS[method], insured_ids) if score_cache.enabled else {}
+        return await sync_to_async(_degraded)(index_method, insured_ids, found)
+
+
+async def ascore_insureds(insured_ids):
+    """{insured_id: shared phone/address score} from the configured scorer"""
+    return await _from_scorer('get_fraud_scores', 'scores', insured_ids)
+
+
+async def ashared_attributes(insured_ids):
+    """{insured_id: {"phone": [other ids], "address": [other ids]}} from the configured scorer"""
+    return await _from_scorer('get_shared_attributes', 'shared_attributes', insured_ids)
+
+
+# ================ NATS ================
+_nats_clients = weakref.WeakKeyDictionary()  # event loop -> connected NATSClient
+
+
+async def get_nats_client():
+    """The running loop's NATS connection, opened on first use"""
+    loop = asyncio.get_running_loop()
+    client = _nats_clients.get(loop)
+    if client is None or client.nc is None or client.nc.is_closed:
+        client = NATSClient()
+        if not await client.connect():
+            raise ConnectionError(f"NATS is unreachable at {client.server}")
+        _nats_clients[loop] = client
+    return client
+
+
+async def apublish_fraud_alerts(alerts):
+    """Publish saved alerts right away; returns the ones JetStream acknowledged.
+
+    The alert id is the message version, so an alert the outbox relay also
+    publishes later is dropped as a duplicate by the stream.
+    """
+    try:
+        client = await asyncio.wait_for(get_nats_client(), timeout=settings.NATS_PUBLISH_TIMEOUT)
+    except (ConnectionError, asyncio.TimeoutError) as e:
+        logger.warning(f"⚠️ NATS publish deferred to the outbox relay: {e}")
+        return []
+    results = await asyncio.gather(
+        *(asyncio.wait_for(client.publish_fraud_alert(alert.claim_id, alert.fraud_score, alert.signals,
+                                                      version=alert.id),
+                           timeout=settings.NATS_PUBLISH_TIMEOUT)
+          for alert in alerts),
+        return_exceptions=True,
+    )
+    published = []
+    for alert, result in zip(alerts, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"⚠️ NATS publish deferred to the outbox relay: {result!r}")
+        else:
+            published.append(alert)
+    return published
@@ -0,0 +1,261 @@
+# backend/django_project/claims/benchmark.py
+"""Intake benchmark: concurrent Insured/Claim saves through the real
+save -> signal -> outbox -> relay path, timed per component.
+
+Neo4j and NATS can be replaced by in-memory fakes with an optional
+simulated round trip, so runs are reproducible offline and comparable
+between commits (see `manage.py benchmark_intake`).
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+from . import outbox
+from .fraud_index import SharedAttributeIndex
+from .models import Insured, Claim, OutboxEvent
+from .score_cache import score_cache
+from .services import Neo4jClient, _insured_params
+
+# Neo4jClient methods the intake path calls
+GRAPH_METHODS = ('create_insured_node', 'upsert_insureds', 'delete_insured_nodes', 'get_fraud_scores',
+                 'get_shared_attributes', 'ensure_schema')
+PERCENTILES = (50, 95, 99)
+
+
+def latency_stats(samples):
+    """Count, busy seconds and mean/p50/p95/p99 latency in milliseconds"""
+    if not samples:
+        return {"count": 0, "total_seconds": 0.0}
+    ms = np.array(samples) * 1000
+    stats = {"count": len(samples), "total_seconds": round(float(ms.sum()) / 1000, 4),
+             "mean_ms": round(float(ms.mean()), 3)}
+    for percentile, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        stats[f"p{percentile}_ms"] = round(float(value), 3)
+    return stats
+
+
+class Timings:
+    """Thread-safe latency samples per component"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, component, seconds):
+        with self.lock:
+            self.samples[component].append(seconds)
+
+    def total(self, *components):
+        with self.lock:
+            return sum(sum(self.samples[component]) for component in components)
+
+    def stats(self, *components):
+        with self.lock:
+            return latency_stats([s for component in components for s in self.samples[component]])
+
+
+def timed(timings, component, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.record(component, time.perf_counter() - started)
+    return wrapper
+
+
+def timed_publish(timings, publish):
+    """Time a non-blocking publish from the call until its Future resolves (the JetStream ack)"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        future = publish(*args, **kwargs)
+        future.add_done_callback(lambda _: timings.record('nats', time.perf_counter() - started))
+        return future
+    return wrapper
+
+
+# ================ Fakes ================
+class FakeGraph:
+    """In-memory stand-in for Neo4jClient that gives the graph's answers (via SharedAttributeIndex)"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.index = SharedAttributeIndex()
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_insured_node(self, insured):
+        self.upsert_insureds([_insured_params(insured)])
+
+    def upsert_insureds(self, rows):
+        self.round_trip()
+        for row in rows:
+            self.index.add(row["id"], row["phone"], row["address"])
+        return len(rows)
+
+    def delete_insured_nodes(self, insured_ids):
+        self.round_trip()
+        for insured_id in insured_ids:
+            self.index.remove(insured_id)
+
+    def get_fraud_scores(self, insured_ids):
+        self.round_trip()
+        return self.index.scores(list(insured_ids))
+
+    def get_shared_attributes(self, insured_ids):
+        self.round_trip()
+        return self.index.shared_attributes(list(insured_ids))
+
+    def ensure_schema(self):
+        pass
+
+
+class FakeBroker:
+    """Stand-in for the NATS publisher: every publish is acked ``latency`` seconds later, concurrently"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.published = []
+        self.executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fake-nats")
+
+    def publish_fraud_alert(self, claim_id, fraud_score, signals, version=None):
+        self.published.append(claim_id)
+        return self.executor.submit(time.sleep, self.latency)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+@contextmanager
+def instrumented(timings, fakes=True, graph_latency=0.0, nats_latency=0.0):
+    """Time every Neo4j call, NATS publish and relay batch, swapping in the fakes when ``fakes``"""
+    graph, broker = FakeGraph(graph_latency), FakeBroker(nats_latency)
+    with ExitStack() as stack:
+        stack.callback(broker.close)
+        for name in GRAPH_METHODS:
+            if fakes:
+                call = lambda client, *args, _method=getattr(graph, name), **kwargs: _method(*args, **kwargs)
+            else:
+                call = getattr(Neo4jClient, name)
+            stack.enter_context(mock.patch.object(Neo4jClient, name, timed(timings, 'neo4j', call)))
+        publish = broker.publish_fraud_alert if fakes else outbox.publish_fraud_alert
+        stack.enter_context(mock.patch.object(outbox, 'publish_fraud_alert', timed_publish(timings, publish)))
+        # Wall time of the alert handler: publishes plus waiting for their acks
+        stack.enter_context(mock.patch.dict(outbox.HANDLERS, {
+            OutboxEvent.FRAUD_ALERT: timed(timings, 'nats_handler', outbox.HANDLERS[OutboxEvent.FRAUD_ALERT]),
+        }))
+        yield graph, broker
+
+
+# ================ Runner ================
+def _code_prefix():
+    """A 4-digit national-code prefix no existing insured uses"""
+    while True:
+        prefix = f"0{random.randrange(1000):03d}"
+        if not Insured.objects.filter(national_code__startswith=prefix).exists():
+            return prefix
+
+
+def _split(count, parts):
+    return [range(part, count, parts) for part in range(parts) if part < count]
+
+
+def run_intake(timings, insureds=200, claims_per_insured=2, concurrency=8, relays=1, shared_ratio=0.1,
+               batch_size=None):
+    """Create the insureds and claims from ``concurrency`` threads, then drain the outbox with ``relays``
+    threads. Returns the report (see benchmark_intake) without the run metadata."""
+    prefix = _code_prefix()
+    # Every 1/shared_ratio-th insured reuses the previous insured's phone, so alerts are raised
+    share_every = round(1 / shared_ratio) if shared_ratio > 0 else 0
+    first_event = OutboxEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    today = timezone.localdate()
+
+    def create(indexes):
+        try:
+            for n in indexes:
+                phone = n - 1 if share_every and n and n % share_every == 0 else n
+                started = time.perf_counter()
+                insured = Insured.objects.create(national_code=f"{prefix}{n:06d}", full_name=f"Benchmark {n}",
+                                                 phone_number=f"0913{phone:07d}", address=f"Benchmark street {n}")
+                timings.record('insured_save', time.perf_counter() - started)
+                for _ in range(claims_per_insured):
+                    started = time.perf_counter()
+                    Claim.objects.create(insured=insured, amount=random.randrange(1, 10 ** 9),
+                                         accident_date=today, description="Benchmark claim")
+                    timings.record('claim_save', time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    def relay():
+        try:
+            while timed(timings, 'relay_batch', outbox.relay_outbox)(batch_size):
+                pass
+        finally:
+            connection.close()
+
+    score_cache.clear()
+    score_cache.reset_stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-intake") as executor:
+        list(executor.map(create, _split(insureds, concurrency)))
+    intake_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=relays, thread_name_prefix="bench-relay") as executor:
+        list(executor.map(lambda _: relay(), range(relays)))
+    relay_seconds = time.perf_counter() - started
+
+    events = OutboxEvent.objects.filter(pk__gt=first_event)
+    claims = insureds * claims_per_insured
+    graph_seconds = timings.total('neo4j')
+    nats_seconds = timings.total('nats_handler')
+    return {
+        "prefix": prefix,
+        "first_event": first_event,
+        "intake": {
+            "seconds": round(intake_seconds, 4),
+            "claims_per_sec": round(claims / intake_seconds, 1) if intake_seconds else None,
+            "insured_save": timings.stats('insured_save'),
+            "claim_save": timings.stats('claim_save'),
+        },
+        "relay": {
+            "seconds": round(relay_seconds, 4),
+            "claims_per_sec": round(claims / relay_seconds, 1) if relay_seconds else None,
+            "batches": timings.stats('relay_batch'),
+            "undelivered_events": events.filter(processed_at__isnull=True).count(),
+            "alerts": events.filter(topic=OutboxEvent.FRAUD_ALERT).count(),
+        },
+        "end_to_end_claims_per_sec": round(claims / (intake_seconds + relay_seconds), 1),
+        "components": {
+            "postgres": timings.stats('insured_save', 'claim_save'),
+            "neo4j": timings.stats('neo4j'),
+            "nats": timings.stats('nats'),
+        },
+        # Busy (summed thread) seconds; relay time not spent in Neo4j or NATS is PostgreSQL and Python
+        "busy_seconds": {
+            "postgres": round(timings.total('insured_save', 'claim_save')
+                              + max(0.0, timings.total('relay_batch') - graph_seconds - nats_seconds), 4),
+            "neo4j": round(graph_seconds, 4),
+            "nats": round(nats_seconds, 4),
+        },
+        "score_cache": score_cache.stats(),
+    }
+
+
+def cleanup(report, batch_size=None):
+    """Remove what run_intake created from a shared database (claims, insureds, outbox events)"""
+    insureds = Insured.objects.filter(national_code__startswith=report["prefix"])
+    Claim.objects.filter(insured__in=insureds).delete()
+    insureds.delete()
+    # Deliver the insured.delete events (graph cleanup on a live run) before dropping the events
+    while outbox.relay_outbox(batch_size):
+        pass
+    OutboxEvent.objects.filter(pk__gt=report["first_event"]).delete()
@@ -0,0 +1,142 @@
+# backend/django_project/claims/circuit_breaker.py
+"""Circuit breaker in front of Neo4j.
+
+Without it every lookup waits out the connect or query timeout before its
+caller falls back, so one graph outage stalls each admin row, API request
+and relay batch in turn. After NEO4J_BREAKER_FAILURES consecutive failures
+the breaker opens and calls raise CircuitOpenError at once; it is a
+ServiceUnavailable, so the existing "Neo4j is down" handling (the scorer
+fallback, relay retries with backoff) applies unchanged. After
+NEO4J_BREAKER_RESET_TIMEOUT seconds one call is let through as a probe
+(half-open): a success closes the breaker, a failure opens it again.
+
+Each process has its own breaker (neo4j_breaker).
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from django.conf import settings
+from neo4j.exceptions import DriverError, Neo4jError, ServiceUnavailable, TransientError
+from .metrics import NEO4J_BREAKER_STATE, NEO4J_BREAKER_TRIPS, NEO4J_CALLS_REJECTED
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """Raised instead of calling Neo4j while the breaker is open"""
+
+
+def is_outage(error):
+    """Errors saying the graph is unreachable or overloaded, as opposed to a bad query or a bug.
+
+    From the driver: DriverError (ServiceUnavailable, SessionExpired, pool
+    timeouts), socket errors, and the ValueError("Cannot resolve address
+    ...") of a stopped container. From the server: transient errors and
+    query timeouts. Anything else, such as a TypeError in our code, is not.
+    """
+    if isinstance(error, Neo4jError):
+        # Query timeouts (NEO4J_QUERY_TIMEOUT) are client errors on the server side
+        return isinstance(error, TransientError) or 'TransactionTimedOut' in (error.code or '')
+    if isinstance(error, ValueError):
+        return str(error).startswith('Cannot resolve address')
+    return isinstance(error, (DriverError, OSError))
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold, reset_timeout, state_gauge=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout  # seconds open before a probe
+        self.state_gauge = state_gauge  # Gauge labelled by state, 1 for the current one
+        self.lock = threading.Lock()
+        self.reset()
+
+    def _set_state(self, state):
+        self.state = state
+        if self.state_gauge is not None:
+            for each in (CLOSED, OPEN, HALF_OPEN):
+                self.state_gauge.labels(state=each).set(int(each == state))
+
+    def reset(self):
+        with self.lock:
+            self._set_state(CLOSED)
+            self.failures = 0
+            self.opened_at = None  # monotonic time the breaker opened or its last probe started
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            # One probe per reset_timeout; a probe that never reported (cancelled) is replaced by the next
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                self.opened_at = time.monotonic()
+                logger.info(f"🔌 {self.name} circuit half-open, probing")
+                return
+        NEO4J_CALLS_REJECTED.inc()
+        raise CircuitOpenError(f"{self.name} circuit open after {self.failures} consecutive failures")
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info(f"✅ {self.name} circuit closed")
+                self._set_state(CLOSED)
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._set_state(OPEN)
+                self.opened_at = time.monotonic()
+                NEO4J_BREAKER_TRIPS.inc()
+                logger.warning(f"⚠️ {self.name} circuit open after {self.failures} consecutive failures; "
+                               f"probing again in {self.reset_timeout:g}s")
+
+    def _record(self, error):
+        if is_outage(error):
+            self.record_failure()
+        elif isinstance(error, Neo4jError):
+            # Any answer from the server, even an error about the query, means it is up
+            self.record_success()
+        # Anything else is a bug on our side and says nothing about the graph
+
+    def guard(self, function):
+        """Decorator: fail fast while open, record the outcome of every call (coroutine functions included)"""
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                self.allow()
+                try:
+                    result = await function(*args, **kwargs)
+                except Exception as e:
+                    self._record(e)
+                    raise
+                self.record_success()
+                return result
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            self.allow()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                self._record(e)
+                raise
+            self.record_success()
+            return result
+        return wrapper
+
+
+neo4j_breaker = CircuitBreaker('Neo4j', settings.NEO4J_BREAKER_FAILURES, settings.NEO4J_BREAKER_RESET_TIMEOUT,
+                               state_gauge=NEO4J_BREAKER_STATE)
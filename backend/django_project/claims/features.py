@@ -0,0 +1,169 @@
+# backend/django_project/claims/features.py
+"""Per-insured risk features materialized in PostgreSQL (InsuredFeatures).
+
+One row per insured with its phone/address sharer counts, ring size, claim
+count, total claimed amount and last claim time, so scoring
+(FRAUD_SCORER = 'features'), the admin and reports read an indexed row
+instead of traversing the graph.
+
+Rows are kept current by the outbox relay: insured saves and deletes
+re-key the insured and recount the sharers of its old and new phone and
+address in SQL, claim saves and deletes recompute the insured's claim
+totals, and ring merges update ring_size (claims/rings.py). Every update
+recomputes from the source rows, so a redelivered event is harmless.
+rebuild_features() (`manage.py rebuild_features`) recomputes the table in
+bulk.
+"""
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .fraud_index import ADDRESS_WEIGHT, PHONE_WEIGHT
+from .models import Insured, Claim, InsuredFeatures
+from .normalization import normalize_address, normalize_phone
+
+logger = logging.getLogger(__name__)
+
+CLAIM_FIELDS = ['claim_count', 'total_amount', 'last_claim_at']
+
+
+def feature_keys(phone, address):
+    """(phone key, address key): the graph's normalized values, the address as a fixed-size digest"""
+    address = hashlib.blake2b(normalize_address(address).encode(), digest_size=16).hexdigest()
+    return normalize_phone(phone), address
+
+
+def _claim_totals(insured_ids=None):
+    """{insured_id: (claim count, total amount, last claim time)} in one grouped query"""
+    claims = Claim.objects.order_by()
+    if insured_ids is not None:
+        claims = claims.filter(insured_id__in=insured_ids)
+    rows = claims.values('insured').annotate(count=Count('id'), total=Sum('amount'), last=Max('created_at'))
+    return {row['insured']: (row['count'], row['total'] or 0, row['last']) for row in rows.iterator()}
+
+
+def _sharers(key):
+    """UPDATE expression: the other rows with the same ``key``"""
+    same_key = (InsuredFeatures.objects.filter(**{key: OuterRef(key)}).order_by()
+                .values(key).annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(same_key, output_field=IntegerField()), 1) - 1
+
+
+def _recount(phone_keys, address_keys):
+    """Recount the sharers (and shared_score) of every row on the given phones/addresses"""
+    InsuredFeatures.objects.filter(phone_key__in=phone_keys).update(phone_sharers=_sharers('phone_key'))
+    InsuredFeatures.objects.filter(address_key__in=address_keys).update(address_sharers=_sharers('address_key'))
+    InsuredFeatures.objects.filter(Q(phone_key__in=phone_keys) | Q(address_key__in=address_keys)).update(
+        shared_score=F('phone_sharers') * PHONE_WEIGHT + F('address_sharers') * ADDRESS_WEIGHT)
+
+
+# ================ Incremental Updates ================
+@transaction.atomic
+def refresh_features(insured_ids):
+    """Relay hook for insured.upsert/insured.delete: re-key the insureds and recount their sharers"""
+    insured_ids = set(insured_ids)
+    old = {row[0]: row[1:] for row in InsuredFeatures.objects.filter(pk__in=insured_ids)
+           .values_list('pk', 'phone_key', 'address_key')}
+    totals = _claim_totals(insured_ids)
+    features = []
+    for insured_id, phone, address, ring_size in (Insured.objects.filter(pk__in=insured_ids)
+                                                  .values_list('id', 'phone_number', 'address', 'ring_size')):
+        phone_key, address_key = feature_keys(phone, address)
+        claim_count, total_amount, last_claim_at = totals.get(insured_id, (0, 0, None))
+        features.append(InsuredFeatures(insured_id=insured_id, phone_key=phone_key, address_key=address_key,
+                                        ring_size=ring_size, claim_count=claim_count, total_amount=total_amount,
+                                        last_claim_at=last_claim_at))
+    InsuredFeatures.objects.bulk_create(
+        features, batch_size=1000, update_conflicts=True, unique_fields=['insured'],
+        update_fields=['phone_key', 'address_key', 'ring_size', *CLAIM_FIELDS, 'updated_at'],
+    )
+    deleted = insured_ids - {feature.insured_id for feature in features}
+    if deleted:
+        InsuredFeatures.objects.filter(pk__in=deleted).delete()
+    # Old keys: the former sharers of a moved or deleted insured have one sharer less
+    _recount({keys[0] for keys in old.values()} | {feature.phone_key for feature in features},
+             {keys[1] for keys in old.values()} | {feature.address_key for feature in features})
+    return len(features)
+
+
+def refresh_claim_totals(insured_ids):
+    """Relay hook for claim changes: recompute the insureds' claim count, total amount and last claim"""
+    totals = _claim_totals(insured_ids)
+    features = list(InsuredFeatures.objects.filter(pk__in=insured_ids).only('pk', *CLAIM_FIELDS))
+    for feature in features:
+        feature.claim_count, feature.total_amount, feature.last_claim_at = totals.get(feature.pk, (0, 0, None))
+    InsuredFeatures.objects.bulk_update(features, CLAIM_FIELDS, batch_size=1000)
+    return len(features)
+
+
+# ================ Full Rebuild ================
+def rebuild_features(chunk_size=10000, progress=None):
+    """Recompute the whole table in one transaction (readers keep the old rows until it commits).
+
+    Sharers are counted in memory from the normalized keys, claim totals come
+    from one grouped query; ``progress(written)`` is called per chunk.
+    """
+    rows = []
+    phones, addresses = Counter(), Counter()
+    for insured_id, phone, address, ring_size in (Insured.objects.order_by()
+                                                  .values_list('id', 'phone_number', 'address', 'ring_size')
+                                                  .iterator(chunk_size=chunk_size)):
+        phone_key, address_key = feature_keys(phone, address)
+        phones[phone_key] += 1
+        addresses[address_key] += 1
+        rows.append((insured_id, phone_key, address_key, ring_size))
+    totals = _claim_totals()
+
+    with transaction.atomic():
+        InsuredFeatures.objects.all().delete()
+        for start in range(0, len(rows), chunk_size):
+            features = []
+            for insured_id, phone_key, address_key, ring_size in rows[start:start + chunk_size]:
+                phone_sharers, address_sharers = phones[phone_key] - 1, addresses[address_key] - 1
+                claim_count, total_amount, last_claim_at = totals.get(insured_id, (0, 0, None))
+                features.append(InsuredFeatures(
+                    insured_id=insured_id, phone_key=phone_key, address_key=address_key,
+                    phone_sharers=phone_sharers, address_sharers=address_sharers,
+                    shared_score=phone_sharers * PHONE_WEIGHT + address_sharers * ADDRESS_WEIGHT,
+                    ring_size=ring_size, claim_count=claim_count, total_amount=total_amount,
+                    last_claim_at=last_claim_at,
+                ))
+            InsuredFeatures.objects.bulk_create(features, batch_size=1000)
+            if progress:
+                progress(start + len(features))
+    logger.info(f"✅ Insured features rebuilt ({len(rows)} insureds)")
+    return len(rows)
+
+
+# ================ Scoring ================
+class FeatureScorer:
+    """The scorer lookups (see services._from_scorer) answered from InsuredFeatures"""
+
+    def scores(self, insured_ids):
+        """{insured_id: score}, same shape as Neo4jClient.get_fraud_scores"""
+        scores = dict.fromkeys(insured_ids, 0)
+        scores.update(InsuredFeatures.objects.filter(pk__in=scores).values_list('pk', 'shared_score'))
+        return scores
+
+    def shared_attributes(self, insured_ids):
+        """Same shape as Neo4jClient.get_shared_attributes, in two indexed queries"""
+        shared = {insured_id: {"phone": [], "address": []} for insured_id in insured_ids}
+        keys = {pk: (phone_key, address_key) for pk, phone_key, address_key in
+                InsuredFeatures.objects.filter(pk__in=shared).values_list('pk', 'phone_key', 'address_key')}
+        if not keys:
+            return shared
+        phones, addresses = defaultdict(list), defaultdict(list)
+        for pk, phone_key, address_key in (InsuredFeatures.objects
+                                           .filter(Q(phone_key__in={k[0] for k in keys.values()}) |
+                                                   Q(address_key__in={k[1] for k in keys.values()}))
+                                           .values_list('pk', 'phone_key', 'address_key')):
+            phones[phone_key].append(pk)
+            addresses[address_key].append(pk)
+        for insured_id, (phone_key, address_key) in keys.items():
+            shared[insured_id] = {
+                "phone": [other for other in phones[phone_key] if other != insured_id],
+                "address": [other for other in addresses[address_key] if other != insured_id],
+            }
+        return shared
@@ -0,0 +1,216 @@
+# backend/django_project/claims/fraud_index.py
+"""In-process index of which insureds share a phone number or an address.
+
+It answers the same question as Neo4jClient.get_fraud_score (30 points per
+other insured on the same phone, 20 per other insured on the same address)
+from memory, so it can serve as the hot-path scorer (FRAUD_SCORER = 'index')
+or as the fallback when Neo4j is unreachable.
+
+Keys are the normalized, interned strings and each key maps to a compact array of insured
+ids. The index is built from PostgreSQL on first use, updated in place after
+local Insured saves commit, and catches up with saves made by other
+processes by tailing the outbox (see claims/outbox.py).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .normalization import normalize_address, normalize_phone
+
+logger = logging.getLogger(__name__)
+
+PHONE_WEIGHT = 30
+ADDRESS_WEIGHT = 20
+
+
+def phone_key(phone):
+    """Key a phone exactly as the graph MERGEs it (see claims/normalization.py)"""
+    return sys.intern(normalize_phone(phone))
+
+
+def address_key(address):
+    return sys.intern(normalize_address(address))
+
+
+class SharedAttributeIndex:
+    def __init__(self):
+        self.phones = {}      # phone key -> array of insured ids
+        self.addresses = {}   # address key -> array of insured ids
+        self.insureds = {}    # insured id -> (phone key, address key)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.insureds)
+
+    # ---------------- writes ----------------
+    def add(self, insured_id, phone, address):
+        """Insert or update one insured"""
+        keys = phone_key(phone), address_key(address)
+        with self.lock:
+            current = self.insureds.get(insured_id)
+            if current == keys:
+                return
+            if current is not None:
+                self._unlink(insured_id, current)
+            self.insureds[insured_id] = keys
+            self.phones.setdefault(keys[0], array('q')).append(insured_id)
+            self.addresses.setdefault(keys[1], array('q')).append(insured_id)
+
+    def remove(self, insured_id):
+        with self.lock:
+            current = self.insureds.pop(insured_id, None)
+            if current is not None:
+                self._unlink(insured_id, current)
+
+    def _unlink(self, insured_id, keys):
+        phone_key, address_key = keys
+        for table, key in ((self.phones, phone_key), (self.addresses, address_key)):
+            ids = table[key]
+            ids.remove(insured_id)
+            if not ids:
+                del table[key]
+
+    # ---------------- reads ----------------
+    def sharer_counts(self, insured_id):
+        """(other insureds on the same phone, other insureds on the same address)"""
+        keys = self.insureds.get(insured_id)
+        if keys is None:
+            return 0, 0
+        phone_key, address_key = keys
+        return len(self.phones[phone_key]) - 1, len(self.addresses[address_key]) - 1
+
+    def score(self, insured_id):
+        phone_sharers, address_sharers = self.sharer_counts(insured_id)
+        return phone_sharers * PHONE_WEIGHT + address_sharers * ADDRESS_WEIGHT
+
+    def scores(self, insured_ids):
+        """{insured_id: score}, same shape as Neo4jClient.get_fraud_scores"""
+        with self.lock:
+            return {insured_id: self.score(insured_id) for insured_id in insured_ids}
+
+    def shared_attributes(self, insured_ids):
+        """Same shape as Neo4jClient.get_shared_attributes"""
+        shared = {}
+        with self.lock:
+            for insured_id in insured_ids:
+                keys = self.insureds.get(insured_id)
+                if keys is None:
+                    shared[insured_id] = {"phone": [], "address": []}
+                    continue
+                shared[insured_id] = {
+                    "phone": [other for other in self.phones[keys[0]] if other != insured_id],
+                    "address": [other for other in self.addresses[keys[1]] if other != insured_id],
+                }
+        return shared
+
+
+# ================ Process-wide Index ================
+def changed_insured_ids(since):
+    """Ids of the insureds saved or deleted since ``since`` (minus the overlap window), from the outbox"""
+    from .models import OutboxEvent
+    ids = set()
+    payloads = OutboxEvent.objects.filter(
+        topic__in=[OutboxEvent.INSURED_UPSERT, OutboxEvent.INSURED_DELETE],
+        created_at__gte=since - timedelta(seconds=settings.FRAUD_INDEX_REFRESH_OVERLAP),
+    ).values_list('payload', flat=True)
+    for payload in payloads:
+        # {"id": ...} from signals, {"ids": [...]} from bulk imports
+        ids.update(payload.get('ids') or [payload['id']])
+    return ids
+
+
+class ProcessFraudIndex(SharedAttributeIndex):
+    """SharedAttributeIndex loaded from PostgreSQL and kept current from the outbox"""
+
+    def __init__(self):
+        super().__init__()
+        self.built_at = None
+        self.refreshed_at = None
+
+    def build(self):
+        from .models import Insured
+        with self.lock:
+            started = timezone.now()
+            self.phones, self.addresses, self.insureds = {}, {}, {}
+            rows = Insured.objects.values_list('id', 'phone_number', 'address').iterator(chunk_size=10000)
+            for insured_id, phone, address in rows:
+                self.add(insured_id, phone, address)
+            self.built_at = self.refreshed_at = started
+            self._last_check = time.monotonic()
+        logger.info(f"✅ Fraud index built ({len(self)} insureds)")
+
+    def refresh(self):
+        """Apply Insured changes recorded in the outbox since the last refresh.
+
+        Events are re-read with an overlap window because outbox ids can commit
+        out of order; re-applying a change is harmless since each insured is
+        reloaded from its current PostgreSQL row.
+        """
+        from .models import Insured
+        with self.lock:
+            started = timezone.now()
+            ids = changed_insured_ids(self.refreshed_at)
+            if ids:
+                current = {row[0]: row for row in Insured.objects.filter(pk__in=ids)
+                           .values_list('id', 'phone_number', 'address')}
+                for insured_id in ids:
+                    if insured_id in current:
+                        self.add(*current[insured_id])
+                    else:
+                        self.remove(insured_id)
+            self.refreshed_at = started
+            self._last_check = time.monotonic()
+
+    def maybe_refresh(self):
+        if time.monotonic() - self._last_check < settings.FRAUD_INDEX_REFRESH_INTERVAL:
+            return
+        if timezone.now() - self.built_at > timedelta(seconds=settings.FRAUD_INDEX_REBUILD_INTERVAL):
+            self.build()
+        else:
+            self.refresh()
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_fraud_index():
+    """Return this process's index, building it on first use"""
+    global _index, _index_pid
+    pid = os.getpid()
+    with _index_lock:
+        if _index is None or _index_pid != pid:
+            index = ProcessFraudIndex()
+            index.build()
+            _index, _index_pid = index, pid
+    _index.maybe_refresh()
+    return _index
+
+
+def loaded_fraud_index():
+    """The index if this process has already built it, else None (never triggers a build)"""
+    if _index is not None and _index_pid == os.getpid():
+        return _index
+    return None
+
+
+def reset_fraud_index():
+    global _index, _index_pid
+    with _index_lock:
+        _index, _index_pid = None, None
+
+
+def warm_fraud_index():
+    """Build the index at process startup when FRAUD_INDEX_WARM_ON_STARTUP is set"""
+    if not settings.FRAUD_INDEX_WARM_ON_STARTUP:
+        return
+    try:
+        get_fraud_index()
+    except Exception as e:
+        logger.warning(f"⚠️ Fraud index warm-up skipped, it will be built on first use: {e}")
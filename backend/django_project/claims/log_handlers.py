@@ -0,0 +1,47 @@
+# backend/django_project/claims/log_handlers.py
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from .metrics import LOG_RECORDS_DROPPED
+
+
+class QueueStreamHandler(QueueHandler):
+    """Non-blocking stream handler for hot paths (used from settings.LOGGING).
+
+    The calling thread only formats the record and puts it on a bounded
+    queue; a listener thread does the stream I/O. When the queue is full
+    the record is dropped and counted (log_records_dropped_total) instead
+    of blocking a save on a slow terminal or log collector.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.stream = stream or sys.stdout
+        self._start_listener()
+
+    def _start_listener(self):
+        self.pid = os.getpid()
+        self.listener = QueueListener(self.queue, logging.StreamHandler(self.stream))
+        self.listener.start()
+        atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        # Flushes what is still queued; safe to call more than once
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            # The listener thread does not survive a fork (gunicorn --preload)
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def close(self):
+        self._stop_listener()
+        super().close()
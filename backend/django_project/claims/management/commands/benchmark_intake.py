@@ -0,0 +1,165 @@
+# backend/django_project/claims/management/commands/benchmark_intake.py
+import contextlib
+import json
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from claims.benchmark import Timings, instrumented, run_intake, cleanup
+from claims.models import OutboxEvent
+
+# (path in the report, higher is better) compared by --compare
+COMPARED_METRICS = [
+    (('intake', 'claims_per_sec'), True),
+    (('relay', 'claims_per_sec'), True),
+    (('end_to_end_claims_per_sec',), True),
+    (('intake', 'claim_save', 'p50_ms'), False),
+    (('intake', 'claim_save', 'p95_ms'), False),
+    (('intake', 'claim_save', 'p99_ms'), False),
+    (('components', 'neo4j', 'p95_ms'), False),
+    (('components', 'nats', 'p95_ms'), False),
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=settings.BASE_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _lookup(report, path):
+    for key in path:
+        report = report.get(key) if isinstance(report, dict) else None
+    return report
+
+
+class Command(BaseCommand):
+    help = ('Benchmark claim intake: concurrent Insured/Claim saves through the signal/outbox path, '
+            'then the relay, with latency percentiles per PostgreSQL, Neo4j and NATS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--insureds', type=int, default=200)
+        parser.add_argument('--claims-per-insured', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads saving insureds and claims')
+        parser.add_argument('--relays', type=int, default=1, help='Threads draining the outbox afterwards')
+        parser.add_argument('--shared-ratio', type=float, default=0.1,
+                            help='Fraction of insureds sharing a phone number (raises alerts)')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Outbox events per relay batch')
+        parser.add_argument('--live', action='store_true',
+                            help='Use the configured Neo4j and NATS instead of in-memory fakes')
+        parser.add_argument('--graph-latency', type=float, default=0.0,
+                            help='Simulated Neo4j round trip of the fake graph, in milliseconds')
+        parser.add_argument('--nats-latency', type=float, default=0.0,
+                            help='Simulated JetStream ack delay of the fake broker, in milliseconds')
+        parser.add_argument('--in-place', action='store_true',
+                            help='Run against the configured database (rows are removed afterwards) '
+                                 'instead of a throwaway test database')
+        parser.add_argument('--output', help='Write the report as JSON to this file')
+        parser.add_argument('--compare', help='A previous JSON report to compare against')
+        parser.add_argument('--max-regression', type=float,
+                            help='With --compare: fail when a metric is this many percent worse')
+
+    def handle(self, *args, **options):
+        for option in ('insureds', 'claims_per_insured', 'concurrency', 'relays', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+        if connection.vendor == 'sqlite' and (options['concurrency'] > 1 or options['relays'] > 1):
+            raise CommandError('SQLite locks whole tables on write; use --concurrency 1 --relays 1 '
+                               '(or benchmark against PostgreSQL)')
+        if not 0 <= options['shared_ratio'] <= 1:
+            raise CommandError('--shared-ratio must be between 0 and 1')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        timings = Timings()
+        with instrumented(timings, fakes=not options['live'], graph_latency=options['graph_latency'] / 1000,
+                          nats_latency=options['nats_latency'] / 1000):
+            with self.database(options['in_place']):
+                report = run_intake(timings, insureds=options['insureds'],
+                                    claims_per_insured=options['claims_per_insured'],
+                                    concurrency=options['concurrency'], relays=options['relays'],
+                                    shared_ratio=options['shared_ratio'], batch_size=options['batch_size'])
+                if options['in_place']:
+                    cleanup(report, options['batch_size'])
+
+        for key in ('prefix', 'first_event'):
+            del report[key]
+        report = {
+            "commit": _git_commit(),
+            "timestamp": timezone.now().isoformat(),
+            "config": {
+                **{key: options[key] for key in ('insureds', 'claims_per_insured', 'concurrency', 'relays',
+                                                 'shared_ratio', 'batch_size', 'graph_latency', 'nats_latency')},
+                "backends": "live" if options['live'] else "fakes",
+                "in_place": options['in_place'],
+                "database": connection.vendor,
+                "fraud_scorer": settings.FRAUD_SCORER,
+                "score_cache": settings.FRAUD_SCORE_CACHE,
+            },
+            **report,
+        }
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Report written to {options['output']}"))
+        if baseline is not None:
+            self.compare(baseline, report, options['max_regression'])
+
+    @contextlib.contextmanager
+    def database(self, in_place):
+        """A migrated throwaway test database, or the configured one after checking the outbox is idle"""
+        if in_place:
+            # The benchmark's relay would deliver (to the fakes) whatever else is pending
+            if OutboxEvent.objects.filter(processed_at__isnull=True).exists():
+                raise CommandError('The outbox has pending events; drain it (or stop other writers) first')
+            yield
+            return
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def print_report(self, report):
+        intake, relay = report['intake'], report['relay']
+        self.stdout.write(f"Intake: {intake['claims_per_sec']} claims/sec over {intake['seconds']}s "
+                          f"({report['config']['concurrency']} threads)")
+        self.stdout.write(f"Relay:  {relay['claims_per_sec']} claims/sec over {relay['seconds']}s, "
+                          f"{relay['alerts']} alerts, {relay['undelivered_events']} undelivered events")
+        self.stdout.write(f"End to end: {report['end_to_end_claims_per_sec']} claims/sec")
+        self.stdout.write(f"{'latency (ms)':<14} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'busy s':>9}")
+        rows = [('insured save', intake['insured_save']), ('claim save', intake['claim_save'])]
+        rows += [(name, stats) for name, stats in report['components'].items()]
+        for name, stats in rows:
+            if not stats['count']:
+                self.stdout.write(f"{name:<14} {0:>7}")
+                continue
+            self.stdout.write(f"{name:<14} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                              f"{stats['p99_ms']:>9.2f} {stats['total_seconds']:>9.3f}")
+        busy = report['busy_seconds']
+        total = sum(busy.values()) or 1
+        self.stdout.write('Busy time: ' + ', '.join(f"{name} {seconds:.3f}s ({seconds / total:.0%})"
+                                                     for name, seconds in busy.items()))
+
+    def compare(self, baseline, report, max_regression):
+        self.stdout.write(f"Compared with {baseline.get('commit') or 'baseline'}:")
+        regressions = []
+        for path, higher_is_better in COMPARED_METRICS:
+            old, new = _lookup(baseline, path), _lookup(report, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            name = '.'.join(path)
+            self.stdout.write(f"  {name:<32} {old:>10} -> {new:>10} ({change:+.1f}%)")
+            if max_regression is not None and worse > max_regression:
+                regressions.append(f"{name} {worse:.1f}% worse")
+        if regressions:
+            raise CommandError(f"Regression over {max_regression}%: {', '.join(regressions)}")
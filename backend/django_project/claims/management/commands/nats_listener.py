@@ -1,18 +1,26 @@
 # backend/django_project/claims/management/commands/nats_listener.py
+from django.conf import settings
 from django.core.management.base import BaseCommand
 import asyncio
-from backend.django_project.claims.nats_client import NATSClient
+from claims.nats_client import NATSClient
 
 
 class Command(BaseCommand):
     help = 'Listen to NATS fraud alerts'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NATS_LISTENER_BATCH_SIZE,
+                            help='Messages fetched from the durable consumer per request')
+        parser.add_argument('--concurrency', type=int, default=settings.NATS_LISTENER_CONCURRENCY,
+                            help='Messages handled in parallel')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting NATS listener'))
 
         async def listen():
             nats = NATSClient()
             await nats.connect()
-            await nats.subscribe_fraud_alerts()
+            await nats.subscribe_fraud_alerts(batch_size=options['batch_size'],
+                                              concurrency=options['concurrency'])
 
-        asyncio.run(listen())
\ No newline at end of file
+        asyncio.run(listen())
@@ -0,0 +1,34 @@
+# backend/django_project/claims/management/commands/near_duplicate_addresses.py
+from django.core.management.base import BaseCommand, CommandError
+from claims.models import Insured
+from claims.normalization import NearDuplicateIndex
+
+
+class Command(BaseCommand):
+    help = 'List addresses that are near duplicates of each other (MinHash/LSH candidate lookup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=0.8,
+                            help='Minimum shingle Jaccard similarity of a reported pair (0-1)')
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Stop after this many pairs')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be in (0, 1]')
+
+        index = NearDuplicateIndex()
+        for insured_id, address in Insured.objects.values_list('id', 'address').iterator(chunk_size=10000):
+            index.add(insured_id, address)
+        self.stdout.write(f'{len(index.addresses)} distinct addresses indexed')
+
+        found = 0
+        for first, second, similarity in index.pairs(options['threshold']):
+            found += 1
+            self.stdout.write(
+                f'⚡ {similarity:.2f}  "{first}" {sorted(index.addresses[first])}'
+                f'  ~  "{second}" {sorted(index.addresses[second])}'
+            )
+            if found >= options['limit']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'✅ {found} near-duplicate address pairs'))
@@ -0,0 +1,35 @@
+# backend/django_project/claims/management/commands/neo4j_schema.py
+from django.core.management.base import BaseCommand
+from claims.services import Neo4jClient, FRAUD_SCORE_QUERY
+
+# Hot lookups and the index operator each one must plan to
+HOT_QUERIES = {
+    'insured by id': ("MATCH (i:Insured {id: $id}) RETURN i", {'id': 0}),
+    'merge phone': ("MERGE (p:Phone {number: $phone}) RETURN p", {'phone': ''}),
+    'merge address': ("MERGE (a:Address {text: $address}) RETURN a", {'address': ''}),
+    'fraud score': (FRAUD_SCORE_QUERY, {'id': 0}),
+}
+INDEX_SEEKS = {'NodeUniqueIndexSeek', 'NodeIndexSeek'}
+
+
+class Command(BaseCommand):
+    help = 'Create Neo4j uniqueness constraints and verify the hot queries use index seeks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Also EXPLAIN the hot queries and report whether they seek an index')
+
+    def handle(self, *args, **options):
+        neo4j = Neo4jClient()
+        neo4j.ensure_schema()
+
+        if options['check']:
+            for name, (query, params) in HOT_QUERIES.items():
+                operators = neo4j.plan_operators(query, **params)
+                if operators & INDEX_SEEKS:
+                    self.stdout.write(self.style.SUCCESS(f'✅ {name}: index seek'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'⚠️ {name}: no index seek ({", ".join(sorted(operators))})'))
+
+        neo4j.close()
+        self.stdout.write(self.style.SUCCESS('✅ Neo4j schema ready!'))
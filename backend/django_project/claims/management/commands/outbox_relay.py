@@ -0,0 +1,60 @@
+# backend/django_project/claims/management/commands/outbox_relay.py
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from claims.fraud_index import warm_fraud_index
+from claims.outbox import relay_outbox, purge_processed, rescore_degraded
+from claims.rings import maybe_recompute_rings
+from claims.score_cache import score_cache
+
+PURGE_INTERVAL = 3600  # seconds
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox events to Neo4j and NATS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Events claimed per transaction')
+        parser.add_argument('--poll-interval', type=float, default=settings.OUTBOX_POLL_INTERVAL,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--retention-days', type=int, default=settings.OUTBOX_RETENTION_DAYS,
+                            help='Delete delivered events older than this')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Starting outbox relay'))
+        batch_size = options['batch_size']
+        retention = timedelta(days=options['retention_days'])
+        last_purge = None
+        warm_fraud_index()
+        maybe_recompute_rings()
+
+        while True:
+            claimed = relay_outbox(batch_size)
+            if claimed:
+                self.stdout.write(f'{claimed} outbox events relayed')
+            if claimed < batch_size:
+                saved = maybe_recompute_rings()
+                if saved:
+                    self.stdout.write(f'Fraud rings recomputed ({saved} insureds updated)')
+                # Claims scored without Neo4j, re-scored once the graph answers again
+                rescored = rescore_degraded(batch_size)
+                if rescored:
+                    self.stdout.write(f'{rescored} claims re-scored after degraded scoring')
+                # Purge while idle, at most once per PURGE_INTERVAL
+                if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purged = purge_processed(timezone.now() - retention)
+                    last_purge = time.monotonic()
+                    if purged:
+                        self.stdout.write(f'{purged} delivered events purged')
+                    stats = score_cache.stats()
+                    self.stdout.write(f"📊 Score cache: {stats['local_hits']} local hits, "
+                                      f"{stats['shared_hits']} shared hits, {stats['misses']} misses "
+                                      f"({stats['hit_rate']:.0%})")
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,24 @@
+# backend/django_project/claims/management/commands/rebuild_features.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from claims.features import rebuild_features
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-insured risk feature table (sharers, ring size, claim totals) in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Rows fetched per PostgreSQL round trip and written per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        started = time.monotonic()
+
+        def progress(written):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{written} insureds written ({written / elapsed if elapsed else 0:,.0f} rows/sec)')
+
+        total = rebuild_features(options['chunk_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f'✅ Insured features rebuilt ({total} insureds)'))
@@ -0,0 +1,114 @@
+# backend/django_project/claims/management/commands/rescore_claims.py
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from claims.models import Claim, FraudAlert
+from claims.outbox import FRAUD_ALERT_THRESHOLD, queue_alert_notifications
+from claims.rules import RuleEngine
+
+OPEN_STATUSES = ['pending', 'fraud']
+# Score buckets of the dry-run distribution
+BUCKETS = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, np.inf]
+
+
+class Command(BaseCommand):
+    help = 'Re-score open claims with the current fraud rules, in bulk and without firing signals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Claims scored per PostgreSQL/Neo4j round trip and bulk_update')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only print how the score distribution and alerts would change')
+        parser.add_argument('--all', action='store_true',
+                            help='Also re-score approved and rejected claims')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        dry_run = options['dry_run']
+
+        claims = Claim.objects.all() if options['all'] else Claim.objects.filter(status__in=OPEN_STATUSES)
+        engine = RuleEngine()
+        before, after = [], []
+        totals = {'scored': 0, 'changed': 0, 'alerts_created': 0, 'alerts_deleted': 0}
+
+        last_pk = 0
+        while True:
+            # Keyset chunks: each chunk is one PostgreSQL query (plus one graph lookup)
+            facts = engine.facts(claims.filter(pk__gt=last_pk).order_by('pk'), limit=chunk_size)
+            if not len(facts):
+                break
+            last_pk = facts.claims[-1].pk
+            old = np.array([claim.fraud_score for claim in facts.claims], dtype=float)
+            marked = np.array([claim.needs_rescore for claim in facts.claims], dtype=bool)
+            new, signals = engine.score(facts)  # sets needs_rescore when scored in degraded mode
+            before.append(old)
+            after.append(new)
+
+            with transaction.atomic():
+                counts = self.apply(facts.claims, old, new, signals, dry_run, marked != facts.degraded)
+            totals['scored'] += len(facts)
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(f"{totals['scored']} claims scored ({totals['changed']} changed)")
+
+        self.report(np.concatenate(before) if before else np.zeros(0),
+                    np.concatenate(after) if after else np.zeros(0))
+        prefix = 'Would have' if dry_run else '✅'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} re-scored {totals['scored']} claims: {totals['changed']} changed, "
+            f"{totals['alerts_created']} alerts created, {totals['alerts_deleted']} alerts deleted"
+        ))
+
+    def apply(self, claims, old, new, signals, dry_run, remarked):
+        """Write changed scores (and needs_rescore flags, ``remarked``) and reconcile alerts for one chunk"""
+        changed = np.flatnonzero((old != new) | remarked | np.array(
+            [claim.fraud_signals != claim_signals for claim, claim_signals in zip(claims, signals)], dtype=bool))
+        flagged = new >= FRAUD_ALERT_THRESHOLD
+        has_alert = np.array([hasattr(claim, 'alert') for claim in claims], dtype=bool)
+        unresolved = np.array([has and not claim.alert.is_resolved for claim, has in zip(claims, has_alert)],
+                              dtype=bool)
+        to_create = np.flatnonzero(flagged & ~has_alert)
+        to_delete = np.flatnonzero(~flagged & unresolved)  # resolved alerts stay as an audit trail
+        to_update = np.flatnonzero(flagged & unresolved)
+        counts = {'changed': len(changed), 'alerts_created': len(to_create), 'alerts_deleted': len(to_delete)}
+        if dry_run:
+            return counts
+
+        # bulk_update/bulk_create/queryset.delete() send no per-row model signals
+        rows = []
+        for i in changed:
+            claims[i].fraud_score = new[i].item()
+            claims[i].fraud_signals = signals[i]
+            rows.append(claims[i])
+        Claim.objects.bulk_update(rows, ['fraud_score', 'fraud_signals', 'needs_rescore'])
+
+        FraudAlert.objects.filter(pk__in=[claims[i].alert.pk for i in to_delete]).delete()
+
+        alerts = []
+        for i in to_update:
+            alert = claims[i].alert
+            alert.fraud_score, alert.signals = new[i].item(), signals[i]
+            alerts.append(alert)
+        FraudAlert.objects.bulk_update(alerts, ['fraud_score', 'signals'])
+
+        created = FraudAlert.objects.bulk_create([
+            FraudAlert(claim=claims[i], fraud_score=new[i].item(), signals=signals[i]) for i in to_create
+        ])
+        queue_alert_notifications(created)
+        return counts
+
+    def report(self, before, after):
+        """Score distribution before and after, per bucket"""
+        old_counts, _ = np.histogram(before, bins=BUCKETS)
+        new_counts, _ = np.histogram(after, bins=BUCKETS)
+        self.stdout.write(f"{'score':>10} {'before':>8} {'after':>8} {'delta':>8}")
+        for low, high, old_count, new_count in zip(BUCKETS, BUCKETS[1:], old_counts, new_counts):
+            label = f"{low}-{high}" if high != np.inf else f"{low}+"
+            self.stdout.write(f"{label:>10} {old_count:>8} {new_count:>8} {new_count - old_count:>+8}")
+        if len(after):
+            self.stdout.write(f"mean {before.mean():.1f} -> {after.mean():.1f}, "
+                              f"flagged (>= {FRAUD_ALERT_THRESHOLD}) "
+                              f"{int((before >= FRAUD_ALERT_THRESHOLD).sum())} -> "
+                              f"{int((after >= FRAUD_ALERT_THRESHOLD).sum())}")
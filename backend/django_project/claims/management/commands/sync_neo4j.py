@@ -1,11 +1,50 @@
 # backend/django_project/claims/management/commands/sync_neo4j.py
-from django.core.management.base import BaseCommand
-from backend.django_project.claims.services import sync_all_to_neo4j
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from claims.services import sync_all_to_neo4j
 
 
 class Command(BaseCommand):
     help = 'Sync all Insured data from PostgreSQL to Neo4j'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Insureds written per UNWIND transaction (default: NEO4J_SYNC_BATCH_SIZE)')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched per PostgreSQL cursor round trip (default: batch size)')
+        parser.add_argument('--since', default=None,
+                            help='Only sync insureds updated at or after this date/datetime (ISO 8601)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Sync this many primary-key ranges concurrently')
+
     def handle(self, *args, **options):
-        sync_all_to_neo4j()
-        self.stdout.write(self.style.SUCCESS('✅ Neo4j sync completed!'))
\ No newline at end of file
+        since = self.parse_since(options['since'])
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        def progress(synced, elapsed):
+            rate = synced / elapsed if elapsed else 0
+            self.stdout.write(f'{synced} insureds synced ({rate:,.0f} rows/sec)')
+
+        total = sync_all_to_neo4j(
+            since=since,
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            progress=progress,
+            workers=options['workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Neo4j sync completed! ({total} insureds)'))
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid --since value: {value}')
+            since = timezone.datetime.combine(day, timezone.datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,112 @@
+# backend/django_project/claims/metrics.py
+"""Prometheus metrics (prometheus_client), served at /metrics.
+
+With several processes (web workers, outbox relay, listener) set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by all of them,
+before they start: each process then writes its samples there and
+/metrics reports the sum over every process, whichever worker answers
+the scrape. Gauges are per live process (``pid`` label) or summed over
+live processes. Without it the numbers are those of the answering process.
+
+The endpoint needs ``Authorization: Bearer <METRICS_TOKEN>``; it is off
+while METRICS_TOKEN is unset.
+"""
+import asyncio
+import functools
+import hmac
+import os
+import time
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# Seconds; from sub-millisecond cache hits to a slow graph query
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def timed(histogram, errors=None, **labels):
+    """Decorator observing the duration of every call (coroutine functions included);
+    calls that raise are also counted in the ``errors`` Counter (same labels).
+    prometheus_client's own ``.time()`` would time only the creation of a coroutine."""
+    observe = (histogram.labels(**labels) if labels else histogram).observe
+    failed = (errors.labels(**labels) if labels else errors).inc if errors is not None else None
+
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception:
+                    if failed is not None:
+                        failed()
+                    raise
+                finally:
+                    observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                if failed is not None:
+                    failed()
+                raise
+            finally:
+                observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def scrape_registry():
+    """The process's own registry, or every process's samples in multiprocess mode"""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for bearers of METRICS_TOKEN"""
+    if not settings.METRICS_TOKEN:
+        return JsonResponse({'detail': 'Metrics are disabled (METRICS_TOKEN is not set).'}, status=404)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        response = JsonResponse({'detail': 'A valid metrics bearer token is required.'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(generate_latest(scrape_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+# ================ Metrics ================
+NEO4J_QUERY_SECONDS = Histogram('neo4j_query_seconds', 'Neo4j round trips by query', ['query'],
+                                buckets=DEFAULT_BUCKETS)
+NEO4J_QUERY_ERRORS = Counter('neo4j_query_errors', 'Neo4j queries that raised', ['query'])
+NEO4J_POOL_ACQUIRE_SECONDS = Histogram('neo4j_pool_acquire_seconds', 'Time waiting for a pooled Neo4j connection',
+                                       buckets=DEFAULT_BUCKETS)
+NEO4J_POOL_CONNECTIONS = Gauge('neo4j_pool_connections', 'Connections of the shared Neo4j driver pools',
+                               ['state'], multiprocess_mode='livesum')
+SCORE_CACHE_LOOKUPS = Counter('fraud_score_cache_lookups', 'Score cache lookups per insured', ['result'])
+NATS_PUBLISH_SECONDS = Histogram('nats_publish_seconds', 'Fraud alert publish to JetStream ack',
+                                 buckets=DEFAULT_BUCKETS)
+NATS_PUBLISH_FAILURES = Counter('nats_publish_failures', 'Fraud alert publishes that failed')
+OUTBOX_EVENTS_QUEUED = Counter('outbox_events_queued', 'Outbox events recorded', ['topic'])
+OUTBOX_EVENTS_DELIVERED = Counter('outbox_events_delivered', 'Outbox events delivered', ['topic'])
+OUTBOX_DELIVERY_FAILURES = Counter('outbox_delivery_failures', 'Outbox events whose delivery failed', ['topic'])
+OUTBOX_HANDLER_SECONDS = Histogram('outbox_handler_seconds', 'Outbox handler time per batch', ['topic'],
+                                   buckets=DEFAULT_BUCKETS)
+CLAIMS_SCORED = Counter('fraud_claims_scored', 'Claims scored by the fraud rules')
+FRAUD_ALERTS_RAISED = Counter('fraud_alerts_raised', 'Fraud alerts created')
+SCORER_FALLBACKS = Counter('fraud_scorer_fallbacks', 'Lookups answered from the score cache or a local scorer '
+                                                      'because Neo4j was unavailable')
+NEO4J_BREAKER_STATE = Gauge('neo4j_breaker_state', 'Neo4j circuit breaker state (1 for the current one)',
+                            ['state'], multiprocess_mode='liveall')
+NEO4J_BREAKER_TRIPS = Counter('neo4j_breaker_trips', 'Times the Neo4j circuit breaker opened')
+NEO4J_CALLS_REJECTED = Counter('neo4j_calls_rejected', 'Neo4j calls failed fast by the open circuit breaker')
+LOG_RECORDS_DROPPED = Counter('log_records_dropped', 'Log records dropped because the log queue was full')
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Continue numbering after the highest CL-NNNNNN already issued
+    schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS claims_claim_number_seq")
+    schema_editor.execute("""
+        SELECT setval('claims_claim_number_seq', COALESCE(
+            (SELECT MAX(CAST(SUBSTRING(claim_number FROM 4) AS BIGINT))
+             FROM claims_claim WHERE claim_number ~ '^CL-[0-9]+$'), 0) + 1, false)
+    """)
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP SEQUENCE IF EXISTS claims_claim_number_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0003_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0004_claim_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(fields=['-created_at', '-id'], name='alert_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['-created_at', '-id'], name='alert_unresolved_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(fields=['fraud_score', 'created_at'], name='alert_score_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0006_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insured',
+            name='ring_id',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='insured',
+            name='ring_size',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0007_insured_ring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InsuredFeatures',
+            fields=[
+                ('insured', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='features', serialize=False, to='claims.insured')),
+                ('phone_key', models.CharField(db_index=True, max_length=32)),
+                ('address_key', models.CharField(db_index=True, max_length=32)),
+                ('phone_sharers', models.PositiveIntegerField(default=0)),
+                ('address_sharers', models.PositiveIntegerField(default=0)),
+                ('shared_score', models.PositiveIntegerField(db_index=True, default=0)),
+                ('ring_size', models.PositiveIntegerField(db_index=True, default=1)),
+                ('claim_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.PositiveBigIntegerField(default=0)),
+                ('last_claim_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'insured features',
+            },
+        ),
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='topic',
+            field=models.CharField(choices=[('insured.upsert', 'Insured upsert'), ('insured.delete', 'Insured delete'), ('claim.score', 'Claim score'), ('fraud.alert', 'Fraud alert'), ('insured.features', 'Insured features')], max_length=32),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0008_insuredfeatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='needs_rescore',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(condition=models.Q(('needs_rescore', True)), fields=['id'], name='claim_needs_rescore_idx'),
+        ),
+    ]
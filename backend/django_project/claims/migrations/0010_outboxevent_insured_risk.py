@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+def queue_risk_refresh(apps, schema_editor):
+    # Pending insured events queued before insured.risk existed still need their feature/ring refresh
+    OutboxEvent = apps.get_model('claims', 'OutboxEvent')
+    pending = OutboxEvent.objects.filter(topic__in=['insured.upsert', 'insured.delete'], processed_at__isnull=True)
+    OutboxEvent.objects.bulk_create([OutboxEvent(topic='insured.risk', payload=event.payload)
+                                     for event in pending.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0009_claim_needs_rescore'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='topic',
+            field=models.CharField(choices=[('insured.upsert', 'Insured upsert'), ('insured.delete', 'Insured delete'), ('claim.score', 'Claim score'), ('fraud.alert', 'Fraud alert'), ('insured.features', 'Insured features'), ('insured.risk', 'Insured risk data')], max_length=32),
+        ),
+        migrations.RunPython(queue_risk_refresh, migrations.RunPython.noop),
+    ]
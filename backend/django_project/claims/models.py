@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.utils import timezone
 from django.core.validators import MinLengthValidator, MaxLengthValidator, MinValueValidator
 
 
@@ -8,6 +9,11 @@ class Insured(models.Model):
     phone_number = models.CharField(max_length=13, db_index=True)
     address = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Fraud ring: the connected component of insureds linked through shared phones/addresses (claims/rings.py)
+    ring_id = models.BigIntegerField(null=True, blank=True, db_index=True)  # smallest insured id in the ring
+    ring_size = models.PositiveIntegerField(default=1)  # insureds in the ring, this one included
 
     class Meta:
         indexes = [
@@ -17,6 +23,46 @@ class Insured(models.Model):
     def __str__(self):
         return f"{self.full_name} - {self.national_code}"
 
+    def save(self, *args, **kwargs):
+        # The post_save receiver's outbox row commits (or rolls back) with the row itself
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Insured, instance=self)):
+            super().save(*args, **kwargs)
+
+
+CLAIM_NUMBER_SEQUENCE = 'claims_claim_number_seq'
+
+
+def allocate_claim_numbers(count=1, using=None):
+    """Reserve ``count`` claim numbers (CL-000001 format) without touching the claims table.
+
+    On PostgreSQL the numbers come from a sequence, so concurrent inserts never
+    collide, deleted numbers are never reused and the cost is constant however
+    many claims exist.
+    """
+    connection = connections[using or router.db_for_write(Claim)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [CLAIM_NUMBER_SEQUENCE, count])
+            numbers = [row[0] for row in cursor.fetchall()]
+        else:
+            # No sequences (SQLite in local development): continue after the highest number
+            cursor.execute("SELECT MAX(CAST(SUBSTR(claim_number, 4) AS INTEGER)) FROM claims_claim")
+            last = cursor.fetchone()[0] or 0
+            numbers = range(last + 1, last + count + 1)
+    return [f"CL-{number:06d}" for number in numbers]
+
+
+def advance_claim_numbers(claim_numbers, using=None):
+    """Move the claim number sequence past numbers assigned outside allocate_claim_numbers()
+    (imported claims), so it never hands one of them out again. No-op without sequences."""
+    used = [int(number[3:]) for number in claim_numbers if number.startswith('CL-') and number[3:].isdigit()]
+    connection = connections[using or router.db_for_write(Claim)]
+    if not used or connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT setval(%s, GREATEST(%s, (SELECT last_value FROM {CLAIM_NUMBER_SEQUENCE})))",
+                       [CLAIM_NUMBER_SEQUENCE, max(used)])
+
 
 class Claim(models.Model):
     STATUS_CHOICES = [
@@ -36,6 +82,8 @@ class Claim(models.Model):
     # Fraud detection
     fraud_score = models.FloatField(default=0, db_index=True)
     fraud_signals = models.JSONField(default=list, blank=True)
+    # Scored in degraded mode (Neo4j unavailable); the outbox relay re-scores it once the graph is back
+    needs_rescore = models.BooleanField(default=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -45,6 +93,7 @@ class Claim(models.Model):
             models.Index(fields=['insured', 'accident_date']),
             models.Index(fields=['claim_number']),
             models.Index(fields=['status', 'fraud_score']),
+            models.Index(fields=['id'], condition=models.Q(needs_rescore=True), name='claim_needs_rescore_idx'),
         ]
 
     @property
@@ -57,9 +106,10 @@ class Claim(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.claim_number:
-            last = Claim.objects.count() + 1
-            self.claim_number = f"CL-{last:06d}"     #فرمت: CL-000001 (۶ رقم با صفر)
-        super().save(*args, **kwargs)
+            self.claim_number = allocate_claim_numbers(using=kwargs.get('using'))[0]     #فرمت: CL-000001 (۶ رقم با صفر)
+        # As in Insured.save: the claim.score outbox row commits with the claim
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Claim, instance=self)):
+            super().save(*args, **kwargs)
 
 
 class FraudAlert(models.Model):
@@ -69,5 +119,94 @@ class FraudAlert(models.Model):
     is_resolved = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the alert feed (newest first)
+            models.Index(fields=['-created_at', '-id'], name='alert_feed_idx'),
+            # The investigators' default view: unresolved alerts only
+            models.Index(fields=['-created_at', '-id'], name='alert_unresolved_feed_idx',
+                         condition=models.Q(is_resolved=False)),
+            models.Index(fields=['fraud_score', 'created_at'], name='alert_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Alert: {self.claim.claim_number} - Score: {self.fraud_score}"
+
+
+class InsuredFeatures(models.Model):
+    """Per-insured risk features materialized in PostgreSQL and kept current by the outbox relay (claims/features.py)"""
+    # No database constraint: the relay still needs the deleted insured's keys to update its former sharers
+    insured = models.OneToOneField(Insured, primary_key=True, related_name='features',
+                                   on_delete=models.DO_NOTHING, db_constraint=False)
+    phone_key = models.CharField(max_length=32, db_index=True)    # normalized phone, as the graph MERGEs it
+    address_key = models.CharField(max_length=32, db_index=True)  # digest of the normalized address
+    phone_sharers = models.PositiveIntegerField(default=0)
+    address_sharers = models.PositiveIntegerField(default=0)
+    shared_score = models.PositiveIntegerField(default=0, db_index=True)  # same as Neo4jClient.get_fraud_score
+    ring_size = models.PositiveIntegerField(default=1, db_index=True)
+    claim_count = models.PositiveIntegerField(default=0)
+    total_amount = models.PositiveBigIntegerField(default=0)
+    last_claim_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'insured features'
+
+    def __str__(self):
+        return f"Features of insured #{self.insured_id}"
+
+
+class OutboxEvent(models.Model):
+    """Side effect (Neo4j sync, scoring, NATS publish) recorded in the same transaction as the save"""
+    INSURED_UPSERT = 'insured.upsert'
+    INSURED_DELETE = 'insured.delete'
+    CLAIM_SCORE = 'claim.score'
+    FRAUD_ALERT = 'fraud.alert'
+    INSURED_FEATURES = 'insured.features'
+    INSURED_RISK = 'insured.risk'
+    TOPIC_CHOICES = [
+        (INSURED_UPSERT, 'Insured upsert'),
+        (INSURED_DELETE, 'Insured delete'),
+        (CLAIM_SCORE, 'Claim score'),
+        (FRAUD_ALERT, 'Fraud alert'),
+        (INSURED_FEATURES, 'Insured features'),
+        (INSURED_RISK, 'Insured risk data'),
+    ]
+
+    topic = models.CharField(max_length=32, choices=TOPIC_CHOICES)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The relay only ever scans pending events
+            models.Index(fields=['available_at', 'id'], name='outbox_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of one `manage.py import_claims` file, committed together with each chunk"""
+    kind = models.CharField(max_length=16)        # 'insureds' or 'claims'
+    source = models.CharField(max_length=500)     # absolute file path
+    fingerprint = models.CharField(max_length=64)  # size and mtime; a changed file starts over
+    rows = models.PositiveBigIntegerField(default=0)
+    skipped = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source', 'fingerprint'], name='import_checkpoint_unique'),
+        ]
+
     def __str__(self):
-        return f"Alert: {self.claim.claim_number} - Score: {self.fraud_score}"
\ No newline at end of file
+        return f"{self.kind} {self.source}: {self.rows} rows"
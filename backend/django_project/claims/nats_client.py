@@ -1,8 +1,92 @@
 # backend/django_project/claims/nats_client.py
 import asyncio
+import atexit
+import contextlib
 import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import nats
 from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from nats.errors import TimeoutError as NATSTimeoutError
+from nats.js.api import AckPolicy, ConsumerConfig, StreamConfig
+from nats.js.errors import NotFoundError
+from .metrics import NATS_PUBLISH_FAILURES, NATS_PUBLISH_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+FRAUD_ALERT_SUBJECT = "fraud.alert"
+
+
+def fraud_alert_message(claim_id, fraud_score, signals, version=None):
+    """Payload of a fraud.alert event (see docs/nats-events.json)"""
+    data = {
+        "claim_id": claim_id,
+        "fraud_score": fraud_score,
+        "signals": signals,
+        "timestamp": str(time.time()),
+        "severity": "high" if fraud_score >= 70 else "medium" if fraud_score >= 30 else "low"
+    }
+    if version is not None:
+        data["version"] = version
+    return data
+
+
+def fraud_alert_headers(claim_id, version=None):
+    """JetStream drops a second publish with the same Nats-Msg-Id inside the duplicate window"""
+    if version is None:
+        return None
+    return {"Nats-Msg-Id": f"fraud-alert-{claim_id}-{version}"}
+
+
+async def ensure_fraud_alert_stream(js):
+    """Create (or update) the durable stream that stores fraud.alert messages"""
+    config = StreamConfig(
+        name=settings.NATS_ALERT_STREAM,
+        subjects=[FRAUD_ALERT_SUBJECT],
+        duplicate_window=settings.NATS_ALERT_DUPLICATE_WINDOW,
+    )
+    try:
+        await js.stream_info(settings.NATS_ALERT_STREAM)
+    except NotFoundError:
+        await js.add_stream(config)
+    else:
+        await js.update_stream(config)
+
+
+def load_alert_handlers():
+    """Import the handlers listed in settings.NATS_ALERT_HANDLERS"""
+    return [import_string(path) for path in settings.NATS_ALERT_HANDLERS]
+
+
+class ListenerStats:
+    """Counters the listener prints periodically to spot a slow consumer"""
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.slow = 0
+        self.in_flight = 0
+        self.pending = None  # messages waiting in the consumer, from consumer_info()
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds):
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if seconds >= settings.NATS_SLOW_HANDLER_SECONDS:
+            self.slow += 1
+
+    def report(self):
+        handled = self.processed + self.failed
+        avg_ms = self.total_seconds / handled * 1000 if handled else 0
+        return (f"processed={self.processed} failed={self.failed} slow={self.slow} "
+                f"in_flight={self.in_flight} pending={self.pending} "
+                f"avg={avg_ms:.1f}ms max={self.max_seconds * 1000:.1f}ms")
 
 
 class NATSClient:
@@ -10,57 +94,326 @@ class NATSClient:
 
     def __init__(self):
         self.nc = None
+        self.js = None
         self.server = getattr(settings, 'NATS_URL', 'nats://nats:4222')
 
     async def connect(self):
         """Connect to NATS """
         try:
             self.nc = await nats.connect(self.server)
-            print("✅ Connected to NATS")
+            logger.info("✅ Connected to NATS")
             return True
         except Exception as e:
-            print(f"❌ NATS connection failed: {e}")
+            logger.error(f"❌ NATS connection failed: {e}")
             return False
 
     async def close(self):
         """Close connection"""
         if self.nc:
             await self.nc.close()
-            print("NATS connection closed")
+            self.js = None
+            logger.info("NATS connection closed")
 
-    async def publish_fraud_alert(self, claim_id, fraud_score, signals):
-        """Send a fraud alert"""
+    @timed(NATS_PUBLISH_SECONDS, errors=NATS_PUBLISH_FAILURES)
+    async def publish_fraud_alert(self, claim_id, fraud_score, signals, version=None):
+        """Send a fraud alert to the JetStream stream"""
         if not self.nc:
             await self.connect()
 
-        data = {
-            "claim_id": claim_id,
-            "fraud_score": fraud_score,
-            "signals": signals,
-            "timestamp": str(asyncio.get_event_loop().time()),
-            "severity": "high" if fraud_score >= 70 else "medium" if fraud_score >= 30 else "low"
-        }
-
-        await self.nc.publish(
-            "fraud.alert",
-            json.dumps(data).encode()
+        if self.js is None:
+            # Once per connection, not per alert: long-lived clients publish many
+            self.js = self.nc.jetstream()
+            await ensure_fraud_alert_stream(self.js)
+        data = fraud_alert_message(claim_id, fraud_score, signals, version)
+
+        ack = await self.js.publish(
+            FRAUD_ALERT_SUBJECT,
+            json.dumps(data).encode(),
+            headers=fraud_alert_headers(claim_id, version)
         )
-        print(f"Fraud alert published: {claim_id}")
+        logger.debug(f"Fraud alert published: {claim_id}" + (" (duplicate)" if ack.duplicate else ""))
+
+    async def subscribe_fraud_alerts(self, handlers=None, batch_size=None, concurrency=None):
+        """Listen to fraud alerts with a durable pull consumer.
 
-    async def subscribe_fraud_alerts(self):
-        """Listen to fraud alerts"""
+        Up to ``concurrency`` messages are in flight at once; the loop only
+        fetches as many messages as there are free slots, so a slow handler
+        holds one slot instead of stalling the whole batch. Each message is
+        acked once all handlers succeed and nak'ed (redelivered) when one of
+        them raises or exceeds NATS_HANDLER_TIMEOUT.
+        """
         if not self.nc:
             await self.connect()
+        handlers = load_alert_handlers() if handlers is None else handlers
+        batch_size = batch_size or settings.NATS_LISTENER_BATCH_SIZE
+        concurrency = concurrency or settings.NATS_LISTENER_CONCURRENCY
+
+        js = self.nc.jetstream()
+        await ensure_fraud_alert_stream(js)
+        sub = await js.pull_subscribe(
+            FRAUD_ALERT_SUBJECT,
+            durable=settings.NATS_ALERT_CONSUMER,
+            stream=settings.NATS_ALERT_STREAM,
+            config=ConsumerConfig(ack_policy=AckPolicy.EXPLICIT, max_ack_pending=concurrency * 2),
+            pending_msgs_limit=settings.NATS_LISTENER_PENDING_MSGS_LIMIT,
+            pending_bytes_limit=settings.NATS_LISTENER_PENDING_BYTES_LIMIT,
+        )
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=settings.NATS_LISTENER_THREADS,
+                                      thread_name_prefix="alert-handler")
+        self.stats = stats = ListenerStats()
+        in_flight = set()
+
+        def run_sync(handler, data):
+            # ORM work in a pool thread: drop connections that went stale between messages
+            close_old_connections()
+            try:
+                handler(data)
+            finally:
+                close_old_connections()
+
+        async def run(handler, data):
+            if asyncio.iscoroutinefunction(handler):
+                await handler(data)
+            else:
+                await loop.run_in_executor(executor, run_sync, handler, data)
+
+        async def process(msg):
+            started = time.monotonic()
+            try:
+                data = json.loads(msg.data.decode())
+                await asyncio.wait_for(asyncio.gather(*(run(handler, data) for handler in handlers)),
+                                       timeout=settings.NATS_HANDLER_TIMEOUT)
+            except Exception as e:
+                stats.failed += 1
+                logger.warning(f"⚠️ Fraud alert handler failed, will be redelivered: {e!r}")
+                await msg.nak()
+            else:
+                stats.processed += 1
+                await msg.ack()
+            finally:
+                stats.observe(time.monotonic() - started)
+
+        def done(task):
+            in_flight.discard(task)
+            stats.in_flight = len(in_flight)
+
+        logger.info("Listening for fraud alerts...")
+        last_report = time.monotonic()
+        try:
+            while True:
+                if len(in_flight) >= concurrency:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                try:
+                    msgs = await sub.fetch(min(batch_size, concurrency - len(in_flight)), timeout=5)
+                except NATSTimeoutError:
+                    msgs = []
+                for msg in msgs:
+                    task = loop.create_task(process(msg))
+                    in_flight.add(task)
+                    task.add_done_callback(done)
+                stats.in_flight = len(in_flight)
+
+                if time.monotonic() - last_report >= settings.NATS_LISTENER_STATS_INTERVAL:
+                    stats.pending = (await sub.consumer_info()).num_pending
+                    logger.info(f"📊 Listener: {stats.report()}")
+                    last_report = time.monotonic()
+        finally:
+            if in_flight:
+                await asyncio.wait(in_flight)
+            executor.shutdown(wait=False)
+
+
+# ================ Persistent Publisher ================
+_STOP = object()  # queued by close(): the drain loop publishes everything before it, then returns
+
+
+class FraudAlertPublisher:
+    """Long-lived NATS publisher running on its own event loop thread.
+
+    Callers from any thread enqueue alerts and get a Future back immediately;
+    the loop publishes whatever is queued in batches over one connection,
+    with the JetStream acks of a batch awaited concurrently. A broken
+    connection is re-established on the next batch (nats-py also reconnects
+    transparently while connected).
+    """
+
+    def __init__(self, server=None, batch_size=None, queue_size=None, publish_timeout=None):
+        self.server = server or settings.NATS_URL
+        self.batch_size = batch_size or settings.NATS_PUBLISH_BATCH_SIZE
+        self.queue_size = queue_size or settings.NATS_PUBLISH_QUEUE_SIZE
+        self.publish_timeout = publish_timeout or settings.NATS_PUBLISH_TIMEOUT
+        self.nc = None
+        self.js = None
+        self.loop = None
+        self.queue = None
+        self._task = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._closing = False
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="nats-publisher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = self.loop.create_task(self._drain())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def publish_fraud_alert(self, claim_id, fraud_score, signals, version=None):
+        """Queue a fraud alert without blocking; the Future resolves to the stream's PubAck"""
+        data = json.dumps(fraud_alert_message(claim_id, fraud_score, signals, version)).encode()
+        return self.publish(FRAUD_ALERT_SUBJECT, data, fraud_alert_headers(claim_id, version))
+
+    def publish(self, subject, data, headers=None):
+        future = Future()
+        future.add_done_callback(self._observe(time.perf_counter()))
+        self.loop.call_soon_threadsafe(self._enqueue, (subject, data, headers, future))
+        return future
+
+    @staticmethod
+    def _observe(started):
+        """Done callback: queue-to-ack time, or a failure (full queue, no connection, no ack)"""
+        def observe(future):
+            if future.exception() is None:
+                NATS_PUBLISH_SECONDS.observe(time.perf_counter() - started)
+            else:
+                NATS_PUBLISH_FAILURES.inc()
+        return observe
+
+    def _enqueue(self, item):
+        future = item[-1]
+        if self._closing:
+            future.set_exception(RuntimeError("NATS publisher is closed"))
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            future.set_exception(BufferError("NATS publish queue is full"))
+
+    async def _drain(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            try:
+                if batch:
+                    await self._publish_batch(batch)
+            except asyncio.CancelledError:
+                # A shutdown that timed out: the callers learn now rather than at their own timeout
+                _fail(batch, RuntimeError("NATS publisher closed before the alert was published"))
+                raise
+            if stop:
+                return
+
+    async def _publish_batch(self, batch):
+        try:
+            if self.nc is None or self.nc.is_closed:
+                self.nc = await nats.connect(self.server, max_reconnect_attempts=-1)
+                self.js = self.nc.jetstream()
+                await ensure_fraud_alert_stream(self.js)
+                logger.info("✅ Connected to NATS")
+        except Exception as e:
+            logger.warning(f"⚠️ NATS publish failed ({len(batch)} messages): {e}")
+            self.nc = None
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        acks = await asyncio.gather(
+            *(self.js.publish(subject, data, timeout=self.publish_timeout, headers=headers)
+              for subject, data, headers, _ in batch),
+            return_exceptions=True,
+        )
+        for (*_, future), ack in zip(batch, acks):
+            if future.done():
+                continue
+            if isinstance(ack, BaseException):
+                logger.warning(f"⚠️ NATS publish failed: {ack}")
+                future.set_exception(ack)
+            else:
+                future.set_result(ack)
+
+    def close(self, timeout=None):
+        """Publish what is still queued (for up to ``timeout`` seconds, failing the rest), then stop the loop thread"""
+        if self.loop is None or not self.loop.is_running():
+            return
+        timeout = timeout or self.publish_timeout * 2
+        asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    async def _shutdown(self, timeout):
+        # The drain loop finishes the batch it holds and everything queued before the
+        # sentinel; alerts published from now on are refused
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._stop_draining(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ NATS publisher closed with alerts unpublished after {timeout:g}s")
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        leftover = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        _fail(leftover, RuntimeError("NATS publisher closed before the alert was published"))
+        if self.nc is not None and not self.nc.is_closed:
+            await self.nc.close()
+
+    async def _stop_draining(self):
+        await self.queue.put(_STOP)
+        await self._task
+
+
+def _fail(batch, error):
+    for *_, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+_publisher = None
+_publisher_pid = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    """Return the process-wide publisher, starting it on first use (and again after a fork)"""
+    global _publisher, _publisher_pid
+    pid = os.getpid()
+    if _publisher is not None and _publisher_pid == pid:
+        return _publisher
+
+    with _publisher_lock:
+        if _publisher is None or _publisher_pid != pid:
+            _publisher = FraudAlertPublisher().start()
+            _publisher_pid = pid
+    return _publisher
+
+
+def close_publisher():
+    global _publisher, _publisher_pid
+    with _publisher_lock:
+        if _publisher is not None and _publisher_pid == os.getpid():
+            _publisher.close()
+        _publisher = None
+        _publisher_pid = None
+
 
-        async def message_handler(msg):
-            subject = msg.subject
-            reply = msg.reply
-            data = json.loads(msg.data.decode())
-            print(f"📬 Received: {subject} - {data}")
+atexit.register(close_publisher)
 
-            if data.get('severity') == 'high':
-                print(f"CRITICAL: Fraud alert for claim {data['claim_id']}")
 
-        await self.nc.subscribe("fraud.alert", cb=message_handler)
-        print("Listening for fraud alerts...")
-        await asyncio.Event().wait()
\ No newline at end of file
+def publish_fraud_alert(claim_id, fraud_score, signals, version=None):
+    """Non-blocking fraud alert publish through the shared connection; returns a Future"""
+    return get_publisher().publish_fraud_alert(claim_id, fraud_score, signals, version)
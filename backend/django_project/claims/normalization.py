@@ -0,0 +1,169 @@
+# backend/django_project/claims/normalization.py
+"""Canonical forms of phone numbers and addresses, plus blocking keys.
+
+The graph and the in-process index key phones and addresses on the values
+returned here, so "0912 111 1111", "+989121111111" and "09121111111" are one
+phone, and addresses that only differ in Arabic/Persian letter variants,
+digit script, punctuation or spacing are one address.
+
+Near-duplicate addresses (a typo, a missing word) are found with MinHash
+signatures over character shingles, split into LSH bands: two addresses
+become candidates when they share a band bucket, and only candidates are
+compared, instead of every pair of insureds.
+"""
+import re
+import zlib
+from collections import defaultdict
+
+DEFAULT_COUNTRY_CODE = '98'
+
+# Persian (۰-۹) and Arabic-Indic (٠-٩) digits -> ASCII
+DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+# Arabic letter variants -> Persian, diacritics and tatweel dropped, ZWNJ -> space
+LETTERS = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    'ـ': None,
+    '\u200c': ' ', '\u200e': None, '\u200f': None,
+    **{chr(code): None for code in range(0x064B, 0x0653)},
+})
+
+# Common abbreviations in Iranian addresses
+ABBREVIATIONS = {
+    'خ': 'خیابان',
+    'ک': 'کوچه',
+    'پ': 'پلاک',
+    'ط': 'طبقه',
+    'بل': 'بلوار',
+}
+
+NON_WORD = re.compile(r'[^\w]+')
+
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8  # 8 bands of 4 rows: pairs above ~0.6 Jaccard usually collide
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_phone(raw):
+    """E.164 form of an Iranian phone number ("+989121111111").
+
+    Numbers that cannot be recognised keep their digits only, so they still
+    match their own differently formatted copies.
+    """
+    if not raw:
+        return ''
+    text = raw.translate(DIGITS).strip()
+    digits = re.sub(r'\D', '', text)
+    if text.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+    if digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == 12:
+        return '+' + digits
+    if digits.startswith('0') and len(digits) == 11:
+        return '+' + DEFAULT_COUNTRY_CODE + digits[1:]
+    if digits.startswith('9') and len(digits) == 10:
+        return '+' + DEFAULT_COUNTRY_CODE + digits
+    return digits
+
+
+def address_tokens(raw):
+    """Canonical address tokens: one letter/digit script, no punctuation, abbreviations expanded"""
+    if not raw:
+        return []
+    text = raw.translate(DIGITS).translate(LETTERS).lower()
+    return [ABBREVIATIONS.get(token, token) for token in NON_WORD.sub(' ', text).replace('_', ' ').split()]
+
+
+def normalize_address(raw):
+    return ' '.join(address_tokens(raw))
+
+
+# ================ Blocking Keys ================
+def shingles(text, size=SHINGLE_SIZE):
+    """Character shingles of a normalized string"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _permutations(count):
+    # Fixed coefficients so signatures are stable across processes (unlike hash())
+    return [(2 * i + 1) * 0x9E3779B1 % _PRIME for i in range(1, count + 1)], \
+           [(i * 0x85EBCA77 + 0xC2B2AE3D) % _PRIME for i in range(1, count + 1)]
+
+
+_A, _B = _permutations(MINHASH_PERMUTATIONS)
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set (MINHASH_PERMUTATIONS values)"""
+    hashes = [zlib.crc32(shingle.encode()) for shingle in shingle_set]
+    if not hashes:
+        return (_MAX_HASH,) * MINHASH_PERMUTATIONS
+    return tuple(min((a * h + b) % _PRIME & _MAX_HASH for h in hashes) for a, b in zip(_A, _B))
+
+
+def blocking_keys(address, bands=LSH_BANDS):
+    """LSH band buckets of a (normalized) address; equal addresses share all of them"""
+    signature = minhash(shingles(address))
+    rows = len(signature) // bands
+    return [f'{band}:{zlib.crc32(repr(signature[band * rows:(band + 1) * rows]).encode()):x}'
+            for band in range(bands)]
+
+
+class NearDuplicateIndex:
+    """LSH buckets of distinct normalized addresses for candidate lookup"""
+
+    def __init__(self, bands=LSH_BANDS):
+        self.bands = bands
+        self.buckets = defaultdict(set)     # blocking key -> normalized addresses
+        self.addresses = defaultdict(set)   # normalized address -> ids
+
+    def add(self, key, raw_address):
+        address = normalize_address(raw_address)
+        if address not in self.addresses:
+            for bucket in blocking_keys(address, self.bands):
+                self.buckets[bucket].add(address)
+        self.addresses[address].add(key)
+
+    def candidates(self, raw_address):
+        """Indexed addresses sharing at least one LSH bucket with the address"""
+        found = set()
+        for bucket in blocking_keys(normalize_address(raw_address), self.bands):
+            found |= self.buckets.get(bucket, set())
+        return found
+
+    def near_duplicates(self, raw_address, threshold=0.8):
+        """[(address, similarity)] of other addresses with shingle Jaccard similarity >= threshold"""
+        address = normalize_address(raw_address)
+        target = shingles(address)
+        matches = [(candidate, jaccard(target, shingles(candidate)))
+                   for candidate in self.candidates(address) if candidate != address]
+        return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
+
+    def pairs(self, threshold=0.8):
+        """Every (address, address, similarity) near-duplicate pair, comparing only bucket mates"""
+        seen = set()
+        for addresses in self.buckets.values():
+            ordered = sorted(addresses)
+            for i, first in enumerate(ordered):
+                for second in ordered[i + 1:]:
+                    if (first, second) in seen:
+                        continue
+                    seen.add((first, second))
+                    similarity = jaccard(shingles(first), shingles(second))
+                    if similarity >= threshold:
+                        yield first, second, similarity
@@ -0,0 +1,291 @@
+# backend/django_project/claims/outbox.py
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .metrics import (
+    CLAIMS_SCORED, FRAUD_ALERTS_RAISED, OUTBOX_DELIVERY_FAILURES, OUTBOX_EVENTS_DELIVERED, OUTBOX_EVENTS_QUEUED,
+    OUTBOX_HANDLER_SECONDS,
+)
+from .circuit_breaker import neo4j_breaker
+from .models import Insured, Claim, FraudAlert, OutboxEvent
+from .nats_client import publish_fraud_alert
+from .features import refresh_claim_totals, refresh_features
+from .rings import update_rings
+from .rules import RuleEngine
+from .services import Neo4jClient, invalidating_scores, sync_insureds_to_neo4j
+
+logger = logging.getLogger(__name__)
+
+FRAUD_ALERT_THRESHOLD = 30
+
+
+def enqueue(topic, payload):
+    """Record a side effect in the caller's transaction; the relay delivers it after commit"""
+    event = OutboxEvent.objects.create(topic=topic, payload=payload)
+    OUTBOX_EVENTS_QUEUED.labels(topic=topic).inc()
+    return event
+
+
+# ================ Handlers ================
+# Each handler receives every pending event of its topic in the batch, so a
+# batch of insured saves becomes one UNWIND write and one NATS connection
+# serves a batch of alerts. Handlers run outside any transaction and open their
+# own for PostgreSQL writes, after any Neo4j or NATS wait. They must be
+# idempotent: delivery is at-least-once.
+
+def _ids(events, key='id'):
+    return {event.payload[key] for event in events}
+
+
+def _all_ids(events):
+    """Ids of events carrying {"id": ...} or, from bulk writes, {"ids": [...]}"""
+    return {insured_id for event in events for insured_id in event.payload.get('ids') or [event.payload['id']]}
+
+
+def handle_insured_upsert(events):
+    """Sync the current PostgreSQL state of the saved insureds (deleted ones are skipped)"""
+    ids = _ids(events)
+    with invalidating_scores(ids):
+        sync_insureds_to_neo4j(Insured.objects.filter(pk__in=ids))
+
+
+def handle_insured_delete(events):
+    ids = _ids(events)
+    with invalidating_scores(ids):
+        neo4j = Neo4jClient()
+        try:
+            neo4j.delete_insured_nodes(ids)
+        finally:
+            neo4j.close()
+
+
+def handle_insured_risk(events):
+    """Refresh the feature rows and rings of saved or deleted insureds.
+
+    PostgreSQL only, in its own transaction: a Neo4j outage holding back
+    the graph events must not also leave InsuredFeatures stale, since the
+    'features' degraded-mode fallback reads it.
+    """
+    ids = _ids(events)
+    with transaction.atomic():
+        refresh_features(ids)
+        update_rings(ids)
+
+
+def handle_claim_score(events):
+    """Run the fraud rules over the claims, raise alerts and queue their NATS notification"""
+    insured_ids = {event.payload.get('insured_id') for event in events}
+    if None in insured_ids:
+        insured_ids = None  # queued before payloads carried the insured; resolved from the claims
+    results = RuleEngine().evaluate(_ids(events), insured_ids)
+    with transaction.atomic():
+        record_scores(results)
+        refresh_claim_totals(insured_ids or {claim.insured_id for claim, _, _ in results})
+
+
+def handle_insured_features(events):
+    """Claims created or deleted without a claim.score event (bulk intake, deletes): refresh the totals"""
+    with transaction.atomic():
+        refresh_claim_totals(_all_ids(events))
+
+
+def record_scores(results, verbose=True):
+    """Store [(claim, score, signals)] and raise an alert for newly flagged claims.
+
+    Scores are written with one bulk_update (no Claim signals fire); alerts
+    are bulk-created and their fraud.alert notifications queued in the outbox.
+    """
+    claims = []
+    flagged = []
+    for claim, score, signals in results:
+        claim.fraud_score, claim.fraud_signals = score, signals
+        claims.append(claim)
+        if verbose:
+            logger.debug(f"Fraud score for {claim.claim_number}: {score}")
+        if score >= FRAUD_ALERT_THRESHOLD and not hasattr(claim, 'alert'):
+            flagged.append(FraudAlert(claim=claim, fraud_score=score, signals=signals))
+    Claim.objects.bulk_update(claims, ['fraud_score', 'fraud_signals', 'needs_rescore'], batch_size=1000)
+
+    alerts = FraudAlert.objects.bulk_create(flagged, batch_size=1000)
+    queue_alert_notifications(alerts)
+    CLAIMS_SCORED.inc(len(claims))
+    FRAUD_ALERTS_RAISED.inc(len(alerts))
+    if verbose:
+        for alert in alerts:
+            logger.info(f"🚨 Fraud alert created for {alert.claim.claim_number}")
+    return alerts
+
+
+def score_claims(queryset, chunk_size=5000, progress=None):
+    """Score every claim of ``queryset`` in keyset chunks (one PostgreSQL and one graph query each).
+
+    ``progress(scored, alerts)`` is called after each committed chunk.
+    Returns (claims scored, alerts raised).
+    """
+    engine = RuleEngine()
+    scored = alerts = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            facts = engine.facts(queryset.filter(pk__gt=last_pk).order_by('pk'), limit=chunk_size)
+            if not len(facts):
+                break
+            scores, signals = engine.score(facts)
+            alerts += len(record_scores(
+                [(claim, score.item(), claim_signals)
+                 for claim, score, claim_signals in zip(facts.claims, scores, signals)],
+                verbose=False,
+            ))
+        last_pk = facts.claims[-1].pk
+        scored += len(facts)
+        if progress:
+            progress(scored, alerts)
+    return scored, alerts
+
+
+def rescore_degraded(limit=None):
+    """Re-score claims scored while Neo4j was unavailable (Claim.needs_rescore), once this
+    process's Neo4j breaker is closed. Returns how many; claims scored in degraded mode again stay marked.
+    """
+    if not neo4j_breaker.closed:
+        return 0
+    ids = list(Claim.objects.filter(needs_rescore=True).order_by('pk')
+               .values_list('pk', flat=True)[:limit or settings.OUTBOX_BATCH_SIZE])
+    if not ids:
+        return 0
+    with transaction.atomic():
+        record_scores(RuleEngine().evaluate(ids), verbose=False)
+    return len(ids)
+
+
+def queue_alert_notifications(alerts):
+    """One fraud.alert outbox event per (saved) alert"""
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(topic=OutboxEvent.FRAUD_ALERT, payload={
+            "claim_id": alert.claim_id,
+            "fraud_score": alert.fraud_score,
+            "signals": alert.signals,
+            # claim id + alert id is the JetStream message id, so redelivered
+            # outbox events are dropped as duplicates by the stream
+            "version": alert.id,
+        })
+        for alert in alerts
+    ], batch_size=1000)
+    OUTBOX_EVENTS_QUEUED.labels(topic=OutboxEvent.FRAUD_ALERT).inc(len(alerts))
+
+
+def handle_fraud_alert(events):
+    """Publish through the shared NATS connection and wait for the flush (at-least-once)"""
+    futures = [publish_fraud_alert(**event.payload) for event in events]
+    for future in futures:
+        future.result(timeout=settings.NATS_PUBLISH_TIMEOUT * 2)
+
+
+# Processing order inside a batch: graph writes and rings first so scoring sees them
+# (claim.score events wait for a failed one of these, see hold_back)
+SCORING_INPUTS = (OutboxEvent.INSURED_UPSERT, OutboxEvent.INSURED_DELETE, OutboxEvent.INSURED_RISK)
+HANDLERS = {
+    OutboxEvent.INSURED_UPSERT: handle_insured_upsert,
+    OutboxEvent.INSURED_DELETE: handle_insured_delete,
+    OutboxEvent.INSURED_RISK: handle_insured_risk,
+    OutboxEvent.CLAIM_SCORE: handle_claim_score,
+    OutboxEvent.FRAUD_ALERT: handle_fraud_alert,
+    OutboxEvent.INSURED_FEATURES: handle_insured_features,
+}
+
+
+# ================ Relay ================
+def _retry_delay(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_MAX_DELAY, 2 ** attempts))
+
+
+def hold_back(events, waiting):
+    """Re-schedule the claim.score events of insureds in ``waiting`` ({insured id: retry time of
+    its failed graph or risk event}) to that retry, so they are not scored against the old
+    graph and marked delivered; returns the other events"""
+    unknown = [event.payload['id'] for event in events if event.payload.get('insured_id') is None]
+    insured_of = dict(Claim.objects.filter(pk__in=unknown).values_list('pk', 'insured_id')) if unknown else {}
+    ready, held = [], []
+    for event in events:
+        insured_id = event.payload.get('insured_id') or insured_of.get(event.payload['id'])
+        if insured_id in waiting:
+            event.available_at = waiting[insured_id]
+            event.last_error = f"Waiting for the failed update of insured #{insured_id}"
+            held.append(event)
+        else:
+            ready.append(event)
+    if held:
+        logger.info(f"⏳ {len(held)} claim.score events held back until their insureds are updated")
+        OutboxEvent.objects.bulk_update(held, ['last_error', 'available_at'])
+    return ready
+
+
+def claim_events(batch_size):
+    """Lease up to ``batch_size`` due events to this relay and commit.
+
+    The rows are locked with SKIP LOCKED only for this short transaction, so
+    several relays can drain the table in parallel; the lease (available_at
+    moved OUTBOX_LEASE_TIMEOUT ahead) keeps the others off them afterwards,
+    and hands them to another relay if this one dies mid-batch.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, available_at__lte=timezone.now())[:batch_size]
+        )
+        leased_until = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT)
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(available_at=leased_until)
+    for event in events:
+        event.available_at = leased_until
+    return events
+
+
+def relay_outbox(batch_size=None):
+    """Deliver one batch of pending events; returns how many events were claimed.
+
+    No row lock or transaction is held while handlers wait on Neo4j or NATS:
+    the batch is leased first (claim_events), and each topic's outcome is
+    saved as soon as its handler returns. A failing topic is retried later
+    with backoff; the other topics in the batch are still delivered, except
+    the claim.score events of insureds whose update failed (hold_back).
+    """
+    events = claim_events(batch_size or settings.OUTBOX_BATCH_SIZE)
+    waiting = {}  # insured id -> retry time of its failed SCORING_INPUTS event
+
+    for topic, handler in HANDLERS.items():
+        group = [event for event in events if event.topic == topic]
+        if topic == OutboxEvent.CLAIM_SCORE and waiting and group:
+            group = hold_back(group, waiting)
+        if not group:
+            continue
+        started = time.perf_counter()
+        try:
+            handler(group)
+        except Exception as e:
+            logger.warning(f"⚠️ Outbox {topic} delivery failed ({len(group)} events): {e}")
+            OUTBOX_DELIVERY_FAILURES.labels(topic=topic).inc(len(group))
+            for event in group:
+                event.attempts += 1
+                event.last_error = str(e)
+                event.available_at = timezone.now() + _retry_delay(event.attempts)
+                if topic in SCORING_INPUTS:
+                    for insured_id in _all_ids([event]):
+                        waiting[insured_id] = max(event.available_at, waiting.get(insured_id, event.available_at))
+        else:
+            processed_at = timezone.now()
+            for event in group:
+                event.processed_at = processed_at
+            OUTBOX_EVENTS_DELIVERED.labels(topic=topic).inc(len(group))
+        finally:
+            OUTBOX_HANDLER_SECONDS.labels(topic=topic).observe(time.perf_counter() - started)
+        OutboxEvent.objects.bulk_update(group, ['attempts', 'last_error', 'available_at', 'processed_at'])
+    return len(events)
+
+
+def purge_processed(older_than):
+    """Delete delivered events processed before ``older_than``"""
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=older_than).delete()
+    return deleted
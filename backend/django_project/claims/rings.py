@@ -0,0 +1,249 @@
+# backend/django_project/claims/rings.py
+"""Fraud rings: connected components of the Insured/Phone/Address graph.
+
+SharedPhoneRule and SharedAddressRule only see direct sharers, so a ring
+chaining insured A -phone- B -address- C goes unseen. Here every insured,
+phone and address (the normalized keys the graph MERGEs on) is a node of a
+union-find, and a ring is a component. Each insured's ring id (the smallest
+insured id in its ring) and ring size are stored on the Insured row, so
+FraudRingRule reads them with the claim instead of running variable-length
+Cypher per claim.
+
+The outbox relay applies insured.risk events as they are delivered
+(update_rings). A union-find can only merge: when a changed phone or a
+deleted insured was the only link between two halves of a ring, the ring
+stays whole until the next full recompute, every
+FRAUD_RING_RECOMPUTE_INTERVAL seconds (run by the relay while idle, in its
+own transaction, see maybe_recompute_rings) or with `manage.py detect_rings`.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .fraud_index import address_key, changed_insured_ids, phone_key
+
+logger = logging.getLogger(__name__)
+
+UPDATE_CHUNK_SIZE = 1000  # insured ids per UPDATE
+
+
+def ring_of(members):
+    """(ring id, ring size) stored for every member; (None, 1) for an insured sharing nothing"""
+    if len(members) < 2:
+        return None, 1
+    return min(members), len(members)
+
+
+class RingIndex:
+    """Union-find over insured ids and ("phone" | "address", key) nodes"""
+
+    def __init__(self):
+        self.parent = {}   # node -> parent node
+        self.members = {}  # root -> set of the (not deleted) insured ids in its component
+        self.lock = threading.RLock()
+
+    def find(self, node):
+        parent = self.parent
+        if node not in parent:
+            parent[node] = node
+            return node
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # path halving
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        # The component with fewer insureds joins the larger one
+        if len(self.members.get(a, ())) < len(self.members.get(b, ())):
+            a, b = b, a
+        self.parent[b] = a
+        merged = self.members.pop(b, None)
+        if merged:
+            self.members.setdefault(a, set()).update(merged)
+        return a
+
+    # ---------------- writes ----------------
+    def add(self, insured_id, phone, address):
+        """Link an insured to its phone and address; returns the root of its ring"""
+        with self.lock:
+            self.members.setdefault(self.find(insured_id), set()).add(insured_id)
+            self.union(insured_id, ("phone", phone_key(phone)))
+            return self.union(insured_id, ("address", address_key(address)))
+
+    def remove(self, insured_id):
+        """Drop a deleted insured from its ring (its links stay until the next build); returns the root"""
+        with self.lock:
+            if insured_id not in self.parent:
+                return None
+            root = self.find(insured_id)
+            self.members.get(root, set()).discard(insured_id)
+            return root
+
+    # ---------------- reads ----------------
+    def ring(self, insured_id):
+        with self.lock:
+            if insured_id not in self.parent:
+                return None, 1
+            return ring_of(self.members.get(self.find(insured_id), ()))
+
+    def rings(self, min_size=2):
+        """{ring id: size} of the rings with at least ``min_size`` insureds"""
+        with self.lock:
+            return dict(ring_of(members) for members in self.members.values() if len(members) >= min_size)
+
+
+# ================ Process-wide Index ================
+class ProcessRingIndex(RingIndex):
+    """RingIndex loaded from PostgreSQL that writes ring_id/ring_size back to the Insured rows"""
+
+    def __init__(self):
+        super().__init__()
+        self.built_at = None
+        self.refreshed_at = None
+
+    def build(self):
+        """Full recompute; only the insureds whose ring changed are written. Returns how many."""
+        from .models import Insured
+        with self.lock:
+            started = timezone.now()
+            self.parent, self.members = {}, {}
+            stored = {}
+            rows = (Insured.objects.values_list('id', 'phone_number', 'address', 'ring_id', 'ring_size')
+                    .iterator(chunk_size=10000))
+            for insured_id, phone, address, ring_id, ring_size in rows:
+                self.add(insured_id, phone, address)
+                stored[insured_id] = (ring_id, ring_size)
+            saved = self.save(list(self.members), stored)
+            self.built_at = self.refreshed_at = started
+            self._last_check = time.monotonic()
+        logger.info(f"✅ Fraud rings recomputed ({len(self.rings())} rings, {saved} insureds updated)")
+        return saved
+
+    def apply(self, insured_ids):
+        """Reload the given insureds from PostgreSQL, merge their rings and save them"""
+        from .models import Insured
+        with self.lock:
+            current = {row[0]: row for row in Insured.objects.filter(pk__in=insured_ids)
+                       .values_list('id', 'phone_number', 'address')}
+            roots = set()
+            for insured_id in insured_ids:
+                if insured_id in current:
+                    roots.add(self.add(*current[insured_id]))
+                else:
+                    roots.add(self.remove(insured_id))
+            # A later union may have moved an earlier root under another one
+            return self.save({self.find(root) for root in roots if root is not None})
+
+    def save(self, roots, stored=None):
+        """Write ring_id/ring_size of every member of ``roots`` whose row differs.
+
+        ``stored`` is {insured id: (ring id, size)} as read by build(); without
+        it the comparison is made by the UPDATE itself, so saving the same
+        rings again (a relay retry after a rollback) is a cheap no-op.
+        """
+        from .models import Insured, InsuredFeatures
+        updates = {}  # (ring id, size) -> insured ids
+        for root in roots:
+            members = self.members.get(root, ())
+            ring = ring_of(members)
+            for insured_id in members:
+                if stored is None or stored.get(insured_id) != ring:
+                    updates.setdefault(ring, []).append(insured_id)
+        saved = 0
+        for (ring_id, ring_size), ids in updates.items():
+            for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+                chunk = ids[start:start + UPDATE_CHUNK_SIZE]
+                queryset = Insured.objects.filter(pk__in=chunk)
+                if stored is None:
+                    queryset = queryset.exclude(ring_id=ring_id, ring_size=ring_size)
+                saved += queryset.update(ring_id=ring_id, ring_size=ring_size)
+                # Mirrored in the feature table (claims/features.py)
+                InsuredFeatures.objects.filter(pk__in=chunk).exclude(ring_size=ring_size).update(ring_size=ring_size)
+        return saved
+
+    def refresh(self):
+        """Apply the Insured changes other processes recorded in the outbox since the last refresh"""
+        with self.lock:
+            started = timezone.now()
+            ids = changed_insured_ids(self.refreshed_at)
+            if ids:
+                self.apply(ids)
+            self.refreshed_at = started
+            self._last_check = time.monotonic()
+
+    def stale(self):
+        return timezone.now() - self.built_at > timedelta(seconds=settings.FRAUD_RING_RECOMPUTE_INTERVAL)
+
+    def maybe_refresh(self, recompute=True):
+        if time.monotonic() - self._last_check < settings.FRAUD_RING_REFRESH_INTERVAL:
+            return
+        if recompute and self.stale():
+            self.build()
+        else:
+            self.refresh()
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_ring_index(recompute=True):
+    """Return this process's ring index, recomputing the rings on first use.
+
+    With ``recompute=False`` a stale index is only brought up to date from
+    the outbox; the full recompute is left to maybe_recompute_rings().
+    """
+    global _index, _index_pid
+    pid = os.getpid()
+    with _index_lock:
+        if _index is None or _index_pid != pid:
+            index = ProcessRingIndex()
+            index.build()
+            _index, _index_pid = index, pid
+    _index.maybe_refresh(recompute)
+    return _index
+
+
+def reset_ring_index():
+    global _index, _index_pid
+    with _index_lock:
+        _index, _index_pid = None, None
+
+
+def update_rings(insured_ids):
+    """Relay hook for insured.risk: merge the insureds' rings and save the changed rows"""
+    return get_ring_index(recompute=False).apply(insured_ids)
+
+
+def recompute_rings():
+    """Full recompute (detect_rings, import_claims); the process index is replaced by the new one"""
+    global _index, _index_pid
+    index = ProcessRingIndex()
+    saved = index.build()
+    with _index_lock:
+        _index, _index_pid = index, os.getpid()
+    return index, saved
+
+
+def maybe_recompute_rings():
+    """Build this process's index, or recompute it once FRAUD_RING_RECOMPUTE_INTERVAL has passed.
+
+    Called by the outbox relay at startup and while idle, so the full
+    recompute commits on its own instead of inside a batch of events.
+    Returns how many insureds were updated, None when nothing was due.
+    """
+    with _index_lock:
+        index = _index if _index_pid == os.getpid() else None
+    if index is not None and not index.stale():
+        return None
+    with transaction.atomic():
+        _, saved = recompute_rings()
+    return saved
@@ -0,0 +1,273 @@
+# backend/django_project/claims/rules.py
+"""Fraud rules: each one looks at a claim and may contribute a weighted signal.
+
+Rules are listed in settings.FRAUD_RULES. A rule declares the data it needs:
+``annotations`` are ORM expressions added to the one PostgreSQL query that
+loads the claims, and ``needs_graph`` asks for the shared phone/address
+lookup, fetched for all claims in one Neo4j query (or from the in-process
+index, see services.shared_attributes). The Neo4j lookup runs in a worker
+thread while PostgreSQL is queried.
+
+Rules are vectorized: the batch is turned into NumPy columns (ClaimFacts)
+and each rule returns an array of points, one per claim, so scoring a
+chunk of a million-claim re-score costs a few array operations per rule.
+Explanations are only formatted for the claims a rule fired on.
+
+A signal is a dict stored in Claim.fraud_signals and FraudAlert.signals:
+{"rule": "shared_phone", "score": 30, "explanation": "..."}; the claim's
+fraud score is the sum of its signals' scores.
+
+Async views use afacts()/aevaluate(): the graph lookup is awaited on the
+event loop (claims/async_services.py) while PostgreSQL runs in a thread.
+
+Claims scored while Neo4j was unavailable (degraded answers, see
+services._from_scorer) get Claim.needs_rescore set with their score; the
+outbox relay scores them again once the graph is back.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .async_services import ashared_attributes
+from .models import Claim
+from .services import DegradedAnswers, prefetch_shared_attributes, shared_attributes
+
+
+class ClaimFacts:
+    """Column view of a batch of claims; every array is indexed like ``claims``"""
+
+    def __init__(self, claims, shared):
+        empty = {"phone": [], "address": []}
+        self.claims = claims
+        self.degraded = isinstance(shared, DegradedAnswers)
+        self.shared = [shared.get(claim.insured_id, empty) for claim in claims]
+        self.amount = np.array([claim.amount for claim in claims], dtype=float)
+        self.phone_sharers = np.array([len(entry["phone"]) for entry in self.shared], dtype=int)
+        self.address_sharers = np.array([len(entry["address"]) for entry in self.shared], dtype=int)
+        self.days_since_policy = np.array(
+            [(claim.accident_date - timezone.localdate(claim.insured.created_at)).days for claim in claims],
+            dtype=int)
+        self.ring_size = np.array([claim.insured.ring_size for claim in claims], dtype=int)
+
+    def __len__(self):
+        return len(self.claims)
+
+    def column(self, name):
+        """An annotation as a float array (NULL -> nan)"""
+        return np.array([getattr(claim, name) for claim in self.claims], dtype=float)
+
+
+class Rule:
+    name = ''
+    weight = 0
+    needs_graph = False
+    annotations = {}
+
+    def points(self, facts):
+        """Array of points per claim in ``facts`` (0 where the rule does not fire)"""
+        raise NotImplementedError
+
+    def explain(self, facts, i):
+        """Why the rule fired for claim ``i``"""
+        raise NotImplementedError
+
+
+def _insured_claims(**filters):
+    """The insured's claims as a correlated subquery (grouped so aggregates stay per insured)"""
+    return Claim.objects.filter(insured=OuterRef('insured'), **filters).order_by().values('insured')
+
+
+# ================ Rules ================
+class SharedPhoneRule(Rule):
+    name = 'shared_phone'
+    weight = 30  # per other insured on the same phone
+    needs_graph = True
+
+    def points(self, facts):
+        return facts.phone_sharers * self.weight
+
+    def explain(self, facts, i):
+        others = facts.shared[i]["phone"]
+        return f"Phone number shared with {len(others)} other insured(s): {sorted(others)}"
+
+
+class SharedAddressRule(Rule):
+    name = 'shared_address'
+    weight = 20  # per other insured at the same address
+    needs_graph = True
+
+    def points(self, facts):
+        return facts.address_sharers * self.weight
+
+    def explain(self, facts, i):
+        others = facts.shared[i]["address"]
+        return f"Address shared with {len(others)} other insured(s): {sorted(others)}"
+
+
+class ClaimVelocityRule(Rule):
+    name = 'claim_velocity'
+    weight = 15
+    window_days = 90
+    min_claims = 3  # including this one
+    annotations = {
+        'velocity_claims': Coalesce(Subquery(
+            _insured_claims(
+                accident_date__gte=OuterRef('accident_date') - timedelta(days=window_days),
+                accident_date__lte=OuterRef('accident_date') + timedelta(days=window_days),
+            ).annotate(count=Count('id')).values('count'),
+            output_field=IntegerField(),
+        ), 0),
+    }
+
+    def points(self, facts):
+        return np.where(facts.column('velocity_claims') >= self.min_claims, self.weight, 0)
+
+    def explain(self, facts, i):
+        return (f"{facts.claims[i].velocity_claims} claims by this insured within "
+                f"{self.window_days} days of the accident")
+
+
+class AmountOutlierRule(Rule):
+    name = 'amount_outlier'
+    weight = 15
+    factor = 3  # times the insured's average claim
+    min_history = 2
+    annotations = {
+        'history_claims': Coalesce(Subquery(
+            _insured_claims().exclude(pk=OuterRef('pk')).annotate(count=Count('id')).values('count'),
+            output_field=IntegerField(),
+        ), 0),
+        'history_avg_amount': Subquery(
+            _insured_claims().exclude(pk=OuterRef('pk')).annotate(avg=Avg('amount')).values('avg'),
+        ),
+    }
+
+    def ratios(self, facts):
+        average = facts.column('history_avg_amount')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = facts.amount / average
+        return np.where((facts.column('history_claims') >= self.min_history) & (average > 0), ratios, 0)
+
+    def points(self, facts):
+        return np.where(self.ratios(facts) >= self.factor, self.weight, 0)
+
+    def explain(self, facts, i):
+        claim = facts.claims[i]
+        return (f"Amount is {claim.amount / claim.history_avg_amount:.1f}x the insured's average of "
+                f"{claim.history_avg_amount:,.0f} over {claim.history_claims} claims")
+
+
+class EarlyClaimRule(Rule):
+    name = 'early_claim'
+    weight = 10
+    window_days = 30  # after the policy (insured record) was created
+
+    def points(self, facts):
+        days = facts.days_since_policy
+        return np.where((days >= 0) & (days < self.window_days), self.weight, 0)
+
+    def explain(self, facts, i):
+        return f"Accident {facts.days_since_policy[i]} day(s) after the policy started"
+
+
+class FraudRingRule(Rule):
+    name = 'fraud_ring'
+    weight = 25
+    min_size = 3  # two insureds are a shared phone/address, already scored by the rules above
+
+    def points(self, facts):
+        # Insured.ring_size is maintained by claims/rings.py and loaded with the claim
+        return np.where(facts.ring_size >= self.min_size, self.weight, 0)
+
+    def explain(self, facts, i):
+        insured = facts.claims[i].insured
+        return (f"Insured belongs to ring #{insured.ring_id} of {insured.ring_size} insureds "
+                f"linked through shared phones/addresses")
+
+
+# ================ Engine ================
+def load_rules():
+    """Instantiate the rules listed in settings.FRAUD_RULES"""
+    return [import_string(path)() for path in settings.FRAUD_RULES]
+
+
+class RuleEngine:
+    def __init__(self, rules=None):
+        self.rules = load_rules() if rules is None else rules
+        self.needs_graph = any(rule.needs_graph for rule in self.rules)
+
+    def annotate(self, queryset):
+        """Add every rule's annotations (and the insured/alert joins) to a Claim queryset"""
+        annotations = {}
+        for rule in self.rules:
+            annotations.update(rule.annotations)
+        return queryset.select_related('insured', 'alert').annotate(**annotations)
+
+    def facts(self, queryset, insured_ids=None, limit=None):
+        """Load the claims with one PostgreSQL and at most one Neo4j query.
+
+        When ``insured_ids`` is known up front the Neo4j lookup overlaps the
+        PostgreSQL query; otherwise it starts once the claims are loaded.
+        """
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rule-graph") as executor:
+            pending = None
+            if self.needs_graph and insured_ids:
+                pending = prefetch_shared_attributes(executor, insured_ids)
+            claims = list(self.annotate(queryset)[:limit])
+            if self.needs_graph and pending is None:
+                insured_ids = {claim.insured_id for claim in claims}
+            shared = shared_attributes(insured_ids, pending) if self.needs_graph and claims else {}
+        return ClaimFacts(claims, shared)
+
+    async def afacts(self, queryset, insured_ids=None, limit=None):
+        """facts() for async views: the graph lookup is a coroutine, not a worker thread"""
+        pending = None
+        if self.needs_graph and insured_ids:
+            pending = asyncio.ensure_future(ashared_attributes(insured_ids))
+        try:
+            claims = await sync_to_async(lambda: list(self.annotate(queryset)[:limit]))()
+        except BaseException:
+            if pending is not None:
+                pending.cancel()
+            raise
+        if not self.needs_graph or not claims:
+            if pending is not None:
+                pending.cancel()
+            return ClaimFacts(claims, {})
+        shared = await (pending or ashared_attributes({claim.insured_id for claim in claims}))
+        return ClaimFacts(claims, shared)
+
+    def score(self, facts):
+        """(scores array, signals list) for the claims in ``facts``; flags claims scored in degraded mode"""
+        for claim in facts.claims:
+            claim.needs_rescore = facts.degraded
+        if not len(facts) or not self.rules:
+            return np.zeros(len(facts)), [[] for _ in facts.claims]
+        points = np.column_stack([rule.points(facts) for rule in self.rules])
+        signals = [[] for _ in facts.claims]
+        # (claim, rule) pairs in claim order, then rule order
+        for i, r in np.argwhere(points):
+            rule = self.rules[r]
+            signals[i].append({"rule": rule.name, "score": points[i, r].item(),
+                               "explanation": rule.explain(facts, i)})
+        return points.sum(axis=1), signals
+
+    def evaluate(self, claim_ids, insured_ids=None):
+        """[(claim, score, signals)] for the given claims"""
+        facts = self.facts(Claim.objects.filter(pk__in=claim_ids), insured_ids)
+        scores, signals = self.score(facts)
+        return [(claim, score.item(), claim_signals)
+                for claim, score, claim_signals in zip(facts.claims, scores, signals)]
+
+    async def aevaluate(self, claim_ids, insured_ids=None):
+        """evaluate() for async views"""
+        facts = await self.afacts(Claim.objects.filter(pk__in=claim_ids), insured_ids)
+        scores, signals = self.score(facts)
+        return [(claim, score.item(), claim_signals)
+                for claim, score, claim_signals in zip(facts.claims, scores, signals)]
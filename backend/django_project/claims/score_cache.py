@@ -0,0 +1,190 @@
+# backend/django_project/claims/score_cache.py
+"""Cache of Neo4j scoring answers per insured id.
+
+Two tiers of the Django cache framework: ``fraud_scores``, a process-local
+LRU (locmem culls the least recently used entries past MAX_ENTRIES), in
+front of ``fraud_scores_shared``, an optional backend shared by every
+process (e.g. Redis, see FRAUD_SCORE_SHARED_CACHE_URL).
+
+The outbox relay invalidates entries after each graph write: every insured
+attached to a Phone/Address node the write touched, before or after it
+(services.invalidating_scores). Other processes' local tiers only expire,
+so FRAUD_SCORE_CACHE_LOCAL_TIMEOUT bounds how stale they can be.
+
+The shared tier is invalidated exactly, even against a lookup that read
+Neo4j before the write and stores its answer after the invalidation. Each
+insured has a generation token there, replaced on every invalidation; a
+lookup reads the tokens before querying Neo4j (generations()) and stores
+its answers tagged with them, and a stored answer only counts while its
+token is still the current one.
+"""
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from .metrics import SCORE_CACHE_LOOKUPS
+
+LOCAL_CACHE = 'fraud_scores'
+SHARED_CACHE = 'fraud_scores_shared'
+
+
+class ScoreCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return settings.FRAUD_SCORE_CACHE
+
+    def tiers(self):
+        tiers = [caches[LOCAL_CACHE]]
+        if SHARED_CACHE in settings.CACHES:
+            tiers.append(caches[SHARED_CACHE])
+        return tiers
+
+    @staticmethod
+    def key(kind, insured_id):
+        return f"{kind}:{insured_id}"
+
+    @staticmethod
+    def generation_key(insured_id):
+        return f"generation:{insured_id}"
+
+    def _shared_keys(self, keys, hits):
+        """Shared-tier keys for the entries missing locally, with their insureds' generation keys"""
+        missing = {key: insured_id for key, insured_id in keys.items() if key not in hits}
+        return missing, [*missing, *(self.generation_key(insured_id) for insured_id in missing.values())]
+
+    def _current(self, missing, found):
+        """The shared-tier entries in ``found`` stored under their insured's current generation"""
+        current = {}
+        for key, insured_id in missing.items():
+            entry = found.get(key)
+            if entry is not None and entry[0] == found.get(self.generation_key(insured_id)):
+                current[key] = entry[1]
+        return current
+
+    def get_many(self, kind, insured_ids):
+        """{insured_id: value} for the ids found in either tier"""
+        keys = {self.key(kind, insured_id): insured_id for insured_id in insured_ids}
+        local, *shared = self.tiers()
+        hits = local.get_many(keys)
+        local_hits = len(hits)
+        if shared and len(hits) < len(keys):
+            missing, shared_keys = self._shared_keys(keys, hits)
+            from_shared = self._current(missing, shared[0].get_many(shared_keys))
+            if from_shared:
+                local.set_many(from_shared)
+                hits.update(from_shared)
+        return self._found(keys, hits, local_hits)
+
+    async def aget_many(self, kind, insured_ids):
+        """get_many() for async views; only the shared tier does network I/O"""
+        keys = {self.key(kind, insured_id): insured_id for insured_id in insured_ids}
+        local, *shared = self.tiers()
+        hits = local.get_many(keys)
+        local_hits = len(hits)
+        if shared and len(hits) < len(keys):
+            missing, shared_keys = self._shared_keys(keys, hits)
+            from_shared = self._current(missing, await shared[0].aget_many(shared_keys))
+            if from_shared:
+                local.set_many(from_shared)
+                hits.update(from_shared)
+        return self._found(keys, hits, local_hits)
+
+    def _found(self, keys, hits, local_hits):
+        with self.lock:
+            self.local_hits += local_hits
+            self.shared_hits += len(hits) - local_hits
+            self.misses += len(keys) - len(hits)
+        SCORE_CACHE_LOOKUPS.labels(result='local_hit').inc(local_hits)
+        SCORE_CACHE_LOOKUPS.labels(result='shared_hit').inc(len(hits) - local_hits)
+        SCORE_CACHE_LOOKUPS.labels(result='miss').inc(len(keys) - len(hits))
+        return {keys[key]: value for key, value in hits.items()}
+
+    @staticmethod
+    def _new_generation():
+        return uuid.uuid4().hex
+
+    def generations(self, insured_ids):
+        """{insured_id: generation} from the shared tier, read before the Neo4j lookup whose
+        answers are then stored with set_many(kind, values, generations); {} without one"""
+        shared = self.tiers()[1:]
+        if not shared:
+            return {}
+        keys = {self.generation_key(insured_id): insured_id for insured_id in insured_ids}
+        found = shared[0].get_many(keys)
+        for key in keys.keys() - found.keys():
+            # add(), not set(): an invalidation racing this one must win
+            shared[0].add(key, self._new_generation())
+            found[key] = shared[0].get(key)
+        return {keys[key]: generation for key, generation in found.items()}
+
+    async def agenerations(self, insured_ids):
+        shared = self.tiers()[1:]
+        if not shared:
+            return {}
+        keys = {self.generation_key(insured_id): insured_id for insured_id in insured_ids}
+        found = await shared[0].aget_many(keys)
+        for key in keys.keys() - found.keys():
+            await shared[0].aadd(key, self._new_generation())
+            found[key] = await shared[0].aget(key)
+        return {keys[key]: generation for key, generation in found.items()}
+
+    def _shared_entries(self, kind, values, generations):
+        return {self.key(kind, insured_id): (generations[insured_id], value)
+                for insured_id, value in values.items() if generations.get(insured_id) is not None}
+
+    def set_many(self, kind, values, generations=None):
+        """Store lookup answers; ``generations`` as read before the lookup (default: now)"""
+        local, *shared = self.tiers()
+        local.set_many({self.key(kind, insured_id): value for insured_id, value in values.items()})
+        if shared:
+            if generations is None:
+                generations = self.generations(values)
+            shared[0].set_many(self._shared_entries(kind, values, generations))
+
+    async def aset_many(self, kind, values, generations=None):
+        local, *shared = self.tiers()
+        local.set_many({self.key(kind, insured_id): value for insured_id, value in values.items()})
+        if shared:
+            if generations is None:
+                generations = await self.agenerations(values)
+            await shared[0].aset_many(self._shared_entries(kind, values, generations))
+
+    def invalidate(self, insured_ids, kinds=('score', 'shared')):
+        """Drop the insureds' entries; in the shared tier a new generation also voids any
+        answer a lookup still in flight stores afterwards"""
+        insured_ids = list(insured_ids)
+        keys = [self.key(kind, insured_id) for insured_id in insured_ids for kind in kinds]
+        shared = self.tiers()[1:]
+        if shared:
+            shared[0].set_many({self.generation_key(insured_id): self._new_generation()
+                                for insured_id in insured_ids})
+        for tier in self.tiers():
+            tier.delete_many(keys)
+
+    def clear(self):
+        """Drop every entry, e.g. after a bulk import changed many graph neighbourhoods"""
+        for tier in self.tiers():
+            tier.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.local_hits = self.shared_hits = self.misses = 0
+
+
+score_cache = ScoreCache()
@@ -1,73 +1,550 @@
 # backend/django_project/claims/services.py
-from neo4j import GraphDatabase
+import asyncio
+import atexit
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min
+from neo4j import GraphDatabase, Query, __version__ as neo4j_version, unit_of_work
+from .circuit_breaker import CircuitOpenError, is_outage, neo4j_breaker
+from .features import FeatureScorer
+from .fraud_index import get_fraud_index
+from .metrics import (
+    NEO4J_POOL_ACQUIRE_SECONDS, NEO4J_POOL_CONNECTIONS, NEO4J_QUERY_ERRORS, NEO4J_QUERY_SECONDS, SCORER_FALLBACKS,
+    timed,
+)
+from .normalization import normalize_address, normalize_phone
+from .score_cache import score_cache
 
+logger = logging.getLogger(__name__)
 
-def sync_all_to_neo4j():
+
+# ================ Shared Driver ================
+# Opening a driver costs a TCP connect + Bolt handshake + auth, so the process
+# keeps a single pooled driver and every Neo4jClient borrows sessions from it.
+_driver = None
+_driver_pid = None
+_driver_lock = threading.Lock()
+
+
+def get_driver():
+    """Return the process-wide Neo4j driver, creating it on first use"""
+    global _driver, _driver_pid
+    pid = os.getpid()
+    if _driver is not None and _driver_pid == pid:
+        return _driver
+
+    with _driver_lock:
+        if _driver is None or _driver_pid != pid:
+            # After a fork (gunicorn workers) the inherited pool shares sockets
+            # with the parent; drop it without closing and open a fresh one.
+            _driver = GraphDatabase.driver(
+                settings.NEO4J_URI,
+                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=settings.NEO4J_POOL_ACQUISITION_TIMEOUT,
+                connection_timeout=settings.NEO4J_CONNECTION_TIMEOUT,
+                max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+                max_transaction_retry_time=settings.NEO4J_MAX_TRANSACTION_RETRY_TIME,
+            )
+            _driver_pid = pid
+            time_pool_acquire(_driver)
+    return _driver
+
+
+def time_pool_acquire(driver):
+    """Observe neo4j_pool_acquire_seconds around the driver's pool (private API, as in pool_stats)"""
+    pool = getattr(driver, '_pool', None)
+    if not callable(getattr(pool, 'acquire', None)):
+        private_pool_api_missing('time_pool_acquire')
+        return
+    pool.acquire = timed(NEO4J_POOL_ACQUIRE_SECONDS)(pool.acquire)
+
+
+def observed_query(query):
+    """Decorator: fail fast while the Neo4j circuit breaker is open; otherwise
+    neo4j_query_seconds{query} per call, neo4j_query_errors_total{query} per failure.
+    Synchronous calls also refresh neo4j_pool_connections for the shared driver."""
+    timer = timed(NEO4J_QUERY_SECONDS, errors=NEO4J_QUERY_ERRORS, query=query)
+
+    def decorator(function):
+        guarded = neo4j_breaker.guard(timer(function))
+        if asyncio.iscoroutinefunction(function):
+            return guarded
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                return guarded(*args, **kwargs)
+            finally:
+                record_pool_connections()
+        return wrapper
+    return decorator
+
+
+def read_query(text):
+    """A read with the NEO4J_QUERY_TIMEOUT transaction timeout (enforced by the server)"""
+    return Query(text, timeout=settings.NEO4J_QUERY_TIMEOUT)
+
+
+def write_work(work):
+    """A transaction function with the NEO4J_WRITE_TIMEOUT transaction timeout"""
+    return unit_of_work(timeout=settings.NEO4J_WRITE_TIMEOUT)(work)
+
+
+def close_driver():
+    """Close the process-wide driver (used on shutdown and in tests)"""
+    global _driver, _driver_pid
+    with _driver_lock:
+        if _driver is not None and _driver_pid == os.getpid():
+            _driver.close()
+        _driver = None
+        _driver_pid = None
+
+
+atexit.register(close_driver)
+
+
+_private_api_warned = set()
+
+
+def private_pool_api_missing(feature):
+    """Warn once per process that this neo4j driver lacks the private pool API ``feature`` reads"""
+    if feature not in _private_api_warned:
+        _private_api_warned.add(feature)
+        logger.warning(f"⚠️ neo4j {neo4j_version} has no driver._pool API as {feature} expects; "
+                       f"{feature} is disabled (see the pin in requirements.txt)")
+
+
+def pool_stats():
+    """Connection pool usage of the shared driver, for sizing NEO4J_MAX_POOL_SIZE"""
+    stats = {
+        "pid": os.getpid(),
+        "max_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+        "acquisition_timeout": settings.NEO4J_POOL_ACQUISITION_TIMEOUT,
+        "open": 0,
+        "in_use": 0,
+        "idle": 0,
+        "addresses": {},
+    }
+    if _driver is None or _driver_pid != os.getpid():
+        return stats
+
+    # The driver has no public pool API; read the pool's bookkeeping directly
+    # (neo4j is pinned in requirements.txt for this), and report nothing if it moved.
+    pool = getattr(_driver, '_pool', None)
+    lock, pools = getattr(pool, 'lock', None), getattr(pool, 'connections', None)
+    if lock is None or not isinstance(pools, dict):
+        private_pool_api_missing('pool_stats')
+        return stats
+    with lock:
+        for address, connections in pools.items():
+            in_use = sum(1 for connection in connections if getattr(connection, 'in_use', False))
+            stats["addresses"][str(address)] = {
+                "open": len(connections),
+                "in_use": in_use,
+                "idle": len(connections) - in_use,
+            }
+            stats["open"] += len(connections)
+            stats["in_use"] += in_use
+    stats["idle"] = stats["open"] - stats["in_use"]
+    return stats
+
+
+def record_pool_connections():
+    """Set neo4j_pool_connections{state} from pool_stats()"""
+    stats = pool_stats()
+    NEO4J_POOL_CONNECTIONS.labels(state='in_use').set(stats['in_use'])
+    NEO4J_POOL_CONNECTIONS.labels(state='idle').set(stats['idle'])
+
+
+# Neo4jClient lookup -> score_cache kind
+CACHED_LOOKUPS = {'get_fraud_scores': 'score', 'get_shared_attributes': 'shared'}
+
+
+def _from_graph(method, insured_ids):
+    """Run a per-insured Neo4j lookup, answering what it can from score_cache"""
+    insured_ids = list(insured_ids)
+    kind = CACHED_LOOKUPS[method]
+    found = score_cache.get_many(kind, insured_ids) if score_cache.enabled else {}
+    missing = [insured_id for insured_id in insured_ids if insured_id not in found]
+    if missing:
+        # Read before the query: an invalidation landing meanwhile voids what is stored below
+        generations = score_cache.generations(missing) if score_cache.enabled else None
+        neo4j = Neo4jClient()
+        try:
+            fetched = getattr(neo4j, method)(missing)
+        finally:
+            neo4j.close()
+        if score_cache.enabled:
+            score_cache.set_many(kind, fetched, generations)
+        found.update(fetched)
+    return found
+
+
+def _graph_neighbours(neo4j, insured_ids):
+    """The insureds plus everyone attached to their Phone/Address nodes"""
+    neighbours = set(insured_ids)
+    for shared in neo4j.get_shared_attributes(insured_ids).values():
+        neighbours.update(shared["phone"])
+        neighbours.update(shared["address"])
+    return neighbours
+
+
+@contextmanager
+def invalidating_scores(insured_ids):
+    """Wrap a graph write of ``insured_ids``: afterwards drop the cached answers of
+    every insured on a Phone/Address node they were attached to before or after it"""
+    insured_ids = list(insured_ids)
+    if not score_cache.enabled or not insured_ids:
+        yield
+        return
+    neo4j = Neo4jClient()
+    try:
+        affected = _graph_neighbours(neo4j, insured_ids)
+        yield
+        affected |= _graph_neighbours(neo4j, insured_ids)
+    finally:
+        neo4j.close()
+    score_cache.invalidate(affected)
+
+
+def local_scorer(name=None):
+    """The scorer answering without Neo4j: the feature table or the in-process index"""
+    return FeatureScorer() if (name or settings.FRAUD_SCORER) == 'features' else get_fraud_index()
+
+
+class DegradedAnswers(dict):
+    """Lookup answers given while Neo4j was unavailable; claims scored from them
+    are marked Claim.needs_rescore (see RuleEngine.score)"""
+
+
+def _degraded(index_method, insured_ids, found):
+    """Degraded mode: the cached graph answers in ``found``, FRAUD_FALLBACK_SCORER for the rest"""
+    SCORER_FALLBACKS.inc()
+    answers = DegradedAnswers(found)
+    missing = [insured_id for insured_id in insured_ids if insured_id not in answers]
+    if missing:
+        answers.update(getattr(local_scorer(settings.FRAUD_FALLBACK_SCORER), index_method)(missing))
+    return answers
+
+
+def _from_scorer(method, index_method, insured_ids, pending=None):
+    """Run a lookup against the configured scorer (FRAUD_SCORER).
+
+    With the Neo4j scorer, an unreachable graph (or an open circuit breaker)
+    degrades to the last cached answers and the local FRAUD_FALLBACK_SCORER,
+    which answers the same questions. ``pending`` is a Future of the Neo4j
+    lookup when the caller already started it.
+    """
+    if settings.FRAUD_SCORER in ('index', 'features'):
+        return getattr(local_scorer(), index_method)(insured_ids)
+    try:
+        return pending.result() if pending is not None else _from_graph(method, insured_ids)
+    except Exception as e:
+        if not is_outage(e):
+            raise
+        # The breaker logged the outage once when it opened
+        (logger.debug if isinstance(e, CircuitOpenError) else logger.warning)(
+            f"⚠️ Neo4j unavailable, scoring in degraded mode: {e}")
+        insured_ids = list(insured_ids)
+        kind = CACHED_LOOKUPS[method]
+        return _degraded(index_method, insured_ids,
+                         score_cache.get_many(kind, insured_ids) if score_cache.enabled else {})
+
+
+def score_insureds(insured_ids):
+    """{insured_id: shared phone/address score} from the configured scorer"""
+    return _from_scorer('get_fraud_scores', 'scores', insured_ids)
+
+
+def shared_attributes(insured_ids, pending=None):
+    """{insured_id: {"phone": [other ids], "address": [other ids]}} from the configured scorer"""
+    return _from_scorer('get_shared_attributes', 'shared_attributes', insured_ids, pending)
+
+
+def prefetch_shared_attributes(executor, insured_ids):
+    """Start the Neo4j lookup on ``executor`` so it overlaps other work; None with the local scorers"""
+    if settings.FRAUD_SCORER in ('index', 'features'):
+        return None
+    return executor.submit(_from_graph, 'get_shared_attributes', list(insured_ids))
+
+
+def ensure_neo4j_schema():
+    """Create Neo4j constraints and indexes if they don't exist yet"""
+    neo4j = Neo4jClient()
+    neo4j.ensure_schema()
+    neo4j.close()
+
+
+def sync_all_to_neo4j(since=None, batch_size=None, chunk_size=None, progress=None, workers=1):
     """Sync all data from PostgreSQL to Neo4j"""
     from .models import Insured
-    neo4j = Neo4jClient()
+    queryset = Insured.objects.all()
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
 
-    # Delete existing Neo4j data (optional - comment if not needed)
-    # with neo4j.driver.session() as session:
-    #     session.run("MATCH (n) DETACH DELETE n")
+    if workers > 1:
+        total = sync_insureds_in_parallel(queryset, workers, batch_size=batch_size,
+                                          chunk_size=chunk_size, progress=progress)
+    else:
+        total = sync_insureds_to_neo4j(queryset, batch_size=batch_size, chunk_size=chunk_size, progress=progress)
+    logger.info(f"✅ {total} insured members synced to Neo4j")
+    return total
 
-    for insured in Insured.objects.all():
-        neo4j.create_insured_node(insured)
+
+def partition_pk_ranges(queryset, parts):
+    """Split the queryset's primary-key space into ``parts`` half-open [start, end) ranges"""
+    bounds = queryset.aggregate(lo=Min('pk'), hi=Max('pk'))
+    if bounds['lo'] is None:
+        return []
+    lo, hi = bounds['lo'], bounds['hi'] + 1
+    step = max(1, -(-(hi - lo) // parts))
+    return [(start, min(start + step, hi)) for start in range(lo, hi, step)]
+
+
+def sync_insureds_in_parallel(queryset, workers, batch_size=None, chunk_size=None, progress=None):
+    """Sync disjoint primary-key ranges concurrently, one thread per range.
+
+    Workers spend most of their time waiting on PostgreSQL cursors and Bolt
+    round trips, so threads are enough to keep Neo4j busy. Each thread gets
+    its own Django DB connection (closed when it finishes) and its own Neo4j
+    sessions from the shared pool.
+    """
+    ranges = partition_pk_ranges(queryset, workers)
+    started = time.monotonic()
+    done = [0] * len(ranges)
+    lock = threading.Lock()
+
+    def sync_range(index, pk_range):
+        def report(synced, elapsed):
+            with lock:
+                done[index] = synced
+                if progress:
+                    progress(sum(done), time.monotonic() - started)
+
+        try:
+            start, end = pk_range
+            return sync_insureds_to_neo4j(queryset.filter(pk__gte=start, pk__lt=end), batch_size=batch_size,
+                                          chunk_size=chunk_size, progress=report)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(ranges) or 1, thread_name_prefix='neo4j-sync') as pool:
+        futures = [pool.submit(sync_range, index, pk_range) for index, pk_range in enumerate(ranges)]
+        return sum(future.result() for future in futures)
+
+
+def sync_insureds_to_neo4j(queryset, batch_size=None, chunk_size=None, progress=None):
+    """Stream insureds from PostgreSQL and write them to Neo4j in UNWIND batches.
+
+    ``progress`` is called after each batch with ``(synced, elapsed_seconds)``.
+    """
+    batch_size = batch_size or settings.NEO4J_SYNC_BATCH_SIZE
+    chunk_size = chunk_size or batch_size
+    rows = queryset.order_by('pk').values_list(*INSURED_SYNC_FIELDS).iterator(chunk_size=chunk_size)
+
+    neo4j = Neo4jClient()
+    synced = 0
+    started = time.monotonic()
+    batch = []
+    for row in rows:
+        batch.append(_row_params(row))
+        if len(batch) >= batch_size:
+            synced += neo4j.upsert_insureds(batch)
+            batch = []
+            if progress:
+                progress(synced, time.monotonic() - started)
+    if batch:
+        synced += neo4j.upsert_insureds(batch)
+        if progress:
+            progress(synced, time.monotonic() - started)
 
     neo4j.close()
-    print("✅ All insured members synced to Neo4j")
+    return synced
+
+
+# Upsert insureds in a single statement: nodes are kept (no DETACH DELETE),
+# their properties are refreshed, and stale HAS_PHONE/HAS_ADDRESS edges are
+# dropped only when the phone or address actually changed. Used for single saves.
+UPSERT_INSUREDS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (i:Insured {id: row.id})
+    SET i.name = row.name,
+        i.national_code = row.national_code
+
+    WITH i, row
+    OPTIONAL MATCH (i)-[old_phone:HAS_PHONE]->(p:Phone)
+    WHERE p.number <> row.phone
+    DELETE old_phone
+
+    WITH DISTINCT i, row
+    MERGE (p:Phone {number: row.phone})
+    MERGE (i)-[:HAS_PHONE]->(p)
+
+    WITH i, row
+    OPTIONAL MATCH (i)-[old_address:HAS_ADDRESS]->(a:Address)
+    WHERE a.text <> row.address
+    DELETE old_address
+
+    WITH DISTINCT i, row
+    MERGE (a:Address {text: row.address})
+    MERGE (i)-[:HAS_ADDRESS]->(a)
+"""
+
+# Bulk sync splits the same upsert into three phases inside one transaction.
+# Insured nodes never overlap between workers, and shared Phone/Address nodes
+# are always locked in sorted key order (all phones, then all addresses), so
+# concurrent batches cannot wait on each other in a cycle.
+UPSERT_INSURED_NODES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (i:Insured {id: row.id})
+    SET i.name = row.name,
+        i.national_code = row.national_code
+"""
+
+LINK_PHONES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (i:Insured {id: row.id})
+    OPTIONAL MATCH (i)-[old_phone:HAS_PHONE]->(p:Phone)
+    WHERE p.number <> row.phone
+    DELETE old_phone
+
+    WITH DISTINCT i, row
+    MERGE (p:Phone {number: row.phone})
+    MERGE (i)-[:HAS_PHONE]->(p)
+"""
+
+LINK_ADDRESSES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (i:Insured {id: row.id})
+    OPTIONAL MATCH (i)-[old_address:HAS_ADDRESS]->(a:Address)
+    WHERE a.text <> row.address
+    DELETE old_address
+
+    WITH DISTINCT i, row
+    MERGE (a:Address {text: row.address})
+    MERGE (i)-[:HAS_ADDRESS]->(a)
+"""
+
+FRAUD_SCORE_QUERY = """
+    MATCH (i:Insured {id: $id})
+    OPTIONAL MATCH (i)-[:HAS_PHONE]->(p)<-[:HAS_PHONE]-(phone_frauds:Insured)
+    WHERE phone_frauds.id <> i.id
+    OPTIONAL MATCH (i)-[:HAS_ADDRESS]->(a)<-[:HAS_ADDRESS]-(address_frauds:Insured)
+    WHERE address_frauds.id <> i.id
+    RETURN
+        COUNT(DISTINCT phone_frauds) * 30 +
+        COUNT(DISTINCT address_frauds) * 20 AS fraud_score
+"""
+
+# Same score as FRAUD_SCORE_QUERY for many insureds in one round trip;
+# insureds missing from the graph produce no row.
+FRAUD_SCORES_QUERY = """
+    UNWIND $ids AS insured_id
+    MATCH (i:Insured {id: insured_id})
+    OPTIONAL MATCH (i)-[:HAS_PHONE]->(p)<-[:HAS_PHONE]-(phone_frauds:Insured)
+    WHERE phone_frauds.id <> i.id
+    WITH i, COUNT(DISTINCT phone_frauds) AS phone_count
+    OPTIONAL MATCH (i)-[:HAS_ADDRESS]->(a)<-[:HAS_ADDRESS]-(address_frauds:Insured)
+    WHERE address_frauds.id <> i.id
+    RETURN
+        i.id AS id,
+        phone_count * 30 + COUNT(DISTINCT address_frauds) * 20 AS fraud_score
+"""
+
+# Who shares each insured's phone and address, for rule explanations
+SHARED_ATTRIBUTES_QUERY = """
+    UNWIND $ids AS insured_id
+    MATCH (i:Insured {id: insured_id})
+    OPTIONAL MATCH (i)-[:HAS_PHONE]->(p)<-[:HAS_PHONE]-(phone_sharer:Insured)
+    WHERE phone_sharer.id <> i.id
+    WITH i, COLLECT(DISTINCT phone_sharer.id) AS phone
+    OPTIONAL MATCH (i)-[:HAS_ADDRESS]->(a)<-[:HAS_ADDRESS]-(address_sharer:Insured)
+    WHERE address_sharer.id <> i.id
+    RETURN i.id AS id, phone, COLLECT(DISTINCT address_sharer.id) AS address
+"""
+
+# Every lookup is MATCH/MERGE on one of these properties; the uniqueness
+# constraints give each of them a backing index so they become index seeks
+# instead of label scans.
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT insured_id_unique IF NOT EXISTS FOR (i:Insured) REQUIRE i.id IS UNIQUE",
+    "CREATE CONSTRAINT phone_number_unique IF NOT EXISTS FOR (p:Phone) REQUIRE p.number IS UNIQUE",
+    "CREATE CONSTRAINT address_text_unique IF NOT EXISTS FOR (a:Address) REQUIRE a.text IS UNIQUE",
+]
+
+INSURED_SYNC_FIELDS = ('id', 'full_name', 'national_code', 'phone_number', 'address')
+
+
+def _row_params(row):
+    insured_id, full_name, national_code, phone_number, address = row
+    return {
+        "id": insured_id,
+        "name": full_name,
+        "national_code": national_code,
+        "phone": normalize_phone(phone_number),
+        "address": normalize_address(address),
+    }
+
+
+def _insured_params(insured):
+    return _row_params([getattr(insured, field) for field in INSURED_SYNC_FIELDS])
+
+
+def _upsert_insureds(tx, rows):
+    tx.run(UPSERT_INSUREDS_QUERY, rows=rows).consume()
+
+
+def _delete_insureds(tx, insured_ids):
+    tx.run("UNWIND $ids AS id MATCH (i:Insured {id: id}) DETACH DELETE i", ids=insured_ids).consume()
+
+
+def _upsert_insureds_ordered(tx, rows):
+    tx.run(UPSERT_INSURED_NODES_QUERY, rows=sorted(rows, key=lambda row: row["id"])).consume()
+    tx.run(LINK_PHONES_QUERY, rows=sorted(rows, key=lambda row: row["phone"])).consume()
+    tx.run(LINK_ADDRESSES_QUERY, rows=sorted(rows, key=lambda row: row["address"])).consume()
+
 
 class Neo4jClient:
     def __init__(self):
-        self.driver = GraphDatabase.driver(
-            "bolt://neo4j:7687",
-            auth=("neo4j", "password123")
-        )
+        self.driver = get_driver()
 
     def close(self):
-        self.driver.close()
+        """Release this client; the shared driver stays open for reuse"""
+        self.driver = None
 
+    @observed_query('create_insured_node')
     def create_insured_node(self, insured):
-        """Create insured node in Neo4j with intelligent duplicate handling for phone and address"""
+        """Create or update insured node in Neo4j, rewiring only the phone/address edges that changed"""
         with self.driver.session() as session:
-            # Delete existing node (if any)
-            session.run("MATCH (i:Insured {id: $id}) DETACH DELETE i", id=insured.id)
-
-            # Create insured node
-            session.run("""
-                CREATE (i:Insured {
-                    id: $id,
-                    name: $name,
-                    national_code: $national_code
-                })
-            """,
-                id=insured.id,
-                name=insured.full_name,
-                national_code=insured.national_code
-            )
+            session.execute_write(write_work(_upsert_insureds), [_insured_params(insured)])
+        logger.debug(f"✅ {insured.full_name} added to Neo4j")
 
-            # Phone number - MERGE prevents duplicates!
-            session.run("""
-                MATCH (i:Insured {id: $id})
-                MERGE (p:Phone {number: $phone})
-                MERGE (i)-[:HAS_PHONE]->(p)
-            """,
-                id=insured.id,
-                phone=insured.phone_number
-            )
+    @observed_query('upsert_insureds')
+    def upsert_insureds(self, rows):
+        """Write a batch of insured rows (see _row_params) in one transaction.
 
-            # Address - MERGE prevents duplicates!
-            session.run("""
-                MATCH (i:Insured {id: $id})
-                MERGE (a:Address {text: $address})
-                MERGE (i)-[:HAS_ADDRESS]->(a)
-            """,
-                id=insured.id,
-                address=insured.address
-            )
+        Transient failures such as deadlocks are retried by execute_write for up
+        to NEO4J_MAX_TRANSACTION_RETRY_TIME seconds.
+        """
+        with self.driver.session() as session:
+            session.execute_write(write_work(_upsert_insureds_ordered), rows)
+        return len(rows)
 
-            print(f"✅ {insured.full_name} added to Neo4j")
+    @observed_query('delete_insured_nodes')
+    def delete_insured_nodes(self, insured_ids):
+        """Remove insured nodes (and their edges) in one transaction"""
+        with self.driver.session() as session:
+            session.execute_write(write_work(_delete_insureds), list(insured_ids))
 
+    @observed_query('check_fraud')
     def check_fraud(self, insured_id):
         """Fraud detection - duplicate phone numbers and addresses"""
         with self.driver.session() as session:
@@ -91,19 +568,56 @@ class Neo4jClient:
 
             return result.single()
 
+    @observed_query('get_fraud_score')
     def get_fraud_score(self, insured_id):
         """Get fraud score from Neo4j"""
         with self.driver.session() as session:
-            result = session.run("""
-                MATCH (i:Insured {id: $id})
-                OPTIONAL MATCH (i)-[:HAS_PHONE]->(p)<-[:HAS_PHONE]-(phone_frauds:Insured)
-                WHERE phone_frauds.id <> i.id
-                OPTIONAL MATCH (i)-[:HAS_ADDRESS]->(a)<-[:HAS_ADDRESS]-(address_frauds:Insured)
-                WHERE address_frauds.id <> i.id
-                RETURN 
-                    COUNT(DISTINCT phone_frauds) * 30 + 
-                    COUNT(DISTINCT address_frauds) * 20 AS fraud_score
-            """, id=insured_id)
+            result = session.run(read_query(FRAUD_SCORE_QUERY), id=insured_id)
 
             record = result.single()
-            return record["fraud_score"] if record else 0
\ No newline at end of file
+            return record["fraud_score"] if record else 0
+
+    @observed_query('get_fraud_scores')
+    def get_fraud_scores(self, insured_ids):
+        """Fraud scores for many insureds in one query: {insured_id: score}, 0 when not in the graph"""
+        insured_ids = list(insured_ids)
+        if not insured_ids:
+            return {}
+        scores = dict.fromkeys(insured_ids, 0)
+        with self.driver.session() as session:
+            for record in session.run(read_query(FRAUD_SCORES_QUERY), ids=insured_ids):
+                scores[record["id"]] = record["fraud_score"]
+        return scores
+
+    @observed_query('get_shared_attributes')
+    def get_shared_attributes(self, insured_ids):
+        """Ids of the other insureds on the same phone/address, in one query"""
+        insured_ids = list(insured_ids)
+        shared = {insured_id: {"phone": [], "address": []} for insured_id in insured_ids}
+        if not insured_ids:
+            return shared
+        with self.driver.session() as session:
+            for record in session.run(read_query(SHARED_ATTRIBUTES_QUERY), ids=insured_ids):
+                shared[record["id"]] = {"phone": record["phone"], "address": record["address"]}
+        return shared
+
+    def ensure_schema(self):
+        """Create the uniqueness constraints the hot queries seek on (idempotent)"""
+        with self.driver.session() as session:
+            for statement in SCHEMA_STATEMENTS:
+                session.run(statement).consume()
+        logger.info("✅ Neo4j constraints ensured")
+
+    def plan_operators(self, query, **params):
+        """Operator types in the EXPLAIN plan of ``query`` (e.g. 'NodeUniqueIndexSeek')"""
+        with self.driver.session() as session:
+            plan = session.run("EXPLAIN " + query, **params).consume().plan
+
+        operators = set()
+        stack = [plan] if plan else []
+        while stack:
+            step = stack.pop()
+            # "NodeUniqueIndexSeek(Locking)@neo4j" -> "NodeUniqueIndexSeek"
+            operators.add(step["operatorType"].split("@")[0].split("(")[0])
+            stack.extend(step.get("children", []))
+        return operators
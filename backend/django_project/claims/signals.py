@@ -1,82 +1,66 @@
 # backend/django_project/claims/signals.py
-import asyncio
-from django.db.models.signals import post_save, post_delete, pre_save
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Insured, Claim, FraudAlert
-from .nats_client import NATSClient
-from .services import Neo4jClient
+from .models import Insured, Claim, OutboxEvent
+from .fraud_index import loaded_fraud_index
+from .outbox import enqueue
+from .services import ensure_neo4j_schema
+
+logger = logging.getLogger(__name__)
+
+# Receivers only write outbox rows in the saving transaction; Neo4j sync,
+# scoring and NATS notifications are delivered by `manage.py outbox_relay`.
 
 
 # ================ Insured Signals ================
 @receiver(post_save, sender=Insured)
 def sync_insured_to_neo4j(sender, instance, created, **kwargs):
-    """Sync Insured to Neo4j when saved"""
-    neo4j = Neo4jClient()
-    neo4j.create_insured_node(instance)
-    neo4j.close()
+    """Queue Insured for Neo4j sync, and its feature row and ring refresh, when saved"""
+    enqueue(OutboxEvent.INSURED_UPSERT, {"id": instance.id})
+    enqueue(OutboxEvent.INSURED_RISK, {"id": instance.id})
+    index = loaded_fraud_index()
+    if index is not None:
+        transaction.on_commit(lambda: index.add(instance.id, instance.phone_number, instance.address))
     action = "Created" if created else "Updated"
-    print(f"{action}: {instance.full_name} synced to Neo4j")
+    logger.debug(f"{action}: {instance.full_name} queued for Neo4j sync")
 
 
 @receiver(post_delete, sender=Insured)
 def delete_insured_from_neo4j(sender, instance, **kwargs):
-    """Delete Insured from Neo4j when removed"""
-    neo4j = Neo4jClient()
-    with neo4j.driver.session() as session:
-        session.run("MATCH (i:Insured {id: $id}) DETACH DELETE i", id=instance.id)
-    neo4j.close()
-    print(f"{instance.full_name} deleted from Neo4j")
+    """Queue Insured removal from Neo4j, and from its feature row and ring, when deleted"""
+    enqueue(OutboxEvent.INSURED_DELETE, {"id": instance.id})
+    enqueue(OutboxEvent.INSURED_RISK, {"id": instance.id})
+    index = loaded_fraud_index()
+    if index is not None:
+        insured_id = instance.id
+        transaction.on_commit(lambda: index.remove(insured_id))
+    logger.debug(f"{instance.full_name} queued for Neo4j removal")
 
 
 # ================ Claim Signals ================
-@receiver(pre_save, sender=Claim)
+@receiver(post_save, sender=Claim)
 def calculate_fraud_score(sender, instance, **kwargs):
-    """Calculate fraud score before saving Claim"""
+    """Queue fraud scoring (and alerting) for the saved Claim"""
     if instance.insured_id:
-        neo4j = Neo4jClient()
-        instance.fraud_score = neo4j.get_fraud_score(instance.insured_id)
-        neo4j.close()
-        print(f"Fraud score for {instance.claim_number}: {instance.fraud_score}")
+        enqueue(OutboxEvent.CLAIM_SCORE, {"id": instance.id, "insured_id": instance.insured_id})
 
 
-@receiver(post_save, sender=Claim)
-def create_fraud_alert_and_notify(sender, instance, created, **kwargs):
-    """Create fraud alert and send NATS notification for high-risk claims"""
-    if instance.fraud_score >= 30 and not hasattr(instance, 'alert'):
-        # Create FraudAlert in database
-        alert = FraudAlert.objects.create(
-            claim=instance,
-            fraud_score=instance.fraud_score,
-            signals=[f"Fraud score: {instance.fraud_score}"]
-        )
-        print(f"🚨 Fraud alert created for {instance.claim_number}")
+@receiver(post_delete, sender=Claim)
+def refresh_insured_features(sender, instance, **kwargs):
+    """Queue the insured's claim totals refresh (claims/features.py) for a deleted Claim"""
+    if instance.insured_id:
+        enqueue(OutboxEvent.INSURED_FEATURES, {"id": instance.insured_id})
 
-        # Send NATS notification
-        try:
-            nats_client = NATSClient()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(nats_client.connect())
-            loop.run_until_complete(nats_client.publish_fraud_alert(
-                claim_id=instance.id,
-                fraud_score=instance.fraud_score,
-                signals=["Duplicate phone number" if instance.fraud_score >= 30 else "Duplicate address"]
-            ))
-            loop.run_until_complete(nats_client.close())
-            loop.close()
-        except Exception as e:
-            print(f"⚠️ NATS notification failed: {e}")
 
-# ================ Fraud Alert Signals ================
-@receiver(post_save, sender=Claim)
-def create_fraud_alert(sender, instance, created, **kwargs):
-    """ایجاد خودکار هشدار تقلب برای claims با امتیاز بالا"""
-    if instance.fraud_score >= 30:  # آستانه تقلب
-        # اگه از قبل هشدار نداره، بساز
-        if not hasattr(instance, 'alert'):
-            FraudAlert.objects.create(
-                claim=instance,
-                fraud_score=instance.fraud_score,
-                signals=[f"Fraud score: {instance.fraud_score}"]
-            )
-            print(f"Fraud alert created for {instance.claim_number}")
\ No newline at end of file
+# ================ Schema Signals ================
+def ensure_neo4j_schema_after_migrate(sender, **kwargs):
+    """Create Neo4j constraints after `migrate` so a fresh graph never runs label scans"""
+    if not settings.NEO4J_ENSURE_SCHEMA_ON_MIGRATE:
+        return
+    try:
+        ensure_neo4j_schema()
+    except Exception as e:
+        logger.warning(f"⚠️ Neo4j schema setup skipped ({e}); run `manage.py neo4j_schema` once Neo4j is up")
@@ -1,14 +1,47 @@
 # backend/django_project/claims/tests.py
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import caches
+from django.db import connection
+from io import StringIO
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase, APIClient
-from .models import Insured, Claim, FraudAlert
+from asgiref.sync import sync_to_async
+from .models import Insured, Claim, FraudAlert, OutboxEvent, ImportCheckpoint, InsuredFeatures, allocate_claim_numbers
+from .outbox import claim_events, relay_outbox, rescore_degraded
+from .normalization import normalize_phone, normalize_address, NearDuplicateIndex
+from .rules import RuleEngine, SharedPhoneRule, ClaimVelocityRule, AmountOutlierRule, EarlyClaimRule
+from .score_cache import score_cache
+from .fraud_index import SharedAttributeIndex, ProcessFraudIndex, get_fraud_index, reset_fraud_index
+from .rings import RingIndex, get_ring_index, maybe_recompute_rings, reset_ring_index
+from .features import FeatureScorer
+from . import services
 from .services import Neo4jClient
+from .nats_client import NATSClient, FraudAlertPublisher
+from .async_services import apublish_fraud_alerts
+from prometheus_client import REGISTRY
+from .metrics import NEO4J_BREAKER_STATE, NEO4J_QUERY_SECONDS, OUTBOX_EVENTS_QUEUED
+from .log_handlers import QueueStreamHandler
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, HALF_OPEN, CLOSED, is_outage, neo4j_breaker
 import asyncio
 import nats
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, CypherSyntaxError, ClientError
+import csv
 import json
-from unittest.mock import patch, MagicMock
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock, AsyncMock
 
 User = get_user_model()
 
@@ -88,6 +121,25 @@ class ClaimModelTest(TestCase):
         self.assertNotEqual(claim1.claim_number, claim2.claim_number)
         self.assertTrue(claim1.claim_number.startswith("CL-"))
 
+    def test_claim_number_not_reused_after_delete(self):
+        """بعد از حذف خسارت، شماره پرونده تکراری ساخته نمی‌شود"""
+        claims = [Claim.objects.create(insured=self.insured, amount=1000000,
+                                       accident_date="2026-02-13", description=f"test{n}")
+                  for n in range(2)]
+        claims[0].delete()
+
+        claim = Claim.objects.create(insured=self.insured, amount=1000000,
+                                     accident_date="2026-02-13", description="test3")
+
+        self.assertNotIn(claim.claim_number, [c.claim_number for c in claims])
+
+    def test_allocate_claim_number_block(self):
+        """رزرو دسته‌ای شماره پرونده"""
+        numbers = allocate_claim_numbers(3)
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(re.fullmatch(r"CL-\d{6,}", number) for number in numbers))
+
 class FraudAlertModelTest(TestCase):
     def setUp(self):
         self.insured = Insured.objects.create(
@@ -111,6 +163,8 @@ class FraudAlertModelTest(TestCase):
             accident_date="2026-02-13",
             description="تصادف",
         )
+        relay_outbox()  # همگام‌سازی و امتیازدهی از طریق outbox انجام می‌شود
+        self.claim.refresh_from_db()
 
     def test_fraud_alert_creation(self):
         """تست ایجاد هشدار تقلب"""
@@ -145,6 +199,184 @@ class Neo4jServiceTest(TestCase):
         self.assertIsInstance(score, (int, float))
         self.assertGreaterEqual(score, 0)
 
+class SharedDriverTest(SimpleTestCase):
+    """تست درایور مشترک Neo4j"""
+
+    def setUp(self):
+        services.close_driver()
+
+    def tearDown(self):
+        services.close_driver()
+
+    @patch('claims.services.GraphDatabase.driver')
+    def test_clients_share_one_driver(self, mock_driver):
+        """همه کلاینت‌ها از یک درایور استفاده می‌کنند"""
+        first = Neo4jClient()
+        first.close()
+        second = Neo4jClient()
+        self.assertIs(first.driver, None)
+        self.assertIs(second.driver, mock_driver.return_value)
+        mock_driver.assert_called_once()
+        mock_driver.return_value.close.assert_not_called()
+
+    @patch('claims.services.os.getpid')
+    @patch('claims.services.GraphDatabase.driver')
+    def test_new_driver_after_fork(self, mock_driver, mock_getpid):
+        """بعد از fork درایور جدید ساخته می‌شود"""
+        mock_getpid.return_value = 100
+        services.get_driver()
+        mock_getpid.return_value = 200
+        services.get_driver()
+        self.assertEqual(mock_driver.call_count, 2)
+        mock_driver.return_value.close.assert_not_called()
+
+    @patch('claims.services.GraphDatabase.driver')
+    def test_pool_stats(self, mock_driver):
+        """آمار pool از ساختار داخلی درایور خوانده می‌شود و نبود آن خطا نمی‌دهد"""
+        pool = mock_driver.return_value._pool
+        pool.lock = threading.RLock()
+        pool.connections = {"neo4j:7687": [MagicMock(in_use=True), MagicMock(in_use=False), MagicMock(in_use=False)]}
+        services.get_driver()
+        stats = services.pool_stats()
+        self.assertEqual((stats["open"], stats["in_use"], stats["idle"]), (3, 1, 2))
+        services.record_pool_connections()
+        self.assertEqual(metric_value('neo4j_pool_connections', state='in_use'), 1)
+        self.assertEqual(metric_value('neo4j_pool_connections', state='idle'), 2)
+
+        # A driver upgrade that drops the private pool API
+        del mock_driver.return_value._pool
+        services._private_api_warned.clear()
+        with self.assertLogs('claims.services', 'WARNING'):
+            stats = services.pool_stats()
+        self.assertEqual((stats["open"], stats["in_use"]), (0, 0))
+
+    def test_time_pool_acquire(self):
+        """انتظار برای اتصال pool زمان‌سنجی می‌شود و نبود API خصوصی هشدار می‌دهد"""
+        delta = MetricDelta()
+        driver = MagicMock()
+        driver._pool.acquire.return_value = 'connection'
+        services.time_pool_acquire(driver)
+        self.assertEqual(driver._pool.acquire('neo4j:7687'), 'connection')
+        self.assertEqual(delta('neo4j_pool_acquire_seconds_count'), 1)
+
+        services._private_api_warned.clear()
+        with self.assertLogs('claims.services', 'WARNING') as logs:
+            services.time_pool_acquire(object())
+        self.assertIn('time_pool_acquire', logs.output[0])
+
+
+class InsuredUpsertTest(SimpleTestCase):
+    """تست ذخیره بیمه‌شده در Neo4j"""
+
+    def setUp(self):
+        neo4j_breaker.reset()
+
+    @patch('claims.services.get_driver')
+    def test_upsert_is_one_write_transaction(self, mock_get_driver):
+        """ذخیره بیمه‌شده فقط یک تراکنش نوشتنی است"""
+        session = mock_get_driver.return_value.session.return_value.__enter__.return_value
+        insured = Insured(id=7, national_code="1234567890", full_name="علی محمدی",
+                          phone_number="09121111111", address="تهران")
+
+        Neo4jClient().create_insured_node(insured)
+
+        session.execute_write.assert_called_once()
+        session.run.assert_not_called()
+        tx = MagicMock()
+        work, params = session.execute_write.call_args.args
+        work(tx, params)
+        query = tx.run.call_args.args[0]
+        sent = tx.run.call_args.kwargs["rows"]
+        self.assertNotIn("DETACH DELETE", query)
+        self.assertEqual(sent, [{"id": 7, "name": "علی محمدی", "national_code": "1234567890",
+                                 "phone": "+989121111111", "address": "تهران"}])
+
+
+class BulkSyncTest(TestCase):
+    """تست همگام‌سازی دسته‌ای با Neo4j"""
+
+    def setUp(self):
+        for n in range(5):
+            Insured.objects.create(
+                national_code=f"100000000{n}",
+                full_name=f"بیمه‌شده {n}",
+                phone_number=f"0912000000{n}",
+                address="تهران"
+            )
+
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    def test_sync_in_batches(self, mock_upsert):
+        """ارسال دسته‌ای با UNWIND و گزارش پیشرفت"""
+        progress = MagicMock()
+        total = services.sync_all_to_neo4j(batch_size=2, progress=progress)
+
+        self.assertEqual(total, 5)
+        self.assertEqual([len(c.args[0]) for c in mock_upsert.call_args_list], [2, 2, 1])
+        self.assertEqual(progress.call_count, 3)
+        self.assertEqual(mock_upsert.call_args_list[0].args[0][0]["phone"], "+989120000000")
+
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    def test_sync_since(self, mock_upsert):
+        """حالت افزایشی فقط رکوردهای تغییر کرده را می‌فرستد"""
+        now = timezone.now()
+        Insured.objects.update(updated_at=now - timedelta(days=2))
+        Insured.objects.filter(national_code="1000000000").update(updated_at=now)
+
+        total = services.sync_all_to_neo4j(since=now - timedelta(days=1))
+
+        self.assertEqual(total, 1)
+
+
+class ParallelSyncTest(TransactionTestCase):
+    """تست همگام‌سازی موازی با Neo4j"""
+
+    def setUp(self):
+        for n in range(10):
+            Insured.objects.create(
+                national_code=f"200000000{n}",
+                full_name=f"بیمه‌شده {n}",
+                phone_number="09120000000",
+                address=f"آدرس {n}"
+            )
+
+    def test_partition_covers_all_ids(self):
+        """بازه‌های کلید اصلی همه رکوردها را بدون هم‌پوشانی پوشش می‌دهند"""
+        ranges = services.partition_pk_ranges(Insured.objects.all(), 3)
+        ids = list(Insured.objects.values_list('pk', flat=True))
+
+        self.assertEqual(len(ranges), 3)
+        for pk in ids:
+            self.assertEqual(sum(start <= pk < end for start, end in ranges), 1)
+
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    def test_parallel_sync(self, mock_upsert):
+        """هر بیمه‌شده دقیقاً یک بار ارسال می‌شود"""
+        total = services.sync_all_to_neo4j(batch_size=2, workers=4)
+
+        sent = [row["id"] for c in mock_upsert.call_args_list for row in c.args[0]]
+        self.assertEqual(total, 10)
+        self.assertCountEqual(sent, Insured.objects.values_list('pk', flat=True))
+
+
+class Neo4jSchemaTest(SimpleTestCase):
+    """تست ایندکس‌ها و قیدهای یکتایی Neo4j"""
+
+    def setUp(self):
+        self.neo4j = Neo4jClient()
+        self.neo4j.ensure_schema()
+
+    def tearDown(self):
+        self.neo4j.close()
+
+    def test_hot_queries_use_index_seek(self):
+        """کوئری‌های پرتکرار از ایندکس استفاده می‌کنند نه اسکن برچسب"""
+        from .management.commands.neo4j_schema import HOT_QUERIES, INDEX_SEEKS
+        for name, (query, params) in HOT_QUERIES.items():
+            operators = self.neo4j.plan_operators(query, **params)
+            self.assertTrue(operators & INDEX_SEEKS, f"{name}: {operators}")
+            self.assertNotIn("NodeByLabelScan", operators, name)
+
+
 def test_fraud_score_calculation(self):
         """تست فرمول محاسبه امتیاز تقلب"""
         # این تست نیاز به Neo4j واقعی داره
@@ -224,6 +456,178 @@ class NATSTest(TestCase):
         self.assertEqual(received[0]['fraud_score'], 75)
 
 
+def fake_jetstream_connection():
+    """اتصال ساختگی NATS با JetStream"""
+    js = MagicMock(publish=AsyncMock(return_value=MagicMock(duplicate=False)), stream_info=AsyncMock(),
+                   update_stream=AsyncMock(), add_stream=AsyncMock(), pull_subscribe=AsyncMock())
+    nc = MagicMock(is_closed=False, close=AsyncMock())
+    nc.jetstream.return_value = js
+    return nc, js
+
+
+class FraudAlertPublisherTest(SimpleTestCase):
+    """تست ناشر دائمی NATS"""
+
+    def setUp(self):
+        self.publisher = FraudAlertPublisher(server="nats://test:4222", batch_size=10,
+                                             queue_size=100, publish_timeout=1)
+
+    def tearDown(self):
+        self.publisher.close()
+
+    @patch('claims.nats_client.nats.connect', new_callable=AsyncMock)
+    def test_one_connection_for_many_alerts(self, mock_connect):
+        """چند هشدار با یک اتصال ارسال می‌شوند"""
+        nc, js = fake_jetstream_connection()
+        mock_connect.return_value = nc
+        self.publisher.start()
+
+        futures = [self.publisher.publish_fraud_alert(claim_id=n, fraud_score=50, signals=[]) for n in range(5)]
+
+        for future in futures:
+            future.result(timeout=2)
+        mock_connect.assert_awaited_once()
+        self.assertEqual(js.publish.await_count, 5)
+        self.assertEqual(json.loads(js.publish.await_args_list[0].args[1])["severity"], "medium")
+
+    @patch('claims.nats_client.nats.connect', new_callable=AsyncMock)
+    def test_message_id_deduplicates_retries(self, mock_connect):
+        """شناسه پیام از شماره خسارت و نسخه ساخته می‌شود"""
+        nc, js = fake_jetstream_connection()
+        mock_connect.return_value = nc
+        self.publisher.start()
+
+        self.publisher.publish_fraud_alert(claim_id=5, fraud_score=75, signals=[], version=3).result(timeout=2)
+
+        self.assertEqual(js.publish.await_args.kwargs["headers"], {"Nats-Msg-Id": "fraud-alert-5-3"})
+
+    @patch('claims.nats_client.nats.connect', new_callable=AsyncMock)
+    def test_reconnects_after_failure(self, mock_connect):
+        """پس از خطای اتصال، دسته بعدی دوباره وصل می‌شود"""
+        nc, js = fake_jetstream_connection()
+        mock_connect.side_effect = [ConnectionError("NATS down"), nc]
+        self.publisher.start()
+
+        failed = self.publisher.publish_fraud_alert(claim_id=1, fraud_score=80, signals=[])
+        with self.assertRaises(ConnectionError):
+            failed.result(timeout=2)
+
+        self.publisher.publish_fraud_alert(claim_id=2, fraud_score=80, signals=[]).result(timeout=2)
+        self.assertEqual(mock_connect.await_count, 2)
+
+    @patch('claims.nats_client.nats.connect', new_callable=AsyncMock)
+    def test_close_publishes_batch_in_flight(self, mock_connect):
+        """بستن ناشر دسته‌ای را که در حال ارسال است و صف باقی‌مانده را منتشر می‌کند"""
+        nc, js = fake_jetstream_connection()
+        mock_connect.return_value = nc
+        sending = threading.Event()
+
+        async def slow_publish(*args, **kwargs):
+            sending.set()
+            await asyncio.sleep(0.1)
+            return MagicMock(duplicate=False)
+        js.publish.side_effect = slow_publish
+        self.publisher.start()
+
+        first = self.publisher.publish_fraud_alert(claim_id=1, fraud_score=50, signals=[])
+        sending.wait(2)
+        rest = [self.publisher.publish_fraud_alert(claim_id=n, fraud_score=50, signals=[]) for n in range(2, 5)]
+        self.publisher.close()
+
+        for future in [first, *rest]:
+            self.assertFalse(future.result(timeout=0).duplicate)
+        self.assertEqual(js.publish.await_count, 4)
+        nc.close.assert_awaited_once()
+
+    @patch('claims.nats_client.nats.connect', new_callable=AsyncMock)
+    def test_close_fails_unpublished_alerts(self, mock_connect):
+        """اگر NATS تا پایان مهلت بستن پاسخ ندهد، هشدارهای منتشرنشده فوراً خطا می‌گیرند"""
+        nc, js = fake_jetstream_connection()
+        mock_connect.return_value = nc
+        sending = threading.Event()
+
+        async def stalled_publish(*args, **kwargs):
+            sending.set()
+            await asyncio.sleep(60)
+        js.publish.side_effect = stalled_publish
+        self.publisher.start()
+
+        futures = [self.publisher.publish_fraud_alert(claim_id=n, fraud_score=50, signals=[]) for n in range(3)]
+        sending.wait(2)
+        self.publisher.close(timeout=0.2)
+
+        for future in futures:
+            self.assertIsInstance(future.exception(timeout=0), RuntimeError)
+
+
+class FraudAlertListenerTest(SimpleTestCase):
+    """تست مصرف‌کننده pull با JetStream"""
+
+    def test_batch_is_acked_or_redelivered(self):
+        """پیام موفق ack و پیام ناموفق nak می‌شود"""
+        nc, js = fake_jetstream_connection()
+        ok = MagicMock(data=json.dumps({"claim_id": 1}).encode(), ack=AsyncMock(), nak=AsyncMock())
+        bad = MagicMock(data=json.dumps({"claim_id": 2}).encode(), ack=AsyncMock(), nak=AsyncMock())
+        js.pull_subscribe.return_value.fetch = AsyncMock(side_effect=[[ok, bad], asyncio.CancelledError()])
+
+        async def handler(data):
+            if data["claim_id"] == 2:
+                raise ValueError("handler failed")
+
+        client = NATSClient()
+        client.nc = nc
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(client.subscribe_fraud_alerts(handlers=[handler], batch_size=10, concurrency=2))
+
+        self.assertEqual(js.pull_subscribe.await_args.kwargs["durable"], "fraud-alert-listener")
+        ok.ack.assert_awaited_once()
+        ok.nak.assert_not_awaited()
+        bad.nak.assert_awaited_once()
+        bad.ack.assert_not_awaited()
+
+
+    def test_slow_handler_does_not_stall_stream(self):
+        """هندلر کند فقط یک جایگاه را اشغال می‌کند و هندلرهای همگام در thread pool اجرا می‌شوند"""
+        nc, js = fake_jetstream_connection()
+        msgs = [MagicMock(data=json.dumps({"claim_id": n}).encode(), ack=AsyncMock(), nak=AsyncMock())
+                for n in range(3)]
+        fetch_sizes = []
+
+        async def fetch(size, timeout):
+            fetch_sizes.append(size)
+            if len(fetch_sizes) == 1:
+                return msgs[:2]
+            if len(fetch_sizes) == 2:
+                return msgs[2:]
+            await asyncio.sleep(0.3)
+            raise asyncio.CancelledError()
+
+        js.pull_subscribe.return_value.fetch = fetch
+        finished = []
+        threads = []
+
+        async def slow_or_fast(data):
+            if data["claim_id"] == 0:
+                await asyncio.sleep(0.2)
+            finished.append(data["claim_id"])
+
+        def sync_handler(data):
+            threads.append(threading.current_thread().name)
+
+        client = NATSClient()
+        client.nc = nc
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(client.subscribe_fraud_alerts(handlers=[slow_or_fast, sync_handler],
+                                                      batch_size=10, concurrency=2))
+
+        self.assertEqual(fetch_sizes[:2], [2, 1])  # فقط به اندازه جایگاه خالی دریافت می‌شود
+        self.assertEqual(finished, [1, 2, 0])
+        self.assertTrue(all(name.startswith("alert-handler") for name in threads))
+        self.assertEqual(client.stats.processed, 3)
+        for msg in msgs:
+            msg.ack.assert_awaited_once()
+
+
 # ================ تست سیگنال‌ها ================
 class SignalsTest(TestCase):
     """تست سیگنال‌های Django"""
@@ -236,8 +640,9 @@ class SignalsTest(TestCase):
             address="تهران"
         )
 
-    @patch('claims.signals.Neo4jClient')
-    def test_insured_signal_sync_to_neo4j(self, mock_neo4j):
+    @override_settings(FRAUD_SCORE_CACHE=False)
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    def test_insured_signal_sync_to_neo4j(self, mock_upsert):
         """تست سیگنال همگام‌سازی با Neo4j"""
         # ایجاد بیمه‌شده جدید
         insured2 = Insured.objects.create(
@@ -246,8 +651,14 @@ class SignalsTest(TestCase):
             phone_number="09122222222",
             address="شیراز"
         )
-        # چک میکنیم سیگنال فراخوانی شده
-        mock_neo4j.return_value.create_insured_node.assert_called_with(insured2)
+        # سیگنال فقط رویداد outbox ثبت می‌کند
+        self.assertTrue(OutboxEvent.objects.filter(topic=OutboxEvent.INSURED_UPSERT,
+                                                   payload__id=insured2.id).exists())
+        mock_upsert.assert_not_called()
+
+        relay_outbox()
+        sent = [row["id"] for c in mock_upsert.call_args_list for row in c.args[0]]
+        self.assertIn(insured2.id, sent)
 
     def test_fraud_alert_signal_on_high_score(self):
         """تست ایجاد خودکار هشدار تقلب - فقط برای امتیاز بالای ۳۰"""
@@ -266,6 +677,8 @@ class SignalsTest(TestCase):
             accident_date="2026-02-13",
             description="تصادف"
         )
+        relay_outbox()
+        claim_clean.refresh_from_db()
 
         # برای امتیاز ۰، هشدار ساخته نمیشه
         self.assertFalse(hasattr(claim_clean, 'alert'))
@@ -284,34 +697,1580 @@ class SignalsTest(TestCase):
             accident_date="2026-02-13",
             description="تصادف"
         )
+        relay_outbox()
+        claim_duplicate.refresh_from_db()
 
         # برای امتیاز ≥ ۳۰، هشدار ساخته میشه
         self.assertTrue(hasattr(claim_duplicate, 'alert'))
         self.assertGreaterEqual(claim_duplicate.alert.fraud_score, 30)
 
 
+# ================ تست Outbox ================
+@override_settings(FRAUD_SCORE_CACHE=False)
+@patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+class OutboxRelayTest(TestCase):
+    """تست صف outbox و relay"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+
+    def create_claim(self):
+        insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        return Claim.objects.create(
+            insured=insured,
+            amount=5000000,
+            accident_date="2026-02-13",
+            description="تصادف"
+        )
+
+    @patch('claims.services.get_driver')
+    def test_save_does_not_call_neo4j(self, mock_get_driver, mock_upsert):
+        """ذخیره خسارت منتظر Neo4j نمی‌ماند"""
+        self.create_claim()
+
+        mock_get_driver.assert_not_called()
+        self.assertEqual(list(OutboxEvent.objects.values_list('topic', flat=True)),
+                         [OutboxEvent.INSURED_UPSERT, OutboxEvent.INSURED_RISK, OutboxEvent.CLAIM_SCORE])
+
+    def test_save_and_event_are_atomic(self, mock_upsert):
+        """اگر ثبت رویداد outbox شکست بخورد ذخیره مدل هم برگردانده می‌شود (بیرون از درخواست HTTP)"""
+        with patch('claims.signals.enqueue', side_effect=RuntimeError("outbox down")):
+            with self.assertRaises(RuntimeError):
+                self.create_claim()
+        self.assertFalse(Insured.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @patch('claims.outbox.publish_fraud_alert')
+    @patch('claims.services.Neo4jClient.get_shared_attributes',
+           side_effect=lambda ids: {i: {"phone": [900], "address": [901]} for i in ids})
+    def test_relay_scores_and_notifies(self, mock_shared, mock_publish, mock_upsert):
+        """relay امتیاز را ثبت، هشدار را ایجاد و پیام NATS را ارسال می‌کند"""
+        mock_publish.return_value = Future()
+        mock_publish.return_value.set_result(True)
+        claim = self.create_claim()
+
+        relay_outbox()
+        claim.refresh_from_db()
+        self.assertEqual(claim.fraud_score, 50)
+        self.assertEqual(claim.alert.fraud_score, 50)
+        self.assertEqual([signal["rule"] for signal in claim.fraud_signals], ["shared_phone", "shared_address"])
+        mock_publish.assert_not_called()
+
+        relay_outbox()
+        mock_publish.assert_called_once()
+        self.assertEqual(mock_publish.call_args.kwargs["claim_id"], claim.id)
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_failed_delivery_is_retried(self, mock_upsert):
+        """در صورت خطا رویداد با تأخیر دوباره ارسال می‌شود؛ ویژگی‌ها و حلقه‌ها منتظر Neo4j نمی‌مانند"""
+        mock_upsert.side_effect = ConnectionError("Neo4j down")
+        insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+
+        relay_outbox()
+
+        event = OutboxEvent.objects.get(topic=OutboxEvent.INSURED_UPSERT)
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("Neo4j down", event.last_error)
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIsNotNone(OutboxEvent.objects.get(topic=OutboxEvent.INSURED_RISK).processed_at)
+        self.assertTrue(InsuredFeatures.objects.filter(pk=insured.pk).exists())
+
+    @patch('claims.services.Neo4jClient.get_shared_attributes',
+           side_effect=lambda ids: {i: {"phone": [], "address": []} for i in ids})
+    def test_claim_score_waits_for_failed_upsert(self, mock_shared, mock_upsert):
+        """امتیاز خسارت بیمه‌شده‌ای که ذخیره‌اش در گراف شکست خورده تا تلاش دوباره آن عقب می‌افتد"""
+        synced = Insured.objects.create(national_code="0987654321", full_name="مریم احمدی",
+                                        phone_number="09122222222", address="شیراز")
+        relay_outbox()
+        mock_upsert.side_effect = ConnectionError("Neo4j down")
+        claim = self.create_claim()
+        other = Claim.objects.create(insured=synced, amount=1000000, accident_date="2026-02-13",
+                                     description="تصادف")
+
+        relay_outbox()
+
+        upsert = OutboxEvent.objects.get(topic=OutboxEvent.INSURED_UPSERT, processed_at__isnull=True)
+        held = OutboxEvent.objects.get(topic=OutboxEvent.CLAIM_SCORE, payload__id=claim.id)
+        self.assertIsNone(held.processed_at)
+        self.assertEqual(held.attempts, 0)
+        self.assertEqual(held.available_at, upsert.available_at)
+        self.assertIsNotNone(OutboxEvent.objects.get(topic=OutboxEvent.CLAIM_SCORE, payload__id=other.id)
+                             .processed_at)
+        self.assertEqual(mock_shared.call_args.args[0], [synced.id])
+
+        mock_upsert.side_effect = len
+        OutboxEvent.objects.filter(processed_at__isnull=True).update(available_at=timezone.now())
+        relay_outbox()
+        held.refresh_from_db()
+        self.assertIsNotNone(held.processed_at)
+        self.assertEqual(mock_shared.call_args.args[0], [claim.insured_id])
+
+
+class OutboxLeaseTest(TransactionTestCase):
+    """تست اجاره دسته outbox: هنگام انتظار برای NATS یا Neo4j تراکنش و قفلی باز نمی‌ماند"""
+
+    def test_handlers_wait_outside_transaction(self):
+        """relay پیش از انتشار دسته را اجاره و commit می‌کند؛ relay دیگر آن را برنمی‌دارد"""
+        event = OutboxEvent.objects.create(topic=OutboxEvent.FRAUD_ALERT, payload={
+            "claim_id": 1, "fraud_score": 50, "signals": [], "version": 1})
+        seen = {}
+
+        def publish(**payload):
+            seen["in_transaction"] = connection.in_atomic_block
+            seen["other_relay"] = claim_events(10)
+            future = Future()
+            future.set_result(True)
+            return future
+
+        with patch('claims.outbox.publish_fraud_alert', side_effect=publish):
+            self.assertEqual(relay_outbox(), 1)
+
+        self.assertFalse(seen["in_transaction"])
+        self.assertEqual(seen["other_relay"], [])
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed_at)
+
+    def test_lease_of_dead_relay_expires(self):
+        """اگر relay وسط دسته از کار بیفتد رویدادها پس از پایان اجاره دوباره برداشته می‌شوند"""
+        OutboxEvent.objects.create(topic=OutboxEvent.INSURED_FEATURES, payload={"id": 1})
+        self.assertEqual(len(claim_events(10)), 1)
+        self.assertEqual(claim_events(10), [])
+
+        later = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT + 1)
+        with patch('claims.outbox.timezone.now', return_value=later):
+            self.assertEqual(len(claim_events(10)), 1)
+
+
+# ================ تست نرمال‌سازی ================
+class NormalizationTest(SimpleTestCase):
+    """تست نرمال‌سازی تلفن و آدرس"""
+
+    def test_phone_formats_are_one_number(self):
+        """قالب‌های مختلف یک شماره به E.164 یکسان تبدیل می‌شوند"""
+        for raw in ["09121111111", "0912 111 1111", "+989121111111", "00989121111111", "۰۹۱۲۱۱۱۱۱۱۱"]:
+            self.assertEqual(normalize_phone(raw), "+989121111111", raw)
+
+    def test_address_letter_and_digit_variants(self):
+        """حروف عربی، ارقام فارسی و علائم در آدرس یکسان‌سازی می‌شوند"""
+        self.assertEqual(normalize_address("تهران، خ. ولي‌عصر، پلاك ۱۲"),
+                         normalize_address("تهران  خیابان ولی عصر پلاک 12"))
+
+    def test_near_duplicates_by_candidate_lookup(self):
+        """آدرس‌های نزدیک از طریق سطل‌های LSH پیدا می‌شوند"""
+        index = NearDuplicateIndex()
+        index.add(1, "تهران، خیابان ولیعصر، کوچه بهار، پلاک ۱۲")
+        index.add(2, "تهران خیابان ولیعصر کوچه بهار پلاک 13")
+        index.add(3, "شیراز بلوار زند")
+
+        pairs = list(index.pairs(threshold=0.8))
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual({*index.addresses[pairs[0][0]], *index.addresses[pairs[0][1]]}, {1, 2})
+        self.assertEqual(index.near_duplicates("شیراز بلوار زند"), [])
+
+
+# ================ تست موتور قواعد ================
+@override_settings(FRAUD_SCORER='neo4j')
+class RuleEngineTest(TestCase):
+    """تست قواعد تقلب و توضیح سیگنال‌ها"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        self.insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        # بیمه‌نامه قدیمی: قاعده خسارت زودهنگام فعال نشود
+        Insured.objects.filter(pk=self.insured.pk).update(created_at=timezone.now() - timedelta(days=365))
+
+    def claim(self, amount=1000000, accident_date="2026-02-13"):
+        return Claim.objects.create(insured=self.insured, amount=amount,
+                                    accident_date=accident_date, description="تصادف")
+
+    def test_velocity_and_amount_outlier(self):
+        """خسارت‌های پیاپی و مبلغ غیرعادی سیگنال جداگانه با توضیح می‌سازند"""
+        self.claim(accident_date="2026-01-01")
+        self.claim(accident_date="2026-01-20")
+        claim = self.claim(amount=9000000, accident_date="2026-02-13")
+
+        engine = RuleEngine([ClaimVelocityRule(), AmountOutlierRule(), EarlyClaimRule()])
+        with self.assertNumQueries(1):
+            [(scored, score, signals)] = engine.evaluate([claim.id])
+
+        self.assertEqual(scored, claim)
+        self.assertEqual([signal["rule"] for signal in signals], ["claim_velocity", "amount_outlier"])
+        self.assertEqual(score, 30)
+        self.assertIn("9.0x", signals[1]["explanation"])
+
+    def test_early_claim(self):
+        """حادثه در روزهای اول بیمه‌نامه"""
+        Insured.objects.filter(pk=self.insured.pk).update(created_at=timezone.now() - timedelta(days=5))
+        claim = self.claim(accident_date=timezone.localdate())
+
+        [(_, score, signals)] = RuleEngine([EarlyClaimRule()]).evaluate([claim.id])
+        self.assertEqual(score, 10)
+        self.assertEqual(signals[0]["rule"], "early_claim")
+
+    @override_settings(TIME_ZONE='Asia/Tehran')
+    def test_early_claim_uses_local_policy_date(self):
+        """روز شروع بیمه‌نامه به وقت محلی حساب می‌شود، نه UTC"""
+        # 21:00 UTC on Feb 12 is 00:30 on Feb 13 in Tehran
+        Insured.objects.filter(pk=self.insured.pk).update(
+            created_at=datetime(2026, 2, 12, 21, 0, tzinfo=dt_timezone.utc))
+        before = self.claim(accident_date="2026-02-12")
+        same_day = self.claim(accident_date="2026-02-13")
+
+        results = dict((claim.id, signals) for claim, _, signals in
+                       RuleEngine([EarlyClaimRule()]).evaluate([before.id, same_day.id]))
+        self.assertEqual(results[before.id], [])
+        self.assertEqual(results[same_day.id][0]["explanation"], "Accident 0 day(s) after the policy started")
+
+    @patch('claims.services.Neo4jClient.get_shared_attributes')
+    def test_graph_lookup_overlaps_postgres_query(self, mock_shared):
+        """جستجوی Neo4j یک بار و همزمان با کوئری PostgreSQL اجرا می‌شود"""
+        claim = self.claim()
+        started = threading.Event()
+
+        def lookup(ids):
+            started.set()
+            return {i: {"phone": [7, 8], "address": []} for i in ids}
+        mock_shared.side_effect = lookup
+
+        [(_, score, signals)] = RuleEngine([SharedPhoneRule()]).evaluate([claim.id], {self.insured.id})
+        self.assertTrue(started.is_set())
+        mock_shared.assert_called_once_with([self.insured.id])
+        self.assertEqual(score, 60)
+        self.assertEqual(signals, [{"rule": "shared_phone", "score": 60,
+                                    "explanation": "Phone number shared with 2 other insured(s): [7, 8]"}])
+
+
+# ================ تست امتیازدهی مجدد ================
+@override_settings(FRAUD_SCORER='neo4j')
+@patch('claims.services.Neo4jClient.get_shared_attributes')
+class RescoreClaimsTest(TestCase):
+    """تست دستور rescore_claims"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        self.claims = []
+        for n in range(3):
+            insured = Insured.objects.create(
+                national_code=f"500000000{n}",
+                full_name=f"بیمه‌شده {n}",
+                phone_number=f"0912000000{n}",
+                address=f"آدرس {n}"
+            )
+            Insured.objects.filter(pk=insured.pk).update(created_at=timezone.now() - timedelta(days=365))
+            self.claims.append(Claim.objects.create(insured=insured, amount=1000000,
+                                                    accident_date="2026-02-13", description="تصادف"))
+        # خسارت دوم هشدار قدیمی دارد که دیگر معتبر نیست
+        FraudAlert.objects.create(claim=self.claims[1], fraud_score=40, signals=[])
+        Claim.objects.filter(pk=self.claims[1].pk).update(fraud_score=40)
+        self.flagged = self.claims[0].insured_id
+
+    def shared(self, ids):
+        return {i: {"phone": [900, 901] if i == self.flagged else [], "address": []} for i in ids}
+
+    def test_dry_run_writes_nothing(self, mock_shared):
+        """اجرای آزمایشی فقط توزیع امتیازها را چاپ می‌کند"""
+        mock_shared.side_effect = self.shared
+        out = StringIO()
+        call_command('rescore_claims', '--dry-run', stdout=out)
+
+        self.assertIn("Would have re-scored 3 claims: 2 changed, 1 alerts created, 1 alerts deleted", out.getvalue())
+        self.assertIn("60-70", out.getvalue())
+        self.assertEqual(FraudAlert.objects.count(), 1)
+        self.assertFalse(Claim.objects.filter(fraud_score=60).exists())
+
+    def test_rescore_reconciles_alerts_in_bulk(self, mock_shared):
+        """امتیازها گروهی ذخیره و هشدارها بدون سیگنال تک‌ردیفی هماهنگ می‌شوند"""
+        mock_shared.side_effect = self.shared
+        pending_events = OutboxEvent.objects.count()
+
+        call_command('rescore_claims', '--chunk-size', '2', stdout=StringIO())
+
+        flagged, cleared, _ = [Claim.objects.get(pk=claim.pk) for claim in self.claims]
+        self.assertEqual(flagged.fraud_score, 60)
+        self.assertEqual(flagged.fraud_signals[0]["rule"], "shared_phone")
+        self.assertEqual(flagged.alert.fraud_score, 60)
+        self.assertEqual(cleared.fraud_score, 0)
+        self.assertFalse(FraudAlert.objects.filter(claim=cleared).exists())
+        self.assertEqual(mock_shared.call_count, 2)
+        # فقط اعلان هشدار جدید در outbox ثبت شده، نه امتیازدهی دوباره
+        self.assertEqual(list(OutboxEvent.objects.values_list('topic', flat=True)[pending_events:]),
+                         [OutboxEvent.FRAUD_ALERT])
+
+
+# ================ تست ورود گروهی داده ================
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_SCORE_CACHE=False)
+@patch('claims.services.Neo4jClient.get_shared_attributes', side_effect=lambda ids: {})
+@patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+class ImportClaimsTest(TestCase):
+    """تست دستور import_claims"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.insureds = self.write_csv('insureds.csv', ['national_code', 'full_name', 'phone_number', 'address'], [
+            [f"600000000{n}", f"بیمه‌شده {n}", f"0912000000{n}", f"آدرس {n}"] for n in range(5)
+        ] + [["123", "کد نامعتبر", "09120000009", "آدرس"]])
+        self.claims = self.write_csv('claims.csv', ['national_code', 'amount', 'accident_date', 'description'], [
+            [f"600000000{n}", "1000000", timezone.now().date().isoformat(), "تصادف"] for n in range(5)
+        ] + [["6999999999", "1000000", "2026-02-13", "بیمه‌شده ناشناس"]])
+
+    def write_csv(self, name, header, rows):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def test_import_csv(self, mock_upsert, mock_shared):
+        """ورود جریانی CSV، رد سطرهای نامعتبر و امتیازدهی یکجا"""
+        out = StringIO()
+        call_command('import_claims', '--insureds', self.insureds, '--claims', self.claims,
+                     '--chunk-size', '2', stdout=out)
+
+        self.assertEqual(Insured.objects.count(), 5)
+        self.assertEqual(Claim.objects.count(), 5)
+        self.assertEqual(len(set(Claim.objects.values_list('claim_number', flat=True))), 5)
+        self.assertIn("line 7: invalid or missing", out.getvalue())
+        self.assertIn("line 7: unknown insured national_code '6999999999'", out.getvalue())
+        self.assertIn("Import completed", out.getvalue())
+        # گراف یک بار و دسته‌ای همگام شده و هیچ رویدادی برای relay نمانده
+        self.assertEqual(sum(len(c.args[0]) for c in mock_upsert.call_args_list), 5)
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+        # خسارت‌های زودهنگام امتیاز گرفته‌اند
+        self.assertEqual(set(Claim.objects.values_list('fraud_score', flat=True)), {10})
+        self.assertFalse(ImportCheckpoint.objects.filter(completed_at__isnull=True).exists())
+
+        out = StringIO()
+        call_command('import_claims', '--insureds', self.insureds, stdout=out)
+        self.assertIn("already imported", out.getvalue())
+
+    def test_existing_insureds_not_counted(self, mock_upsert, mock_shared):
+        """بیمه‌شده موجود یا تکراری درج‌شده شمرده نمی‌شود و در رویداد outbox نمی‌آید"""
+        existing = Insured.objects.create(national_code="6000000000", full_name="موجود",
+                                          phone_number="09129999999", address="تهران")
+        path = self.write_csv('more.csv', ['national_code', 'full_name', 'phone_number', 'address'], [
+            ["6000000000", "تکراری", "09120000000", "آدرس"],
+            ["6000000001", "جدید", "09120000001", "آدرس"],
+            ["6000000001", "تکرار در فایل", "09120000001", "آدرس"],
+        ])
+        out = StringIO()
+        call_command('import_claims', '--insureds', path, '--skip-graph', stdout=out)
+
+        self.assertIn("3 insureds rows read, 1 inserted", out.getvalue())
+        self.assertEqual(Insured.objects.get(pk=existing.pk).full_name, "موجود")
+        imported = [event.payload['ids'] for event in OutboxEvent.objects.filter(topic=OutboxEvent.INSURED_UPSERT)
+                    if 'ids' in event.payload]
+        self.assertEqual(imported, [[Insured.objects.get(national_code="6000000001").pk]])
+
+    def test_claim_numbers_from_file(self, mock_upsert, mock_shared):
+        """شماره خسارت تکراری خطای سطر است و شماره‌های بعدی با شماره‌های فایل برخورد ندارند"""
+        insured = Insured.objects.create(national_code="6000000000", full_name="بیمه‌شده",
+                                         phone_number="09120000000", address="تهران")
+        Claim.objects.create(insured=insured, claim_number="CL-000007", amount=1000, accident_date="2026-02-13",
+                             description="قبلی")
+        path = self.write_csv('numbered.csv', ['national_code', 'amount', 'accident_date', 'description',
+                                               'claim_number'], [
+            ["6000000000", "1000", "2026-02-13", "تکراری در پایگاه", "CL-000007"],
+            ["6000000000", "1000", "2026-02-13", "شماره فایل", "CL-000009"],
+            ["6000000000", "1000", "2026-02-13", "تکراری در فایل", "CL-000009"],
+            ["6000000000", "1000", "2026-02-13", "بدون شماره", ""],
+        ])
+        out = StringIO()
+        call_command('import_claims', '--claims', path, '--skip-graph', stdout=out)
+
+        self.assertIn("line 2: duplicate claim_number 'CL-000007'", out.getvalue())
+        self.assertIn("line 4: duplicate claim_number 'CL-000009'", out.getvalue())
+        self.assertEqual(sorted(Claim.objects.values_list('claim_number', flat=True)),
+                         ["CL-000007", "CL-000009", "CL-000010"])
+        Claim.objects.create(insured=insured, amount=1000, accident_date="2026-02-13", description="بعدی")
+        self.assertTrue(Claim.objects.filter(claim_number="CL-000011").exists())
+
+    def test_resume_after_crash(self, mock_upsert, mock_shared):
+        """پس از قطع اجرا، ورود از آخرین دسته ثبت‌شده ادامه می‌یابد"""
+        from claims.management.commands.import_claims import Command
+        insert = Command.insert_insureds
+        calls = []
+
+        def crash_on_second_chunk(command, rows, first_line):
+            calls.append(first_line)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return insert(command, rows, first_line)
+
+        with patch.object(Command, 'insert_insureds', crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                call_command('import_claims', '--insureds', self.insureds, '--chunk-size', '2', stdout=StringIO())
+        self.assertEqual(Insured.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 2)
+
+        out = StringIO()
+        call_command('import_claims', '--insureds', self.insureds, '--chunk-size', '2', stdout=out)
+        self.assertIn("after row 2", out.getvalue())
+        self.assertEqual(Insured.objects.count(), 5)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 6)
+
+    def test_import_parquet(self, mock_upsert, mock_shared):
+        """ورود فایل Parquet با pyarrow"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        path = os.path.join(self.dir.name, 'insureds.parquet')
+        pq.write_table(pa.table({
+            'national_code': [f"700000000{n}" for n in range(3)],
+            'full_name': ["الف", "ب", "ج"],
+            'phone_number': ["09121111111"] * 3,
+            'address': ["تهران"] * 3,
+        }), path)
+
+        call_command('import_claims', '--insureds', path, '--chunk-size', '2', stdout=StringIO())
+
+        self.assertEqual(Insured.objects.filter(national_code__startswith="7").count(), 3)
+
+
+# ================ تست بنچمارک ================
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_SCORE_CACHE=False)
+class BenchmarkIntakeTest(TransactionTestCase):
+    """تست دستور benchmark_intake با گراف و کارگزار ساختگی"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_benchmark_reports_and_compares(self):
+        """گزارش JSON با صدک‌ها و مقایسه با اجرای قبلی، بدون ماندن داده"""
+        path = os.path.join(self.dir.name, 'baseline.json')
+        call_command('benchmark_intake', '--in-place', '--insureds', '20', '--concurrency', '1',
+                     '--output', path, stdout=StringIO())
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report['config']['backends'], 'fakes')
+        self.assertEqual(report['intake']['claim_save']['count'], 40)
+        self.assertIn('p99_ms', report['components']['postgres'])
+        self.assertGreater(report['components']['neo4j']['count'], 0)
+        # بیمه‌شده‌های ۱۰ و ۱۱ شماره مشترک دارند: دو خسارت هر کدام
+        self.assertEqual(report['relay']['alerts'], 4)
+        self.assertEqual(report['components']['nats']['count'], 4)
+        self.assertEqual(report['relay']['undelivered_events'], 0)
+        self.assertFalse(Insured.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        out = StringIO()
+        call_command('benchmark_intake', '--in-place', '--insureds', '20', '--concurrency', '1',
+                     '--compare', path, stdout=out)
+        self.assertIn("intake.claims_per_sec", out.getvalue())
+
+    def test_refuses_pending_outbox(self):
+        """با رویداد معلق در outbox اجرا نمی‌شود"""
+        OutboxEvent.objects.create(topic=OutboxEvent.CLAIM_SCORE, payload={"id": 1})
+        with self.assertRaises(CommandError):
+            call_command('benchmark_intake', '--in-place', '--concurrency', '1', stdout=StringIO())
+
+
+# ================ تست کش امتیاز ================
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_SCORE_CACHE=True)
+class ScoreCacheTest(TestCase):
+    """تست کش امتیاز و ابطال آن پس از تغییر گراف"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        score_cache.reset_stats()
+
+    @patch('claims.services.Neo4jClient.get_fraud_scores', side_effect=lambda ids: dict.fromkeys(ids, 30))
+    def test_repeated_lookups_hit_cache(self, mock_scores):
+        """امتیاز هر بیمه‌شده فقط یک بار از Neo4j خوانده می‌شود"""
+        self.assertEqual(services.score_insureds([1, 2]), {1: 30, 2: 30})
+        self.assertEqual(services.score_insureds([2, 3]), {2: 30, 3: 30})
+
+        self.assertEqual([c.args[0] for c in mock_scores.call_args_list], [[1, 2], [3]])
+        stats = score_cache.stats()
+        self.assertEqual((stats["local_hits"], stats["misses"]), (1, 3))
+
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    @patch('claims.services.Neo4jClient.get_shared_attributes')
+    def test_graph_write_invalidates_neighbours(self, mock_shared, mock_upsert):
+        """ذخیره بیمه‌شده کش همسایه‌های قبلی و جدید او را باطل می‌کند"""
+        insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        # قبل از نوشتن با ۱۰۱ و بعد از آن با ۱۰۲ شریک است؛ ۱۰۳ ربطی ندارد
+        mock_shared.side_effect = [
+            {insured.id: {"phone": [101], "address": []}},
+            {insured.id: {"phone": [], "address": [102]}},
+        ]
+        score_cache.set_many("score", {101: 30, 102: 20, 103: 50, insured.id: 30})
+
+        relay_outbox()
+
+        self.assertEqual(score_cache.get_many("score", [101, 102, 103, insured.id]), {103: 50})
+
+    @override_settings(CACHES={**settings.CACHES, 'fraud_scores_shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fraud-scores-shared-test'}})
+    def test_lookup_racing_invalidation_is_not_stored(self):
+        """پاسخی که پیش از نوشتن گراف خوانده و پس از ابطال ذخیره شود در کش مشترک اعتبار ندارد"""
+        shared = caches['fraud_scores_shared']
+        shared.clear()
+
+        # fetch, invalidate, set
+        generations = score_cache.generations([1, 2])
+        score_cache.invalidate([1])
+        score_cache.set_many("score", {1: 30, 2: 20}, generations)
+        caches['fraud_scores'].clear()  # another process: only the shared tier
+        self.assertEqual(score_cache.get_many("score", [1, 2]), {2: 20})
+
+        def lookup_racing_write(ids):
+            # The relay writes the graph and invalidates while this lookup is in flight
+            score_cache.invalidate(ids)
+            return dict.fromkeys(ids, 30)
+        with patch('claims.services.Neo4jClient.get_fraud_scores', side_effect=lookup_racing_write):
+            self.assertEqual(services.score_insureds([3]), {3: 30})
+        caches['fraud_scores'].clear()
+        self.assertEqual(score_cache.get_many("score", [3]), {})
+
+        with patch('claims.services.Neo4jClient.get_fraud_scores', side_effect=lambda ids: dict.fromkeys(ids, 50)):
+            services.score_insureds([3])
+        caches['fraud_scores'].clear()
+        self.assertEqual(score_cache.get_many("score", [3]), {3: 50})
+
+    @patch('claims.services.Neo4jClient.close')
+    @patch('claims.services.Neo4jClient.get_shared_attributes', return_value={})
+    def test_failed_graph_write_closes_client(self, mock_shared, mock_close):
+        """اگر نوشتن در گراف خطا دهد کلاینت بسته می‌شود و کش دست نمی‌خورد"""
+        score_cache.set_many("score", {101: 30})
+        with self.assertRaises(ServiceUnavailable):
+            with services.invalidating_scores([101]):
+                raise ServiceUnavailable("down")
+        mock_close.assert_called_once()
+        self.assertEqual(score_cache.get_many("score", [101]), {101: 30})
+
+
+# ================ تست ایندکس درون‌حافظه‌ای ================
+class SharedAttributeIndexTest(SimpleTestCase):
+    """تست امتیازدهی از ایندکس تلفن و آدرس مشترک"""
+
+    def test_scores_match_graph_formula(self):
+        """۳۰ امتیاز برای هر تلفن مشترک و ۲۰ برای هر آدرس مشترک"""
+        index = SharedAttributeIndex()
+        index.add(1, "09121111111", "تهران")
+        index.add(2, "09121111111", "تهران")
+        index.add(3, "09121111111", "شیراز")
+        index.add(4, "09122222222", "شیراز")
+
+        self.assertEqual(index.scores([1, 2, 3, 4, 99]), {1: 80, 2: 80, 3: 80, 4: 20, 99: 0})
+
+    def test_formatting_variants_share_keys(self):
+        """شماره و آدرس با قالب متفاوت مشترک حساب می‌شوند"""
+        index = SharedAttributeIndex()
+        index.add(1, "09121111111", "تهران، خیابان ولیعصر")
+        index.add(2, "+98 912 111 1111", "تهران خيابان وليعصر")
+
+        self.assertEqual(index.score(1), 50)
+
+    def test_update_and_remove(self):
+        """ویرایش و حذف بیمه‌شده ایندکس را به‌روز می‌کند"""
+        index = SharedAttributeIndex()
+        index.add(1, "09121111111", "تهران")
+        index.add(2, "09121111111", "تهران")
+        index.add(2, "09122222222", "تهران")
+        self.assertEqual(index.score(1), 20)
+
+        index.remove(2)
+        self.assertEqual(index.score(1), 0)
+        self.assertNotIn("09122222222", index.phones)
+
+
+@override_settings(FRAUD_SCORER='index')
+class ProcessFraudIndexTest(TestCase):
+    """تست ساخت ایندکس از پایگاه داده و به‌روزرسانی از outbox"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        reset_fraud_index()
+        self.addCleanup(reset_fraud_index)
+        self.first = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+
+    def test_local_saves_update_index(self):
+        """ذخیره بیمه‌شده پس از commit در ایندکس بارگذاری‌شده اعمال می‌شود"""
+        index = get_fraud_index()
+        self.assertEqual(index.score(self.first.id), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Insured.objects.create(
+                national_code="0987654321",
+                full_name="مریم احمدی",
+                phone_number="09121111111",
+                address="شیراز"
+            )
+        self.assertEqual(index.scores([self.first.id, second.id]), {self.first.id: 30, second.id: 30})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(index.score(self.first.id), 0)
+
+    def test_refresh_from_outbox(self):
+        """تغییرات ثبت‌شده توسط پروسه‌های دیگر از outbox خوانده می‌شود"""
+        index = ProcessFraudIndex()
+        index.build()
+        # بدون on_commit: مانند ذخیره در پروسه‌ای دیگر
+        second = Insured.objects.create(
+            national_code="0987654321",
+            full_name="مریم احمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        self.assertEqual(index.score(self.first.id), 0)
+
+        index.refresh()
+        self.assertEqual(index.score(second.id), 50)
+
+    @override_settings(FRAUD_SCORER='neo4j')
+    @patch('claims.services.Neo4jClient.get_fraud_scores', side_effect=ServiceUnavailable("Neo4j down"))
+    def test_falls_back_when_neo4j_is_down(self, mock_scores):
+        """در صورت قطع Neo4j امتیاز از ایندکس محاسبه می‌شود"""
+        Insured.objects.create(
+            national_code="0987654321",
+            full_name="مریم احمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+
+        self.assertEqual(services.score_insureds([self.first.id]), {self.first.id: 50})
+        mock_scores.assert_called_once()
+
+
+class FraudIndexEquivalenceTest(TestCase):
+    """ایندکس همان امتیاز گراف Neo4j را برمی‌گرداند (نیاز به Neo4j واقعی)"""
+
+    def test_index_matches_graph(self):
+        """امتیاز ایندکس و Neo4j برای تلفن و آدرس مشترک برابر است"""
+        attributes = [("09121111111", "تهران"), ("09121111111", "تهران"),
+                      ("09121111111", "شیراز"), ("09122222222", "شیراز"), ("09123333333", "اصفهان")]
+        ids = [
+            Insured.objects.create(national_code=f"40000000{n:02d}", full_name=f"بیمه‌شده {n}",
+                                   phone_number=phone, address=address).id
+            for n, (phone, address) in enumerate(attributes)
+        ]
+        services.sync_all_to_neo4j()
+        neo4j = Neo4jClient()
+        self.addCleanup(neo4j.close)
+        self.addCleanup(neo4j.delete_insured_nodes, ids)
+
+        index = ProcessFraudIndex()
+        index.build()
+        self.assertEqual(index.scores(ids), neo4j.get_fraud_scores(ids))
+        graph = neo4j.get_shared_attributes(ids)
+        for insured_id, shared in index.shared_attributes(ids).items():
+            self.assertEqual({k: sorted(v) for k, v in shared.items()},
+                             {k: sorted(v) for k, v in graph[insured_id].items()})
+
+
+# ================ تست حلقه‌های تقلب ================
+class RingIndexTest(SimpleTestCase):
+    """تست union-find حلقه‌ها"""
+
+    def test_chain_is_one_ring(self):
+        """A -تلفن- B -آدرس- C یک حلقه است"""
+        index = RingIndex()
+        index.add(1, "09121111111", "تهران، خیابان آزادی")
+        index.add(2, "+989121111111", "شیراز")
+        index.add(3, "09123333333", "شیراز")
+        index.add(4, "09124444444", "اصفهان")
+
+        self.assertEqual([index.ring(i) for i in (1, 2, 3)], [(1, 3)] * 3)
+        self.assertEqual(index.ring(4), (None, 1))
+        self.assertEqual(index.ring(99), (None, 1))
+        self.assertEqual(index.rings(), {1: 3})
+
+    def test_remove(self):
+        """بیمه‌شده حذف‌شده از اعضای حلقه کم می‌شود"""
+        index = RingIndex()
+        index.add(1, "09121111111", "تهران")
+        index.add(2, "09121111111", "شیراز")
+        index.add(3, "09123333333", "شیراز")
+
+        index.remove(1)
+        self.assertEqual(index.ring(2), (2, 2))
+        index.remove(2)
+        self.assertEqual(index.ring(3), (None, 1))
+
+
+@override_settings(FRAUD_SCORE_CACHE=False)
+@patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+class FraudRingTest(TestCase):
+    """تست ذخیره حلقه روی بیمه‌شده و قاعده حلقه تقلب"""
+
+    def setUp(self):
+        reset_ring_index()
+        self.addCleanup(reset_ring_index)
+
+    def create_chain(self):
+        # a و b تلفن مشترک دارند، b و c آدرس مشترک
+        return [
+            Insured.objects.create(national_code="1111111111", full_name="علی محمدی",
+                                   phone_number="09121111111", address="تهران"),
+            Insured.objects.create(national_code="2222222222", full_name="مریم احمدی",
+                                   phone_number="09121111111", address="شیراز"),
+            Insured.objects.create(national_code="3333333333", full_name="رضا کریمی",
+                                   phone_number="09123333333", address="شیراز"),
+        ]
+
+    def rings(self, insureds):
+        return [Insured.objects.values_list('ring_id', 'ring_size').get(pk=i.pk) for i in insureds]
+
+    @patch('claims.services.Neo4jClient.delete_insured_nodes')
+    def test_relay_materializes_rings(self, mock_delete, mock_upsert):
+        """relay حلقه را به‌صورت افزایشی روی بیمه‌شده‌ها ذخیره می‌کند"""
+        a, b, c = self.create_chain()
+        relay_outbox()
+        self.assertEqual(self.rings([a, b, c]), [(a.id, 3)] * 3)
+
+        d = Insured.objects.create(national_code="4444444444", full_name="سارا رضایی",
+                                   phone_number="09123333333", address="اصفهان")
+        relay_outbox()
+        self.assertEqual(self.rings([a, d]), [(a.id, 4)] * 2)
+
+        d.delete()
+        relay_outbox()
+        self.assertEqual(self.rings([a]), [(a.id, 3)])
+
+    @patch('claims.services.Neo4jClient.get_shared_attributes',
+           side_effect=lambda ids: {i: {"phone": [], "address": []} for i in ids})
+    def test_ring_rule(self, mock_shared, mock_upsert):
+        """خسارت عضو حلقه امتیاز fraud_ring می‌گیرد"""
+        a, b, c = self.create_chain()
+        claim = Claim.objects.create(insured=c, amount=1000, accident_date="2020-01-01", description="تصادف")
+        relay_outbox()
+
+        claim.refresh_from_db()
+        self.assertEqual(claim.fraud_score, 25)
+        self.assertEqual(claim.fraud_signals[0]["rule"], "fraud_ring")
+        self.assertIn(f"ring #{a.id} of 3", claim.fraud_signals[0]["explanation"])
+
+    def test_recompute_splits_rings(self, mock_upsert):
+        """بازمحاسبه کامل، حلقه‌ای را که پیوندش قطع شده جدا می‌کند"""
+        a, b, c = self.create_chain()
+        relay_outbox()
+        # بدون سیگنال و outbox: فقط بازمحاسبه کامل آن را می‌بیند
+        Insured.objects.filter(pk=b.pk).update(phone_number="09122222222")
+
+        out = StringIO()
+        call_command('detect_rings', stdout=out)
+
+        self.assertEqual(self.rings([a, b, c]), [(None, 1), (b.id, 2), (b.id, 2)])
+        self.assertIn("0 rings of 3+ insureds, 3 insureds updated", out.getvalue())
+        self.assertEqual(get_ring_index().ring(c.id), (b.id, 2))
+
+    def test_relay_leaves_full_recompute_to_idle_loop(self, mock_upsert):
+        """relay در تراکنش رویدادها بازمحاسبه کامل انجام نمی‌دهد؛ حلقه بیکاری آن را انجام می‌دهد"""
+        a, b, c = self.create_chain()
+        relay_outbox()
+        Insured.objects.filter(pk=b.pk).update(phone_number="09122222222")
+
+        self.assertIsNone(maybe_recompute_rings())  # not due yet
+        with override_settings(FRAUD_RING_RECOMPUTE_INTERVAL=-1, FRAUD_RING_REFRESH_INTERVAL=-1):
+            d = Insured.objects.create(national_code="4444444444", full_name="سارا رضایی",
+                                       phone_number="09124444444", address="اصفهان")
+            relay_outbox()
+            self.assertEqual(self.rings([a]), [(a.id, 3)])  # the split is still unseen
+
+            self.assertEqual(maybe_recompute_rings(), 3)
+        self.assertEqual(self.rings([a, b, c, d]), [(None, 1), (b.id, 2), (b.id, 2), (None, 1)])
+
+
+# ================ تست جدول ویژگی‌های ریسک ================
+@override_settings(FRAUD_SCORE_CACHE=False)
+@patch('claims.services.Neo4jClient.delete_insured_nodes')
+@patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+@patch('claims.services.Neo4jClient.get_shared_attributes',
+       side_effect=lambda ids: {i: {"phone": [], "address": []} for i in ids})
+class InsuredFeaturesTest(TestCase):
+    """تست به‌روزرسانی افزایشی و بازسازی کامل ویژگی‌های بیمه‌شده"""
+
+    FIELDS = ['phone_sharers', 'address_sharers', 'shared_score', 'ring_size', 'claim_count', 'total_amount']
+
+    def setUp(self):
+        reset_ring_index()
+        self.addCleanup(reset_ring_index)
+        # a و b تلفن مشترک دارند، b و c آدرس مشترک
+        self.a = Insured.objects.create(national_code="1111111111", full_name="علی محمدی",
+                                        phone_number="09121111111", address="تهران")
+        self.b = Insured.objects.create(national_code="2222222222", full_name="مریم احمدی",
+                                        phone_number="+989121111111", address="شیراز")
+        self.c = Insured.objects.create(national_code="3333333333", full_name="رضا کریمی",
+                                        phone_number="09123333333", address="شیراز")
+
+    def features(self, *insureds):
+        rows = InsuredFeatures.objects.filter(pk__in=[i.pk for i in insureds]).values('pk', *self.FIELDS)
+        return {row.pop('pk'): row for row in rows}
+
+    def test_incremental_updates(self, *mocks):
+        """ذخیره و حذف بیمه‌شده و خسارت، ویژگی‌ها را به‌روز می‌کند"""
+        relay_outbox()
+        features = self.features(self.a, self.b, self.c)
+        self.assertEqual(features[self.a.pk], {'phone_sharers': 1, 'address_sharers': 0, 'shared_score': 30,
+                                               'ring_size': 3, 'claim_count': 0, 'total_amount': 0})
+        self.assertEqual(features[self.b.pk]['shared_score'], 50)
+
+        claim = Claim.objects.create(insured=self.c, amount=1000, accident_date="2020-01-01", description="تصادف")
+        Claim.objects.create(insured=self.c, amount=500, accident_date="2020-02-01", description="تصادف")
+        relay_outbox()
+        self.assertEqual(self.features(self.c)[self.c.pk]['claim_count'], 2)
+        self.assertEqual(self.features(self.c)[self.c.pk]['total_amount'], 1500)
+
+        # تغییر تلفن b: شریک قبلی (a) یک شریک کمتر دارد
+        self.b.phone_number = "09122222222"
+        self.b.save()
+        claim.delete()
+        relay_outbox()
+        features = self.features(self.a, self.b, self.c)
+        self.assertEqual(features[self.a.pk]['shared_score'], 0)
+        self.assertEqual(features[self.b.pk]['shared_score'], 20)
+        self.assertEqual(features[self.c.pk]['claim_count'], 1)
+
+        self.a.delete()
+        relay_outbox()
+        self.assertFalse(InsuredFeatures.objects.filter(pk=self.a.pk).exists())
+
+    def test_rebuild_matches_incremental(self, *mocks):
+        """بازسازی کامل همان نتیجه به‌روزرسانی افزایشی را می‌دهد"""
+        Claim.objects.create(insured=self.a, amount=2000, accident_date="2020-01-01", description="تصادف")
+        relay_outbox()
+        incremental = self.features(self.a, self.b, self.c)
+
+        out = StringIO()
+        call_command('rebuild_features', stdout=out)
+
+        self.assertEqual(self.features(self.a, self.b, self.c), incremental)
+        self.assertIn("Insured features rebuilt (3 insureds)", out.getvalue())
+
+    def test_feature_scorer(self, *mocks):
+        """امتیازدهی از جدول ویژگی‌ها همان پاسخ ایندکس درون‌حافظه‌ای را می‌دهد"""
+        relay_outbox()
+        index = SharedAttributeIndex()
+        for insured in (self.a, self.b, self.c):
+            index.add(insured.pk, insured.phone_number, insured.address)
+        ids = [self.a.pk, self.b.pk, self.c.pk, 999]
+
+        self.assertEqual(FeatureScorer().scores(ids), index.scores(ids))
+        self.assertEqual(FeatureScorer().shared_attributes(ids), index.shared_attributes(ids))
+        with override_settings(FRAUD_SCORER='features'):
+            self.assertEqual(services.score_insureds(ids), index.scores(ids))
+
+    def test_high_risk_api(self, *mocks):
+        """فهرست بیمه‌شدگان پرخطر از جدول ویژگی‌ها خوانده می‌شود"""
+        relay_outbox()
+        self.client.force_login(api_user('investigator', 'view_insured'))
+        response = self.client.get('/api/insureds/high-risk/', {'min_score': 20})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [self.b.pk, self.a.pk])
+        self.assertEqual(response.json()[0]['shared_score'], 50)
+        self.assertEqual(self.client.get('/api/insureds/high-risk/', {'limit': 'x'}).status_code, 400)
+
+
+# ================ تست پنل ادمین ================
+class ClaimAdminTest(TestCase):
+    """تست امتیاز زنده در لیست خسارت‌ها"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        for n in range(3):
+            insured = Insured.objects.create(
+                national_code=f"300000000{n}",
+                full_name=f"بیمه‌شده {n}",
+                phone_number="09121111111",
+                address="تهران"
+            )
+            Claim.objects.create(insured=insured, amount=1000000, accident_date="2026-02-13", description="تصادف")
+
+    @patch('claims.services.Neo4jClient.get_fraud_score')
+    @patch('claims.services.Neo4jClient.get_fraud_scores', side_effect=lambda ids: dict.fromkeys(ids, 80))
+    def test_changelist_scores_page_in_one_query(self, mock_scores, mock_score):
+        """کل صفحه با یک کوئری Neo4j امتیازدهی می‌شود"""
+        response = self.client.get(reverse('admin:claims_claim_changelist'))
+
+        self.assertEqual(response.status_code, 200)
+        mock_scores.assert_called_once()
+        self.assertEqual(len(mock_scores.call_args.args[0]), 3)
+        mock_score.assert_not_called()
+        self.assertContains(response, "80 - ⚠️ High Risk", count=3)
+
+
 # ================ تست API ================
-# class ClaimAPITest(APITestCase):
-#     """تست API خسارت"""
-#
-#     def setUp(self):
-#         self.client = APIClient()
-#         self.insured = Insured.objects.create(
-#             national_code="1234567890",
-#             full_name="علی محمدی",
-#             phone_number="09121111111",
-#             address="تهران"
-#         )
-
-    # def test_create_claim_api(self):
-    #     """تست ثبت خسارت از طریق API"""
-    #     url = reverse('claim-list')  # اگه DRF داری
-    #     data = {
-    #         'insured': self.insured.id,
-    #         'amount': 5000000,
-    #         'accident_date': '2026-02-13',
-    #         'description': 'تصادف'
-    #     }
-    #     response = self.client.post(url, data, format='json')
-    #     self.assertEqual(response.status_code, 201)  # Created
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_SCORE_CACHE=False)
+def api_user(username, *perms):
+    """کاربر API با مجوزهای داده‌شده، مثلاً 'add_claim'"""
+    user = User.objects.create_user(username=username, password='secret')
+    user.user_permissions.set(Permission.objects.filter(content_type__app_label='claims', codename__in=perms))
+    return user
+
+
+class ClaimAPITest(APITestCase):
+    """تست API خسارت"""
+
+    def setUp(self):
+        caches['fraud_scores'].clear()
+        self.client = APIClient()
+        partner = api_user('partner', 'add_insured', 'view_insured', 'add_claim', 'view_claim')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=partner).key}')
+        self.insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        Insured.objects.filter(pk=self.insured.pk).update(created_at=timezone.now() - timedelta(days=365))
+
+    def test_create_claim_api(self):
+        """تست ثبت خسارت از طریق API"""
+        url = reverse('claim-list')
+        data = {
+            'insured': self.insured.id,
+            'amount': 5000000,
+            'accident_date': '2026-02-13',
+            'description': 'تصادف'
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 201)  # Created
+        self.assertRegex(response.data['claim_number'], r"^CL-\d{6}$")
+        # امتیازدهی خسارت تکی به outbox سپرده می‌شود
+        self.assertTrue(OutboxEvent.objects.filter(topic=OutboxEvent.CLAIM_SCORE,
+                                                   payload__id=response.data['id']).exists())
+
+    def test_create_insured_api(self):
+        """تست ثبت بیمه‌شده از طریق API"""
+        response = self.client.post(reverse('insured-list'), {
+            'national_code': '0987654321',
+            'full_name': 'مریم احمدی',
+            'phone_number': '09122222222',
+            'address': 'شیراز'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Insured.objects.filter(national_code='0987654321').exists())
+
+    @patch('claims.services.Neo4jClient.get_shared_attributes')
+    def test_bulk_claims_scored_in_one_lookup(self, mock_shared):
+        """ثبت گروهی: یک اعتبارسنجی، bulk_create و یک جستجوی گراف برای همه"""
+        mock_shared.side_effect = lambda ids: {i: {"phone": [900], "address": []} for i in ids}
+        items = [{'national_code': '1234567890', 'amount': 1000000 + n,
+                  'accident_date': '2025-01-%02d' % (n + 1), 'description': 'تصادف'} for n in range(20)]
+        items[0] = {'insured': self.insured.id, 'amount': 1000000, 'accident_date': '2024-01-01',
+                    'description': 'تصادف'}
+        claim_events = OutboxEvent.objects.filter(topic=OutboxEvent.CLAIM_SCORE).count()
+
+        response = self.client.post(reverse('claim-bulk'), items, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+        mock_shared.assert_called_once_with([self.insured.id])
+        self.assertEqual(response.data[0]['fraud_score'], 30)
+        self.assertEqual(response.data[0]['fraud_signals'][0]['rule'], 'shared_phone')
+        self.assertTrue(response.data[0]['alert'])
+        self.assertEqual(len({item['claim_number'] for item in response.data}), 20)
+        self.assertEqual(FraudAlert.objects.count(), 20)
+        self.assertEqual(OutboxEvent.objects.filter(topic=OutboxEvent.CLAIM_SCORE).count(), claim_events)
+        self.assertEqual(OutboxEvent.objects.filter(topic=OutboxEvent.FRAUD_ALERT).count(), 20)
+
+    def test_bulk_rejects_invalid_items(self):
+        """یک قلم نامعتبر کل درخواست را با خطای همان قلم رد می‌کند"""
+        items = [
+            {'insured': self.insured.id, 'amount': 1000, 'accident_date': '2026-02-13', 'description': 'تصادف'},
+            {'national_code': '9999999999', 'amount': 1000, 'accident_date': '2026-02-13', 'description': 'تصادف'},
+        ]
+        response = self.client.post(reverse('claim-bulk'), items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('insured', response.data[1])
+        self.assertFalse(Claim.objects.exists())
+
+        items[1] = {'amount': -1, 'accident_date': '2026-02-13', 'description': 'تصادف'}
+        response = self.client.post(reverse('claim-bulk'), items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data[1])
+
+    def test_anonymous_requests_rejected(self):
+        """بدون توکن هیچ بیمه‌شده و خسارتی ثبت یا خوانده نمی‌شود"""
+        client = APIClient()
+        item = {'insured': self.insured.id, 'amount': 1000, 'accident_date': '2026-02-13', 'description': 'تصادف'}
+        self.assertEqual(client.post(reverse('claim-list'), item, format='json').status_code, 401)
+        self.assertEqual(client.post(reverse('claim-bulk'), [item], format='json').status_code, 401)
+        self.assertEqual(client.post(reverse('insured-list'), {'national_code': '0987654321'},
+                                     format='json').status_code, 401)
+        self.assertEqual(client.get(reverse('insured-detail', args=[self.insured.id])).status_code, 401)
+        self.assertEqual(client.get(reverse('insured-high-risk')).status_code, 401)
+        self.assertFalse(Claim.objects.exists())
+
+    def test_permissions_required(self):
+        """کاربر بدون مجوز مدل، با وجود توکن معتبر، ۴۰۳ می‌گیرد"""
+        client = APIClient()
+        client.force_authenticate(api_user('viewer', 'view_claim'))
+        item = {'insured': self.insured.id, 'amount': 1000, 'accident_date': '2026-02-13', 'description': 'تصادف'}
+        self.assertEqual(client.post(reverse('claim-list'), item, format='json').status_code, 403)
+        self.assertEqual(client.get(reverse('insured-high-risk')).status_code, 403)
+
+
+class FraudAlertFeedAPITest(APITestCase):
+    """تست فید هشدارها با صفحه‌بندی کلیدی"""
+
+    def setUp(self):
+        insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        self.alerts = []
+        for n in range(7):
+            claim = Claim.objects.create(insured=insured, amount=1000000, accident_date="2026-02-13",
+                                         description="تصادف", status='fraud' if n % 2 else 'pending')
+            self.alerts.append(FraudAlert.objects.create(claim=claim, fraud_score=30 + n * 10,
+                                                         is_resolved=n == 0))
+        # دو هشدار با زمان یکسان: ترتیب با id شکسته می‌شود
+        same_time = timezone.now() - timedelta(hours=1)
+        FraudAlert.objects.filter(pk__in=[self.alerts[2].pk, self.alerts[3].pk]).update(created_at=same_time)
+        investigator = api_user('investigator', 'view_fraudalert')
+        investigator.has_perm('claims.view_fraudalert')  # permissions cached on the user, as within a request
+        self.client.force_authenticate(investigator)
+
+    def test_cursor_walks_every_alert_once(self):
+        """پیمایش کامل با cursor بدون تکرار و بدون COUNT"""
+        expected = list(FraudAlert.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen = []
+        url = reverse('alert-list') + '?page_size=3'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen += [alert['id'] for alert in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        """فیلتر وضعیت حل‌شده، بازه امتیاز و وضعیت خسارت"""
+        response = self.client.get(reverse('alert-list'), {'is_resolved': 'false', 'min_score': 50,
+                                                           'max_score': 80, 'status': 'fraud'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({alert['fraud_score'] for alert in response.data['results']}, {60, 80})
+        self.assertEqual(response.data['results'][0]['claim']['insured']['national_code'], "1234567890")
+
+        self.assertEqual(self.client.get(reverse('alert-list'), {'min_score': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('alert-list'), {'cursor': 'bad'}).status_code, 404)
+
+    def test_investigators_only(self):
+        """فید هشدار بدون احراز هویت ۴۰۱ و برای حساب شریک (بدون مجوز مشاهده هشدار) ۴۰۳ است"""
+        client = APIClient()
+        self.assertEqual(client.get(reverse('alert-list')).status_code, 401)
+        self.assertEqual(client.get(reverse('alert-detail', args=[self.alerts[0].pk])).status_code, 401)
+        client.force_authenticate(api_user('partner', 'add_claim', 'view_claim', 'add_insured', 'view_insured'))
+        self.assertEqual(client.get(reverse('alert-list')).status_code, 403)
+
+
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_SCORE_CACHE=False)
+class AsyncClaimSubmitTest(TestCase):
+    """تست ثبت ناهمگام خسارت با امتیازدهی در همان پاسخ"""
+
+    def setUp(self):
+        reset_fraud_index()
+        self.insured = Insured.objects.create(
+            national_code="1234567890",
+            full_name="علی محمدی",
+            phone_number="09121111111",
+            address="تهران"
+        )
+        Insured.objects.filter(pk=self.insured.pk).update(created_at=timezone.now() - timedelta(days=365))
+        self.item = {'insured': self.insured.id, 'amount': 5000000, 'accident_date': '2026-02-13',
+                     'description': 'تصادف'}
+        token = Token.objects.create(user=api_user('partner', 'add_claim'))
+        self.auth = {'Authorization': f'Token {token.key}'}
+
+    def shared(self, ids):
+        return {i: {"phone": [900], "address": []} for i in ids}
+
+    @patch('claims.api.async_views.apublish_fraud_alerts', new_callable=AsyncMock)
+    @patch('claims.async_services.AsyncNeo4jClient.get_shared_attributes', new_callable=AsyncMock)
+    async def test_submit_scores_inline(self, mock_shared, mock_publish):
+        """گراف روی event loop پرس‌وجو و هشدار بی‌درنگ منتشر می‌شود"""
+        mock_shared.side_effect = self.shared
+        mock_publish.side_effect = lambda alerts: alerts
+
+        response = await self.async_client.post(reverse('claim-submit'), self.item,
+                                                 content_type='application/json', headers=self.auth)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['fraud_score'], 30)
+        self.assertTrue(data['alert'])
+        self.assertEqual(data['fraud_signals'][0]['rule'], 'shared_phone')
+        mock_shared.assert_awaited_once_with([self.insured.id])
+        # رویدادهای outbox این خسارت دیگر کاری برای relay ندارند
+        claim_events = OutboxEvent.objects.filter(topic__in=[OutboxEvent.CLAIM_SCORE, OutboxEvent.FRAUD_ALERT])
+        self.assertEqual(await claim_events.acount(), 2)
+        self.assertFalse(await claim_events.filter(processed_at__isnull=True).aexists())
+
+    @patch('claims.api.async_views.apublish_fraud_alerts', new_callable=AsyncMock, return_value=[])
+    @patch('claims.async_services.AsyncNeo4jClient.get_shared_attributes', new_callable=AsyncMock,
+           side_effect=ServiceUnavailable("down"))
+    async def test_falls_back_to_index_and_relay(self, mock_shared, mock_publish):
+        """Neo4j در دسترس نیست: امتیاز از ایندکس و انتشار هشدار به relay سپرده می‌شود"""
+        await Insured.objects.acreate(national_code="0987654321", full_name="مریم احمدی",
+                                      phone_number="09121111111", address="شیراز")
+
+        response = await self.async_client.post(reverse('claim-submit'), self.item,
+                                                 content_type='application/json', headers=self.auth)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['fraud_score'], 30)
+        self.assertTrue(await OutboxEvent.objects.filter(topic=OutboxEvent.FRAUD_ALERT,
+                                                         processed_at__isnull=True).aexists())
+
+    async def test_rejects_invalid_claims(self):
+        """بیمه‌شده ناموجود یا بدنه نامعتبر"""
+        url = reverse('claim-submit')
+        response = await self.async_client.post(url, {**self.item, 'insured': 999999},
+                                                 content_type='application/json', headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('insured', response.json())
+        response = await self.async_client.post(url, 'not json', content_type='application/json',
+                                                 headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.get(url, headers=self.auth)).status_code, 405)
+        self.assertFalse(await Claim.objects.aexists())
+
+    async def test_requires_token_and_permission(self):
+        """مانند API همگام: بدون توکن یا با توکن نامعتبر ۴۰۱ و بدون مجوز add_claim ۴۰۳"""
+        url = reverse('claim-submit')
+        response = await self.async_client.post(url, self.item, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await self.async_client.post(url, self.item, content_type='application/json',
+                                                 headers={'Authorization': 'Token nope'})
+        self.assertEqual(response.status_code, 401)
+        viewer = await sync_to_async(api_user)('viewer', 'view_claim')
+        token = await Token.objects.acreate(user=viewer)
+        response = await self.async_client.post(url, self.item, content_type='application/json',
+                                                 headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(await Claim.objects.aexists())
+
+async def test_publish_fraud_alerts(self):
+        """انتشار مستقیم هشدار با شناسه نسخه برای حذف تکرار"""
+        nc, js = fake_jetstream_connection()
+        claim = await sync_to_async(Claim.objects.create)(insured=self.insured, amount=1000,
+                                                          accident_date="2026-02-13", description="تصادف")
+        alert = await FraudAlert.objects.acreate(claim=claim, fraud_score=60, signals=[])
+        with patch('claims.nats_client.nats.connect', AsyncMock(return_value=nc)):
+            published = await apublish_fraud_alerts([alert])
+            await apublish_fraud_alerts([alert])
+
+        self.assertEqual(published, [alert])
+        self.assertEqual(js.publish.await_args.kwargs['headers'],
+                         {"Nats-Msg-Id": f"fraud-alert-{claim.id}-{alert.id}"})
+        # جریان فقط یک بار برای اتصال بررسی می‌شود
+        self.assertEqual(js.stream_info.await_count, 1)
+
+
+# ================ تست متریک‌ها و لاگ ================
+def metric_value(name, **labels):
+    """مقدار فعلی یک نمونه Prometheus (صفر اگر هنوز ثبت نشده)"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricDelta:
+    """تغییر نمونه‌ها از زمان ساخت؛ شمارنده‌های prometheus_client صفر نمی‌شوند"""
+
+    def __init__(self):
+        self.before = {(sample.name, tuple(sorted(sample.labels.items()))): sample.value
+                       for metric in REGISTRY.collect() for sample in metric.samples}
+
+    def __call__(self, name, **labels):
+        return metric_value(name, **labels) - self.before.get((name, tuple(sorted(labels.items()))), 0)
+
+
+@override_settings(FRAUD_SCORE_CACHE=False, METRICS_TOKEN='s3cret')
+class MetricsTest(TestCase):
+    """تست متریک‌های Prometheus و لاگر صف‌دار"""
+
+    def setUp(self):
+        neo4j_breaker.reset()
+        self.delta = MetricDelta()
+
+    @patch('claims.outbox.publish_fraud_alert')
+    @patch('claims.services.Neo4jClient.upsert_insureds', side_effect=len)
+    @patch('claims.services.Neo4jClient.get_shared_attributes',
+           side_effect=lambda ids: {i: {"phone": [900], "address": []} for i in ids})
+    def test_relay_counters(self, mock_shared, mock_upsert, mock_publish):
+        """شمارنده‌های outbox و امتیازدهی با relay به‌روز می‌شوند"""
+        mock_publish.return_value = Future()
+        mock_publish.return_value.set_result(True)
+        insured = Insured.objects.create(national_code="1234567890", full_name="علی محمدی",
+                                         phone_number="09121111111", address="تهران")
+        Claim.objects.create(insured=insured, amount=5000000, accident_date="2026-02-13", description="تصادف")
+
+        self.assertEqual(self.delta('outbox_events_queued_total', topic=OutboxEvent.CLAIM_SCORE), 1)
+        relay_outbox()
+        relay_outbox()
+
+        self.assertEqual(self.delta('fraud_claims_scored_total'), 1)
+        self.assertEqual(self.delta('fraud_alerts_raised_total'), 1)
+        self.assertEqual(self.delta('outbox_events_queued_total', topic=OutboxEvent.FRAUD_ALERT), 1)
+        for topic in (OutboxEvent.INSURED_UPSERT, OutboxEvent.CLAIM_SCORE, OutboxEvent.FRAUD_ALERT):
+            self.assertEqual(self.delta('outbox_events_delivered_total', topic=topic), 1)
+
+    @patch('claims.services.get_driver')
+    def test_neo4j_query_timing(self, mock_get_driver):
+        """زمان و خطای هر کوئری Neo4j با برچسب نام آن ثبت می‌شود"""
+        session = mock_get_driver.return_value.session.return_value.__enter__.return_value
+        session.run.return_value = []
+        Neo4jClient().get_fraud_scores([1, 2])
+        session.run.side_effect = ServiceUnavailable("down")
+        with self.assertRaises(ServiceUnavailable):
+            Neo4jClient().get_fraud_scores([1])
+
+        self.assertEqual(self.delta('neo4j_query_seconds_count', query='get_fraud_scores'), 2)
+        self.assertEqual(self.delta('neo4j_query_errors_total', query='get_fraud_scores'), 1)
+
+    def test_failed_delivery_counted(self):
+        """رویدادهای ناموفق شمرده می‌شوند"""
+        with patch('claims.services.Neo4jClient.upsert_insureds', side_effect=ConnectionError("Neo4j down")):
+            Insured.objects.create(national_code="1234567890", full_name="علی محمدی",
+                                   phone_number="09121111111", address="تهران")
+            relay_outbox()
+        self.assertEqual(self.delta('outbox_delivery_failures_total', topic=OutboxEvent.INSURED_UPSERT), 1)
+        self.assertEqual(self.delta('outbox_events_delivered_total', topic=OutboxEvent.INSURED_UPSERT), 0)
+
+    def test_metrics_endpoint(self):
+        """خروجی /metrics در قالب متنی Prometheus است"""
+        NEO4J_QUERY_SECONDS.labels(query='test_query').observe(0.003)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE neo4j_query_seconds histogram', body)
+        self.assertIn('neo4j_query_seconds_bucket{le="0.0025",query="test_query"} 0.0', body)
+        self.assertIn('neo4j_query_seconds_bucket{le="0.005",query="test_query"} 1.0', body)
+        self.assertIn('neo4j_query_seconds_bucket{le="+Inf",query="test_query"} 1.0', body)
+        self.assertIn('neo4j_query_seconds_count{query="test_query"} 1.0', body)
+        self.assertIn('neo4j_breaker_state{state="closed"} 1.0', body)
+
+    def test_metrics_endpoint_restricted(self):
+        """بدون توکن درست ۴۰۱ و بدون METRICS_TOKEN غیرفعال است"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="metrics"')
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer nope'}).status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code, 404)
+
+    def test_metrics_endpoint_multiprocess(self):
+        """با PROMETHEUS_MULTIPROC_DIR نمونه‌ها از فایل‌های همه پردازه‌ها خوانده می‌شوند"""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}), \
+                patch('claims.metrics.multiprocess.MultiProcessCollector') as mock_collector:
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        mock_collector.assert_called_once()
+        self.assertIsNot(mock_collector.call_args.args[0], REGISTRY)
+
+    def test_labels_are_checked(self):
+        """برچسب اشتباه خطا می‌دهد"""
+        with self.assertRaises(ValueError):
+            OUTBOX_EVENTS_QUEUED.labels(queue='x')
+
+    def test_breaker_state_gauge(self):
+        """وضعیت قطع‌کننده مدار هنگام تغییر در گیج ثبت می‌شود"""
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=60, state_gauge=NEO4J_BREAKER_STATE)
+        breaker.record_failure()
+        self.assertEqual(metric_value('neo4j_breaker_state', state='open'), 1)
+        self.assertEqual(metric_value('neo4j_breaker_state', state='closed'), 0)
+        breaker.record_success()
+        self.assertEqual(metric_value('neo4j_breaker_state', state='closed'), 1)
+        self.assertEqual(metric_value('neo4j_breaker_state', state='open'), 0)
+
+
+class QueueStreamHandlerTest(SimpleTestCase):
+    """تست هندلر لاگ غیرمسدودکننده"""
+
+    def setUp(self):
+        self.delta = MetricDelta()
+        self.stream = StringIO()
+        self.logger = logging.getLogger('claims.tests.queue')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+
+    def test_records_written_by_listener(self):
+        """رکوردها در رشته شنونده نوشته می‌شوند"""
+        handler = QueueStreamHandler(self.stream)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        self.logger.addHandler(handler)
+
+        self.logger.info("🚨 Fraud alert created for %s", "CLM-1")
+        handler.close()
+
+        self.assertEqual(self.stream.getvalue(), "INFO 🚨 Fraud alert created for CLM-1\n")
+
+    def test_full_queue_drops_records(self):
+        """در صف پر، رکورد دور ریخته و شمرده می‌شود"""
+        handler = QueueStreamHandler(self.stream, maxsize=1)
+        handler.listener.stop()  # nothing drains the queue
+        self.logger.addHandler(handler)
+
+        for n in range(3):
+            self.logger.info("record %s", n)
+
+        self.assertEqual(self.delta('log_records_dropped_total'), 2)
+
+
+# ================ تست قطع‌کننده مدار Neo4j ================
+class CircuitBreakerTest(SimpleTestCase):
+    """تست قطع‌کننده مدار: باز شدن پس از خطاهای پیاپی و بررسی بازگشت"""
+
+    def setUp(self):
+        self.clock = [100.0]
+        patcher = patch('claims.circuit_breaker.time.monotonic', side_effect=lambda: self.clock[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+        self.graph = MagicMock(side_effect=ServiceUnavailable("down"))
+        self.call = self.breaker.guard(self.graph)
+
+    def fail(self, times):
+        for _ in range(times):
+            with self.assertRaises(ServiceUnavailable):
+                self.call()
+
+    def test_opens_after_consecutive_failures(self):
+        """پس از سه خطای پیاپی مدار باز می‌شود و بدون تماس با Neo4j خطا می‌دهد"""
+        self.fail(3)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.call()
+        self.assertEqual(self.graph.call_count, 3)
+
+    def test_success_resets_failure_count(self):
+        """یک پاسخ موفق شمارش خطاها را صفر می‌کند"""
+        self.fail(2)
+        self.graph.side_effect = None
+        self.call()
+        self.graph.side_effect = ServiceUnavailable("down")
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_closes(self):
+        """پس از زمان انتظار یک تماس آزمایشی عبور می‌کند و موفقیت آن مدار را می‌بندد"""
+        self.fail(3)
+        self.clock[0] += 10
+        with self.assertRaises(CircuitOpenError):
+            self.call()
+
+        self.clock[0] += 21
+
+        def probe():
+            # Other callers keep failing fast while the probe is in flight
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.allow()
+            return 42
+        self.graph.side_effect = probe
+        self.assertEqual(self.call(), 42)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """شکست تماس آزمایشی مدار را دوباره باز می‌کند"""
+        self.fail(3)
+        self.clock[0] += 31
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.call()
+        self.assertEqual(self.graph.call_count, 4)
+
+    def test_query_errors_do_not_trip(self):
+        """خطای کوئری نشانه قطع Neo4j نیست؛ پایان مهلت تراکنش هست"""
+        timed_out = ClientError("timed out")
+        timed_out.code = "Neo.ClientError.Transaction.TransactionTimedOutClientConfiguration"
+        self.assertFalse(is_outage(CypherSyntaxError("bad")))
+        self.assertTrue(is_outage(timed_out))
+        # Errors that are not a server answer, e.g. a stopped container's hostname
+        self.assertTrue(is_outage(ValueError("Cannot resolve address neo4j:7687")))
+        self.assertTrue(is_outage(SessionExpired("gone")))
+        self.assertTrue(is_outage(ConnectionResetError("reset")))
+        # Bugs on our side
+        self.assertFalse(is_outage(ValueError("invalid literal for int()")))
+        self.assertFalse(is_outage(TypeError("unhashable type: 'list'")))
+        self.assertFalse(is_outage(KeyError("phone")))
+
+        self.graph.side_effect = CypherSyntaxError("bad")
+        for _ in range(3):
+            with self.assertRaises(CypherSyntaxError):
+                self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_bugs_leave_breaker_alone(self):
+        """خطای برنامه (TypeError) نه شکست شمرده می‌شود نه موفقیت"""
+        self.fail(2)
+        self.graph.side_effect = TypeError("unhashable type: 'list'")
+        with self.assertRaises(TypeError):
+            self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.graph.side_effect = ServiceUnavailable("down")
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    async def test_guards_coroutines(self):
+        """متدهای async هم از قطع‌کننده عبور می‌کنند"""
+        graph = AsyncMock(side_effect=ServiceUnavailable("down"))
+        call = self.breaker.guard(graph)
+        for _ in range(3):
+            with self.assertRaises(ServiceUnavailable):
+                await call()
+        with self.assertRaises(CircuitOpenError):
+            await call()
+        self.assertEqual(graph.await_count, 3)
+
+    @patch('claims.services.get_driver')
+    def test_lookups_carry_query_timeout(self, mock_get_driver):
+        """کوئری‌های امتیازدهی با مهلت NEO4J_QUERY_TIMEOUT اجرا می‌شوند"""
+        neo4j_breaker.reset()
+        session = mock_get_driver.return_value.session.return_value.__enter__.return_value
+        session.run.return_value = []
+        with override_settings(NEO4J_QUERY_TIMEOUT=2.5):
+            Neo4jClient().get_shared_attributes([1])
+        self.assertEqual(session.run.call_args.args[0].timeout, 2.5)
+
+
+@override_settings(FRAUD_SCORER='neo4j', FRAUD_FALLBACK_SCORER='index')
+class DegradedScoringTest(TestCase):
+    """تست امتیازدهی در حالت تنزل‌یافته وقتی مدار Neo4j باز است"""
+
+    def setUp(self):
+        neo4j_breaker.reset()
+        self.addCleanup(neo4j_breaker.reset)
+        caches['fraud_scores'].clear()
+        reset_fraud_index()
+        self.insured = Insured.objects.create(national_code="1234567890", full_name="علی محمدی",
+                                              phone_number="09121111111", address="تهران")
+        self.sharer = Insured.objects.create(national_code="0987654321", full_name="مریم احمدی",
+                                             phone_number="09121111111", address="شیراز")
+        # Synced before the outage; a claim of an insured whose sync failed waits for it instead
+        OutboxEvent.objects.update(processed_at=timezone.now())
+
+    def open_breaker(self):
+        for _ in range(neo4j_breaker.failure_threshold):
+            neo4j_breaker.record_failure()
+
+    @patch('claims.services.get_driver')
+    def test_open_breaker_scores_without_neo4j(self, mock_get_driver):
+        """با مدار باز Neo4j صدا زده نمی‌شود و امتیاز از کش یا ایندکس می‌آید"""
+        self.open_breaker()
+        score_cache.set_many("score", {self.sharer.id: 99})
+
+        scores = services.score_insureds([self.insured.id, self.sharer.id])
+
+        self.assertEqual(scores, {self.insured.id: 30, self.sharer.id: 99})
+        self.assertIsInstance(scores, services.DegradedAnswers)
+        mock_get_driver.return_value.session.assert_not_called()
+
+    def test_unresolvable_uri_degrades(self):
+        """با آدرس غیرقابل‌حل Neo4j امتیازدهی از ایندکس می‌آید و مدار باز می‌شود"""
+        services.close_driver()
+        self.addCleanup(services.close_driver)
+        with override_settings(NEO4J_URI='bolt://neo4j.invalid:7687'):
+            for _ in range(neo4j_breaker.failure_threshold):
+                scores = services.score_insureds([self.insured.id])
+                self.assertIsInstance(scores, services.DegradedAnswers)
+                self.assertEqual(scores, {self.insured.id: 30})
+        self.assertEqual(neo4j_breaker.state, OPEN)
+
+    @patch('claims.services.get_driver')
+    def test_bug_is_not_an_outage(self, mock_get_driver):
+        """TypeError در متد محافظت‌شده مدار را باز نمی‌کند و امتیازدهی را تنزل نمی‌دهد؛ خطا بالا می‌رود"""
+        session = mock_get_driver.return_value.session.return_value.__enter__.return_value
+        session.run.side_effect = TypeError("unhashable type: 'list'")
+        for _ in range(neo4j_breaker.failure_threshold + 1):
+            with self.assertRaises(TypeError):
+                services.score_insureds([self.insured.id])
+        self.assertEqual(neo4j_breaker.state, CLOSED)
+        self.assertEqual(neo4j_breaker.failures, 0)
+        self.assertEqual(session.run.call_count, neo4j_breaker.failure_threshold + 1)
+
+    @patch('claims.outbox.publish_fraud_alert')
+    @patch('claims.services.get_driver')
+    def test_stopped_graph_opens_breaker(self, mock_get_driver, mock_publish):
+        """قطع Neo4j (ServiceUnavailable یا ValueError) مدار را باز می‌کند و خسارت برای امتیاز دوباره علامت می‌خورد"""
+        session = mock_get_driver.return_value.session.return_value.__enter__.return_value
+        session.run.side_effect = [ServiceUnavailable("down"), ValueError("Cannot resolve address neo4j:7687")] * \
+            neo4j_breaker.failure_threshold
+        for _ in range(neo4j_breaker.failure_threshold):
+            self.assertIsInstance(services.score_insureds([self.insured.id]), services.DegradedAnswers)
+        self.assertEqual(neo4j_breaker.state, OPEN)
+        self.assertEqual(session.run.call_count, neo4j_breaker.failure_threshold)
+
+        claim = Claim.objects.create(insured=self.insured, amount=5000000, accident_date="2026-02-13",
+                                     description="تصادف")
+        relay_outbox()
+
+        claim.refresh_from_db()
+        self.assertTrue(claim.needs_rescore)
+        self.assertEqual(claim.fraud_score, 30)
+        self.assertEqual(session.run.call_count, neo4j_breaker.failure_threshold)  # later calls skip Neo4j
+
+    @patch('claims.outbox.publish_fraud_alert')
+    @patch('claims.services.Neo4jClient.get_shared_attributes')
+    def test_degraded_claims_rescored_when_graph_is_back(self, mock_shared, mock_publish):
+        """خسارت امتیازدهی‌شده بدون Neo4j علامت می‌خورد و پس از بسته شدن مدار دوباره امتیاز می‌گیرد"""
+        mock_shared.side_effect = ServiceUnavailable("down")
+        self.open_breaker()
+        claim = Claim.objects.create(insured=self.insured, amount=5000000, accident_date="2026-02-13",
+                                     description="تصادف")
+
+        relay_outbox()
+        claim.refresh_from_db()
+        self.assertTrue(claim.needs_rescore)
+        self.assertEqual(claim.fraud_score, 30)
+        self.assertEqual(rescore_degraded(), 0)  # the breaker is still open
+
+        neo4j_breaker.reset()
+        mock_shared.side_effect = lambda ids: {i: {"phone": [self.sharer.id, 900], "address": []} for i in ids}
+        self.assertEqual(rescore_degraded(), 1)
 
+        claim.refresh_from_db()
+        self.assertFalse(claim.needs_rescore)
+        self.assertEqual(claim.fraud_score, 60)
+        self.assertEqual(rescore_degraded(), 0)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
 
 application = get_asgi_application()
+
+# Build the in-process fraud index before the first request (FRAUD_INDEX_WARM_ON_STARTUP)
+from claims.fraud_index import warm_fraud_index  # noqa: E402
+
+warm_fraud_index()
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 
     # django_app:
     'rest_framework',
+    'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
@@ -120,11 +121,168 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # Partners call the API with a token (manage.py drf_create_token <username>); staff can use their session
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    # Every viewset sets its own permission_classes; this only keeps a new one from being public
     'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.AllowAny',
+        'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+CLAIMS_BULK_MAX_ITEMS = config('CLAIMS_BULK_MAX_ITEMS', default=5000, cast=int)  # claims per bulk intake request
+DATA_UPLOAD_MAX_MEMORY_SIZE = config('DATA_UPLOAD_MAX_MEMORY_SIZE', default=10 * 1024 * 1024, cast=int)  # bulk bodies
+# POST /api/claims/submit/ scores inline under ASGI; its queued claim.score event only
+# becomes visible to the outbox relay after this many seconds (a crash mid-request)
+CLAIM_INLINE_SCORING_GRACE = config('CLAIM_INLINE_SCORING_GRACE', default=30, cast=int)  # seconds
+
+
+# Neo4j
+# One pooled driver is shared by every Neo4jClient in the process (see claims/services.py)
+
+NEO4J_URI = config('NEO4J_URI', default='bolt://neo4j:7687')
+NEO4J_USER = config('NEO4J_USER', default='neo4j')
+NEO4J_PASSWORD = config('NEO4J_PASSWORD', default='password123')
+NEO4J_MAX_POOL_SIZE = config('NEO4J_MAX_POOL_SIZE', default=50, cast=int)
+NEO4J_POOL_ACQUISITION_TIMEOUT = config('NEO4J_POOL_ACQUISITION_TIMEOUT', default=10.0, cast=float)  # seconds
+NEO4J_MAX_CONNECTION_LIFETIME = config('NEO4J_MAX_CONNECTION_LIFETIME', default=3600, cast=int)  # seconds
+NEO4J_MAX_TRANSACTION_RETRY_TIME = config('NEO4J_MAX_TRANSACTION_RETRY_TIME', default=30.0, cast=float)  # seconds
+NEO4J_CONNECTION_TIMEOUT = config('NEO4J_CONNECTION_TIMEOUT', default=5.0, cast=float)  # seconds, TCP connect + handshake
+NEO4J_QUERY_TIMEOUT = config('NEO4J_QUERY_TIMEOUT', default=5.0, cast=float)  # seconds, scoring lookups
+NEO4J_WRITE_TIMEOUT = config('NEO4J_WRITE_TIMEOUT', default=60.0, cast=float)  # seconds, sync/delete transactions
+# Circuit breaker (claims/circuit_breaker.py): fail fast after consecutive failures, probe again after the reset timeout
+NEO4J_BREAKER_FAILURES = config('NEO4J_BREAKER_FAILURES', default=5, cast=int)
+NEO4J_BREAKER_RESET_TIMEOUT = config('NEO4J_BREAKER_RESET_TIMEOUT', default=30.0, cast=float)  # seconds
+NEO4J_SYNC_BATCH_SIZE = config('NEO4J_SYNC_BATCH_SIZE', default=5000, cast=int)  # rows per UNWIND write
+NEO4J_ENSURE_SCHEMA_ON_MIGRATE = config('NEO4J_ENSURE_SCHEMA_ON_MIGRATE', default=True, cast=bool)
+
+
+# NATS
+
+NATS_URL = config('NATS_URL', default='nats://nats:4222')
+NATS_PUBLISH_BATCH_SIZE = config('NATS_PUBLISH_BATCH_SIZE', default=500, cast=int)  # messages per batch
+NATS_PUBLISH_QUEUE_SIZE = config('NATS_PUBLISH_QUEUE_SIZE', default=10000, cast=int)
+NATS_PUBLISH_TIMEOUT = config('NATS_PUBLISH_TIMEOUT', default=5, cast=int)  # seconds to wait for a JetStream ack
+NATS_ALERT_STREAM = config('NATS_ALERT_STREAM', default='FRAUD_ALERTS')
+NATS_ALERT_DUPLICATE_WINDOW = config('NATS_ALERT_DUPLICATE_WINDOW', default=900, cast=int)  # seconds; > OUTBOX_RETRY_MAX_DELAY
+NATS_ALERT_CONSUMER = config('NATS_ALERT_CONSUMER', default='fraud-alert-listener')
+NATS_LISTENER_BATCH_SIZE = config('NATS_LISTENER_BATCH_SIZE', default=100, cast=int)  # messages per fetch
+NATS_LISTENER_CONCURRENCY = config('NATS_LISTENER_CONCURRENCY', default=8, cast=int)  # messages in flight
+NATS_LISTENER_THREADS = config('NATS_LISTENER_THREADS', default=4, cast=int)  # pool for sync (ORM) handlers
+NATS_LISTENER_PENDING_MSGS_LIMIT = config('NATS_LISTENER_PENDING_MSGS_LIMIT', default=1000, cast=int)
+NATS_LISTENER_PENDING_BYTES_LIMIT = config('NATS_LISTENER_PENDING_BYTES_LIMIT', default=8 * 1024 * 1024, cast=int)
+NATS_LISTENER_STATS_INTERVAL = config('NATS_LISTENER_STATS_INTERVAL', default=60, cast=int)  # seconds
+NATS_HANDLER_TIMEOUT = config('NATS_HANDLER_TIMEOUT', default=30, cast=int)  # seconds before a message is nak'ed
+NATS_SLOW_HANDLER_SECONDS = config('NATS_SLOW_HANDLER_SECONDS', default=1.0, cast=float)
+NATS_ALERT_HANDLERS = [
+    'claims.alert_handlers.print_fraud_alert',
+    'claims.alert_handlers.print_claim_details',
+]
+
+
+# Fraud scoring
+# 'neo4j' scores from the graph (falling back to the in-process index when it is down);
+# 'index' scores from the in-process shared-attribute index (claims/fraud_index.py)
+# 'features' scores from the materialized InsuredFeatures table (claims/features.py)
+# While Neo4j is unavailable the 'neo4j' scorer answers from the score cache, then FRAUD_FALLBACK_SCORER
+# ('index' or 'features'), and marks the claims for re-scoring (Claim.needs_rescore) by the outbox relay
+
+FRAUD_SCORER = config('FRAUD_SCORER', default='neo4j')
+FRAUD_FALLBACK_SCORER = config('FRAUD_FALLBACK_SCORER', default='index')
+FRAUD_INDEX_WARM_ON_STARTUP = config('FRAUD_INDEX_WARM_ON_STARTUP', default=FRAUD_SCORER == 'index', cast=bool)
+FRAUD_INDEX_REFRESH_INTERVAL = config('FRAUD_INDEX_REFRESH_INTERVAL', default=5, cast=int)  # seconds between outbox tails
+FRAUD_INDEX_REFRESH_OVERLAP = config('FRAUD_INDEX_REFRESH_OVERLAP', default=60, cast=int)  # seconds re-read per tail
+FRAUD_INDEX_REBUILD_INTERVAL = config('FRAUD_INDEX_REBUILD_INTERVAL', default=3600, cast=int)  # seconds
+
+# Fraud rings (claims/rings.py): connected components over shared phones/addresses, kept on Insured.ring_*
+# The relay merges rings as insureds are saved; splits need a full recompute (or `manage.py detect_rings`)
+FRAUD_RING_REFRESH_INTERVAL = config('FRAUD_RING_REFRESH_INTERVAL', default=5, cast=int)  # seconds between outbox tails
+FRAUD_RING_RECOMPUTE_INTERVAL = config('FRAUD_RING_RECOMPUTE_INTERVAL', default=3600, cast=int)  # seconds
+
+# Rules summed into Claim.fraud_score, each adding an explained entry to fraud_signals (claims/rules.py)
+FRAUD_RULES = [
+    'claims.rules.SharedPhoneRule',
+    'claims.rules.SharedAddressRule',
+    'claims.rules.ClaimVelocityRule',
+    'claims.rules.AmountOutlierRule',
+    'claims.rules.EarlyClaimRule',
+    'claims.rules.FraudRingRule',
+]
+
+
+# Score cache (claims/score_cache.py): Neo4j answers per insured, invalidated by the outbox relay
+# A process-local LRU tier, plus a shared tier when FRAUD_SCORE_SHARED_CACHE_URL is set (e.g. redis://redis:6379/1)
+
+FRAUD_SCORE_CACHE = config('FRAUD_SCORE_CACHE', default=True, cast=bool)
+FRAUD_SCORE_CACHE_TIMEOUT = config('FRAUD_SCORE_CACHE_TIMEOUT', default=3600, cast=int)  # seconds, shared tier
+FRAUD_SCORE_CACHE_LOCAL_TIMEOUT = config('FRAUD_SCORE_CACHE_LOCAL_TIMEOUT', default=5, cast=int)  # seconds
+FRAUD_SCORE_CACHE_LOCAL_ENTRIES = config('FRAUD_SCORE_CACHE_LOCAL_ENTRIES', default=100000, cast=int)
+FRAUD_SCORE_SHARED_CACHE_URL = config('FRAUD_SCORE_SHARED_CACHE_URL', default='')
+FRAUD_SCORE_SHARED_CACHE_BACKEND = config('FRAUD_SCORE_SHARED_CACHE_BACKEND',
+                                          default='django.core.cache.backends.redis.RedisCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fraud_scores': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fraud-scores',
+        'TIMEOUT': FRAUD_SCORE_CACHE_LOCAL_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': FRAUD_SCORE_CACHE_LOCAL_ENTRIES, 'CULL_FREQUENCY': 10},
+    },
+}
+if FRAUD_SCORE_SHARED_CACHE_URL:
+    CACHES['fraud_scores_shared'] = {
+        'BACKEND': FRAUD_SCORE_SHARED_CACHE_BACKEND,
+        'LOCATION': FRAUD_SCORE_SHARED_CACHE_URL,
+        'TIMEOUT': FRAUD_SCORE_CACHE_TIMEOUT,
+        'KEY_PREFIX': 'fraud',
+    }
+
+
+# Outbox relay (manage.py outbox_relay)
+
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=500, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=1.0, cast=float)  # seconds
+OUTBOX_RETRY_MAX_DELAY = config('OUTBOX_RETRY_MAX_DELAY', default=300, cast=int)  # seconds
+# A relay holds its claimed batch this long; must exceed the slowest handler (NEO4J_WRITE_TIMEOUT, NATS acks)
+OUTBOX_LEASE_TIMEOUT = config('OUTBOX_LEASE_TIMEOUT', default=300, cast=int)  # seconds
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+
+# Prometheus scrapes /metrics with Authorization: Bearer <METRICS_TOKEN>; unset, the endpoint is off.
+# Multi-process servers also set PROMETHEUS_MULTIPROC_DIR (read by prometheus_client, see claims/metrics.py).
+
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+
+# Logging: claims.* records go through a bounded queue to a listener thread (claims/log_handlers.py),
+# so a save never waits on terminal or log-collector I/O. Per-save messages are DEBUG.
+
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)  # records; beyond it they are dropped and counted
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'queue': {
+            'class': 'claims.log_handlers.QueueStreamHandler',
+            'formatter': 'plain',
+            'maxsize': LOG_QUEUE_SIZE,
+        },
+    },
+    'loggers': {
+        'claims': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
 
 # docker compose up -d --build
 # docker compose down
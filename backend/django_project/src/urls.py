@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from claims.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    # path('claims/', include('claims.api.urls')),
+    path('api/', include('claims.api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
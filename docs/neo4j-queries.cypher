@@ -32,6 +32,7 @@ RETURN i.name,
 
 
 // 4.ind all high-risk insureds (score > 30)
+// (Served from PostgreSQL without a graph scan: GET /api/insureds/high-risk/?min_score=30)
 MATCH (i:Insured)
 OPTIONAL MATCH (i)-[:HAS_PHONE]->(p)<-[:HAS_PHONE]-(pf)
 OPTIONAL MATCH (i)-[:HAS_ADDRESS]->(a)<-[:HAS_ADDRESS]-(af)